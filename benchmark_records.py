@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: validation dicts vs compact ValidationRecords (validation_records.py).
+
+Builds a synthetic corpus the way the backends load it (json.loads, so every
+field is its own string object), then reports memory per record and the cost
+of picking the latest validation per video and sorting by timestamp.
+
+Usage:
+    python benchmark_records.py [RECORDS] [VIDEOS]
+"""
+
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from validation_records import ValidationRecord, latest
+
+STATUSES = ["correct", "incorrect", "needs_review"]
+FEEDBACK = ["", "", "", "boundary too early", "missing retraction at the end", "hand shape wrong"]
+
+
+def make_corpus(records: int, videos: int) -> str:
+    random.seed(42)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    validations = {}
+    for i in range(records):
+        moment = start + timedelta(seconds=random.randrange(365 * 86400), milliseconds=random.randrange(1000))
+        validations.setdefault(f"video_{random.randrange(videos):06d}", []).append({
+            "timestamp": moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z",
+            "status": random.choice(STATUSES),
+            "feedback": random.choice(FEEDBACK),
+            "validator": f"validator_{random.randrange(50)}",
+        })
+    return json.dumps({"validations": validations})
+
+
+def measure(build):
+    """(result, bytes allocated by build())"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    videos = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    corpus = make_corpus(records, videos)
+
+    dicts, dict_bytes = measure(lambda: json.loads(corpus)["validations"])
+    compact, compact_bytes = measure(lambda: {
+        video_id: [ValidationRecord.from_dict(v, video_id) for v in validations]
+        for video_id, validations in dicts.items()
+    })
+
+    latest_dicts = timed(lambda: [max(v, key=lambda x: x.get("timestamp", "")) for v in dicts.values()])
+    latest_compact = timed(lambda: [latest(v) for v in compact.values()])
+    flat_dicts = [v for validations in dicts.values() for v in validations]
+    flat_compact = [r for rs in compact.values() for r in rs]
+    sort_dicts = timed(lambda: sorted(flat_dicts, key=lambda x: x.get("timestamp", "")))
+    sort_compact = timed(lambda: sorted(flat_compact, key=lambda r: r.ts))
+
+    print("=" * 70)
+    print(f"Validation records: {records} across {len(dicts)} videos")
+    print("=" * 70)
+    print(f"{'':28}{'dict':>14}{'compact':>14}{'ratio':>10}")
+    print(f"{'bytes per record':28}{dict_bytes / records:>14.0f}{compact_bytes / records:>14.0f}"
+          f"{dict_bytes / compact_bytes:>9.1f}x")
+    print(f"{'latest per video (ms)':28}{latest_dicts * 1000:>14.1f}{latest_compact * 1000:>14.1f}"
+          f"{latest_dicts / latest_compact:>9.1f}x")
+    print(f"{'sort by timestamp (ms)':28}{sort_dicts * 1000:>14.1f}{sort_compact * 1000:>14.1f}"
+          f"{sort_dicts / sort_compact:>9.1f}x")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: FastAPI's default JSON response path vs validation_responses.py.
+
+Builds the body GET /api/validations returns for a synthetic corpus
+(benchmark_records.make_corpus), then reports the CPU time per request and
+the bytes sent:
+
+- default:     jsonable_encoder + JSONResponse (json.dumps), uncompressed
+- dumps:       validation_responses.dumps (orjson when installed)
+- dumps+gzip:  what an uncached response costs a client sending
+               Accept-Encoding: gzip (and dumps+br, with brotli installed)
+- cached:      a ResponseCache hit, which is every request between two writes
+
+Usage:
+    python benchmark_responses.py [RECORDS] [VIDEOS]
+"""
+
+import json
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmark_records import make_corpus
+from validation_responses import ENCODINGS, ORJSON_AVAILABLE, ResponseCache, compress, dumps
+
+
+def cpu_time(fn, repeat: int = 5):
+    """(best CPU seconds of `repeat` runs, last result)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.process_time()
+        result = fn()
+        best = min(best, time.process_time() - started)
+    return best, result
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    videos = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    data = {"validations": json.loads(make_corpus(records, videos))["validations"]}
+
+    rows = []
+    seconds, body = cpu_time(lambda: JSONResponse(jsonable_encoder(data)).body)
+    rows.append(("default", seconds, len(body)))
+    seconds, body = cpu_time(lambda: dumps(data))
+    rows.append(("dumps", seconds, len(body)))
+    for encoding in ENCODINGS:
+        seconds, compressed = cpu_time(lambda: compress(dumps(data), encoding))
+        rows.append((f"dumps+{encoding}", seconds, len(compressed)))
+
+    cache = ResponseCache()
+    entry = cache.put(("validations", "v1"), data, '"v1"')
+    best = ENCODINGS[0]
+    entry.encoded(best)
+    hits = 10000
+    seconds, _ = cpu_time(lambda: [cache.get(("validations", "v1")).encoded(best) for _ in range(hits)])
+    rows.append((f"cached ({best})", seconds / hits, len(entry.encoded(best))))
+
+    baseline_seconds, baseline_bytes = rows[0][1], rows[0][2]
+    print("=" * 70)
+    print(f"GET /api/validations body: {records} records across {videos} videos "
+          f"(encoder: {'orjson' if ORJSON_AVAILABLE else 'json'})")
+    print("=" * 70)
+    print(f"{'':20}{'CPU ms':>12}{'speedup':>10}{'bytes':>14}{'of default':>12}")
+    for name, seconds, size in rows:
+        speedup = f"{baseline_seconds / seconds:>9.1f}x" if seconds > 0 else f"{'-':>10}"
+        print(f"{name:20}{seconds * 1000:>12.3f}{speedup}{size:>14}{size / baseline_bytes:>11.1%}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
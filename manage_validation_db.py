@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 """
 Utility script to manage the validation database.
-View, clear, or delete specific entries from the TinyDB database.
+View, clear, export, or delete specific entries from the TinyDB database.
 """
 
+import argparse
 import json
 import sys
+import time
 from pathlib import Path
 from tinydb import TinyDB, Query
 
+from validation_export import ExportFilters, export_chunks, export_row
+from validation_json_stream import iter_tinydb_documents
+
 import os
 # Use environment variable or default path
 DB_PATH = os.getenv("DB_PATH", "data/validation_database_tinydb.json")
@@ -125,6 +130,50 @@ def show_database_stats():
         print(f"  {status}: {count}")
     print(f"{'='*70}\n")
 
+def export_validations(args):
+    """Export validations to CSV / Parquet / Arrow, streaming the TinyDB file."""
+    parser = argparse.ArgumentParser(prog="manage_validation_db.py export")
+    parser.add_argument("format", choices=["csv", "parquet", "arrow"])
+    parser.add_argument("output", nargs="?", help="output file (default validations.<format>)")
+    parser.add_argument("--video-id")
+    parser.add_argument("--status")
+    parser.add_argument("--validator")
+    parser.add_argument("--since", help="only validations at or after SINCE (ISO, compared as instants)")
+    parser.add_argument("--until", help="only validations at or before UNTIL (ISO, compared as instants)")
+    options = parser.parse_args(args)
+
+    if not DB_FILE.exists():
+        print("Database file does not exist.")
+        return
+
+    try:
+        filters = ExportFilters(options.video_id, options.status, options.validator, options.since, options.until)
+    except ValueError as e:
+        parser.error(str(e))
+    output = Path(options.output or f"validations.{'arrows' if options.format == 'arrow' else options.format}")
+    exported = 0
+
+    def rows():
+        nonlocal exported
+        with open(DB_FILE, 'r') as f:
+            for _, doc in iter_tinydb_documents(f):
+                video_id = doc.get('video_id', 'Unknown')
+                if filters.matches(video_id, doc):
+                    exported += 1
+                    yield export_row(video_id, doc)
+
+    started = time.monotonic()
+    try:
+        with open(output, 'wb') as out:
+            for chunk in export_chunks(rows(), options.format):
+                out.write(chunk)
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        output.unlink(missing_ok=True)
+        sys.exit(1)
+    elapsed = time.monotonic() - started
+    print(f"✓ Exported {exported} validation(s) to {output} in {elapsed:.1f}s")
+
 def main():
     if len(sys.argv) < 2:
         print("Usage:")
@@ -132,6 +181,7 @@ def main():
         print("  python manage_validation_db.py stats         - Show database statistics")
         print("  python manage_validation_db.py clear        - Clear all validations")
         print("  python manage_validation_db.py delete VIDEO  - Delete validations for a video")
+        print("  python manage_validation_db.py export csv|parquet|arrow [FILE] [--status S] [--since TS] ...")
         print(f"\nDatabase location: {DB_FILE}")
         sys.exit(1)
     
@@ -150,6 +200,8 @@ def main():
             sys.exit(1)
         video_id = sys.argv[2]
         delete_video_validations(video_id)
+    elif command == 'export':
+        export_validations(sys.argv[2:])
     else:
         print(f"Unknown command: {command}")
         sys.exit(1)
@@ -1,106 +1,212 @@
 #!/usr/bin/env python3
 """
 Migrate validation data from JSON file to MongoDB.
-Run this once to migrate existing validations.
+
+Streams the JSON file (validation_json_stream) instead of loading it, and
+writes in unordered bulk upserts on the whole validation, so re-running never
+creates duplicates. Each inserted validation is written the way the API writes
+it (validation_mongo.MongoStore): its video's counter goes up, it is logged
+under a new version for ETags and delta sync, and the idempotency keys of the
+videos it touches are dropped. Records without the fields of a validation are
+skipped and reported. Progress is checkpointed after every batch; an
+interrupted run resumes where it stopped.
+
+Usage:
+    python migrate_json_to_mongodb.py [--batch-size N] [--restart]
 """
 
+import argparse
 import json
-from pathlib import Path
-from pymongo import MongoClient
 import os
-from datetime import datetime
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from pydantic import ValidationError
+from pymongo import MongoClient, UpdateOne
+
+from validation_json_stream import iter_validations
+from validation_mongo import DB_NAME, VALIDATION_FIELDS, MongoStore, ValidationEntry, run
 
 # Configuration
-import os
 JSON_DB_PATH = os.getenv("DB_PATH", "data/validation_database.json")
 JSON_DB_FILE = Path(JSON_DB_PATH)
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-DB_NAME = "sign_validation_db"
-COLLECTION_NAME = "validations"
+BATCH_SIZE = int(os.getenv("MIGRATE_BATCH_SIZE", "1000"))
+CHECKPOINT_FILE = Path(os.getenv("MIGRATE_CHECKPOINT", str(JSON_DB_FILE) + ".migrate-checkpoint"))
+
+# A record equal to a stored validation in every field is a duplicate. The
+# index covers the fields of the API's derived idempotency key; it is not
+# unique, since the API stores saves that differ only in status or feedback.
+IDENTITY_INDEX = ("video_id", "timestamp", "validator")
+# Unique index created by earlier versions of this script
+LEGACY_INDEX_NAME = "video_id_timestamp_status_unique"
+
+
+def source_fingerprint() -> dict:
+    stat = JSON_DB_FILE.stat()
+    return {"source": str(JSON_DB_FILE), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_checkpoint() -> dict:
+    """Progress of an interrupted run over the same, unchanged source file."""
+    if not CHECKPOINT_FILE.exists():
+        return {}
+    try:
+        with open(CHECKPOINT_FILE, 'r') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if any(checkpoint.get(k) != v for k, v in source_fingerprint().items()):
+        print("  Source file changed since the checkpoint; starting over")
+        return {}
+    return checkpoint
+
+
+def save_checkpoint(checkpoint: dict):
+    tmp_path = CHECKPOINT_FILE.with_name(CHECKPOINT_FILE.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+
+def parse_record(video_id, validation) -> Optional[dict]:
+    """The document to store for a record, or None if it is not a validation."""
+    if not isinstance(validation, dict):
+        return None
+    try:
+        entry = ValidationEntry(**validation)
+    except ValidationError:
+        return None
+    return {**entry.dict(), "video_id": video_id}
+
+
+def ensure_indexes(store: MongoStore):
+    rebuilt = run(store.setup())
+    if rebuilt:
+        print(f"✓ Rebuilt validation counters for {rebuilt} videos")
+    if LEGACY_INDEX_NAME in store.validations.index_information():
+        store.validations.drop_index(LEGACY_INDEX_NAME)
+        print(f"✓ Dropped the unique index {LEGACY_INDEX_NAME}")
+    store.validations.create_index([(field, 1) for field in IDENTITY_INDEX])
+
+
+def write_batch(store: MongoStore, batch: list) -> tuple:
+    """Upsert a batch and record the inserted validations; returns (inserted, duplicates)."""
+    ops = [UpdateOne(dict(doc), {"$setOnInsert": doc}, upsert=True) for doc in batch]
+    result = store.validations.bulk_write(ops, ordered=False)
+    inserted = list(store.validations.find({"_id": {"$in": list(result.upserted_ids.values())}},
+                                           VALIDATION_FIELDS)) if result.upserted_ids else []
+    if inserted:
+        video_ids = [doc["video_id"] for doc in inserted]
+        run(store.add_counts(Counter(video_ids)))
+        run(store.log_writes([
+            {"op": "insert", "video_id": doc["video_id"],
+             "validation": {k: v for k, v in doc.items() if k != "video_id"}}
+            for doc in inserted
+        ]))
+        # Drop the keys of these videos, as deleting or replacing them does
+        store.keys.delete_many({"video_id": {"$in": list(dict.fromkeys(video_ids))}})
+    return len(inserted), len(batch) - len(inserted)
 
 
-def migrate():
-    """Migrate validations from JSON to MongoDB."""
-    
+def migrate(batch_size: int = BATCH_SIZE, restart: bool = False, mongo_client=None):
+    """Migrate validations from JSON to MongoDB (to `mongo_client`, if given, instead of MONGODB_URI)."""
+
     # Check if JSON file exists
     if not JSON_DB_FILE.exists():
         print(f"✗ JSON database file not found: {JSON_DB_FILE}")
         print("  Nothing to migrate.")
         return
-    
-    # Load JSON data
-    print(f"Loading data from {JSON_DB_FILE}...")
-    try:
-        with open(JSON_DB_FILE, 'r') as f:
-            json_data = json.load(f)
-    except Exception as e:
-        print(f"✗ Error reading JSON file: {e}")
-        return
-    
-    validations = json_data.get("validations", {})
-    if not validations:
-        print("  No validations found in JSON file.")
-        return
-    
-    print(f"  Found {len(validations)} videos with validations")
-    
+
     # Connect to MongoDB
-    print(f"\nConnecting to MongoDB at {MONGODB_URI}...")
+    print(f"Connecting to MongoDB at {MONGODB_URI}...")
     try:
-        client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+        client = mongo_client or MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
         client.admin.command('ping')
-        db = client[DB_NAME]
-        collection = db[COLLECTION_NAME]
+        store = MongoStore(client[DB_NAME])
         print("✓ Connected to MongoDB")
     except Exception as e:
         print(f"✗ Failed to connect to MongoDB: {e}")
         print("  Make sure MongoDB is running.")
         return
-    
-    # Create indexes
-    collection.create_index("video_id")
-    collection.create_index([("video_id", 1), ("timestamp", -1)])
-    
+
+    ensure_indexes(store)
+
+    checkpoint = {} if restart else load_checkpoint()
+    resume_at = checkpoint.get("records", 0)
+    migrated_count = checkpoint.get("migrated", 0)
+    skipped_count = checkpoint.get("skipped", 0)
+    invalid_count = checkpoint.get("invalid", 0)
+    if resume_at:
+        print(f"  Resuming after {resume_at} records (checkpoint {CHECKPOINT_FILE})")
+    checkpoint.update(source_fingerprint())
+
     # Migrate data
-    print(f"\nMigrating validations to MongoDB...")
-    migrated_count = 0
-    skipped_count = 0
-    
-    for video_id, video_validations in validations.items():
-        for validation in video_validations:
-            # Add video_id to validation document
-            validation["video_id"] = video_id
-            
-            # Check if already exists (by video_id, timestamp, status)
-            existing = collection.find_one({
-                "video_id": video_id,
-                "timestamp": validation["timestamp"],
-                "status": validation["status"]
-            })
-            
-            if existing:
-                skipped_count += 1
-                continue
-            
-            # Insert into MongoDB
-            collection.insert_one(validation)
-            migrated_count += 1
-    
+    print(f"\nMigrating validations from {JSON_DB_FILE} (batch size {batch_size})...")
+    started = time.monotonic()
+    processed = 0
+    written = 0
+    batch = []
+
+    def flush():
+        nonlocal migrated_count, skipped_count, written
+        inserted, duplicates = write_batch(store, batch)
+        migrated_count += inserted
+        skipped_count += duplicates
+        written += len(batch)
+        batch.clear()
+        checkpoint.update(records=processed, migrated=migrated_count, skipped=skipped_count,
+                          invalid=invalid_count)
+        save_checkpoint(checkpoint)
+        elapsed = time.monotonic() - started
+        print(f"  {processed} records, {written / elapsed if elapsed else 0:.0f} records/sec")
+
+    try:
+        with open(JSON_DB_FILE, 'r') as f:
+            for video_id, validation in iter_validations(f):
+                processed += 1
+                if processed <= resume_at:
+                    continue  # written by the interrupted run
+                doc = parse_record(video_id, validation)
+                if doc is None:
+                    invalid_count += 1
+                    print(f"⚠️  Skipping record {processed} of {video_id!r}: not a validation ({validation!r})")
+                    continue
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+    except ValueError as e:
+        print(f"✗ Error reading JSON file at record {processed}: {e}")
+        return
+    except KeyboardInterrupt:
+        print(f"\n⚠️  Interrupted; re-run to resume after record {checkpoint.get('records', resume_at)}")
+        return
+
+    elapsed = time.monotonic() - started
+    CHECKPOINT_FILE.unlink(missing_ok=True)
+
     print(f"\n✓ Migration complete!")
     print(f"  Migrated: {migrated_count} validations")
     print(f"  Skipped (duplicates): {skipped_count} validations")
-    
+    if invalid_count:
+        print(f"  Skipped (invalid): {invalid_count} records")
+    print(f"  Throughput: {written / elapsed if elapsed else 0:.0f} records/sec ({written} in {elapsed:.1f}s)")
+
     # Verify
-    total_in_mongodb = collection.count_documents({})
+    total_in_mongodb = store.validations.count_documents({})
     print(f"  Total in MongoDB: {total_in_mongodb} validations")
-    
+
     # Ask about backup
     backup_path = JSON_DB_FILE.with_suffix('.json.backup')
     if not backup_path.exists():
         import shutil
         shutil.copy(JSON_DB_FILE, backup_path)
         print(f"\n✓ Created backup: {backup_path}")
-    
+
     print("\nNext steps:")
     print("  1. Use validation_api_mongodb.py instead of validation_api.py")
     print("  2. Test the API to verify data is accessible")
@@ -108,7 +214,14 @@ def migrate():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate validations from the JSON file to MongoDB")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"records per bulk write (default {BATCH_SIZE})")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore any checkpoint and start from the first record")
+    args = parser.parse_args()
+
     print("=" * 70)
     print("JSON to MongoDB Migration Tool")
     print("=" * 70)
-    migrate()
+    migrate(batch_size=args.batch_size, restart=args.restart)
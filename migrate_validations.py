@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+"""
+Copy validations between any two storage backends, and optionally keep
+following the source so the destination stays in sync until cutover.
+
+Backends are given as KIND[:LOCATION]:
+    json[:path]     validation_api.py file         (default data/validation_database.json)
+    tinydb[:path]   validation_api_tinydb.py file  (default data/validation_database_tinydb.json)
+    sqlite[:path]   validation_api_sqlite.py file  (default data/validation_database.sqlite3)
+    mongodb[:uri]   validation_api_mongodb.py      (default MONGODB_URI or mongodb://localhost:27017/)
+
+Records are streamed one video at a time and written in batches (in parallel
+where the destination allows concurrent writers), so memory is bounded by the
+batch size rather than the database size. At the end both sides are compared
+by record count and an order-independent checksum.
+
+With --follow the tool keeps polling the source after the copy and replaces
+every video whose records changed (or deletes it), until interrupted. It keeps
+one small digest per video, not the records. Run the destination's API only
+after cutover: the TinyDB API caches its file and won't see these writes.
+
+Usage:
+    python migrate_validations.py json tinydb
+    python migrate_validations.py tinydb:data/old.json mongodb://db:27017/ --follow
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from validation_json_stream import iter_validations
+
+BATCH_SIZE = int(os.getenv("MIGRATE_BATCH_SIZE", "1000"))
+WORKERS = int(os.getenv("MIGRATE_WORKERS", "4"))
+FOLLOW_INTERVAL = float(os.getenv("MIGRATE_FOLLOW_INTERVAL", "1.0"))
+
+DEFAULT_LOCATIONS = {
+    "json": "data/validation_database.json",
+    "tinydb": "data/validation_database_tinydb.json",
+    "sqlite": "data/validation_database.sqlite3",
+    "mongodb": os.getenv("MONGODB_URI", "mongodb://localhost:27017/"),
+}
+MONGODB_DB_NAME = "sign_validation_db"
+
+# (video_id, [validation, ...]) with the video_id left out of each validation
+VideoGroup = Tuple[str, List[dict]]
+
+_CHECKSUM_MOD = 1 << 64
+
+
+def record_hash(video_id: str, validation: dict) -> int:
+    canonical = json.dumps([video_id, validation], sort_keys=True, separators=(",", ":"))
+    return int.from_bytes(hashlib.sha256(canonical.encode("utf-8")).digest()[:8], "big")
+
+
+def group_digest(video_id: str, validations: List[dict]) -> Tuple[int, int]:
+    """(count, checksum) of one video; the checksum ignores record order."""
+    return len(validations), sum(record_hash(video_id, v) for v in validations) % _CHECKSUM_MOD
+
+
+def file_token(*paths: Path):
+    tokens = []
+    for path in paths:
+        try:
+            st = path.stat()
+            tokens.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            tokens.append(None)
+    return tuple(tokens)
+
+
+def atomic_write_json(path: Path, data: dict):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JSONBackend:
+    """The {"validations": {video_id: [...]}} file used by validation_api.py."""
+
+    max_writers = 1
+
+    def __init__(self, location: str):
+        self.path = Path(location)
+        self._out = None
+        self._first = True
+
+    def iter_groups(self) -> Iterator[VideoGroup]:
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            for video_id, records in groupby(iter_validations(f), key=lambda item: item[0]):
+                yield video_id, [validation for _, validation in records]
+
+    def change_token(self):
+        return file_token(self.path)
+
+    def begin_copy(self):
+        """Stream the copy into a temp file that replaces the database in finish()."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._out = open(self.path.with_name(self.path.name + ".tmp"), 'w')
+        self._out.write('{"validations":{')
+        self._first = True
+
+    def write_groups(self, groups: List[VideoGroup]):
+        for video_id, validations in groups:
+            self._out.write(("" if self._first else ",") + json.dumps(video_id) + ":" +
+                            json.dumps(validations, separators=(",", ":")))
+            self._first = False
+
+    def finish(self):
+        if self._out is not None:
+            self._out.write("}}")
+            self._out.flush()
+            os.fsync(self._out.fileno())
+            self._out.close()
+            os.replace(self._out.name, self.path)
+            self._out = None
+
+    def replace_videos(self, groups: List[VideoGroup]):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {"validations": {}}
+        validations = data.setdefault("validations", {})
+        for video_id, records in groups:
+            if records:
+                validations[video_id] = records
+            else:
+                validations.pop(video_id, None)
+        atomic_write_json(self.path, data)
+
+    def invalidate(self, video_ids=None):
+        pass  # validation_api.py reloads (and re-versions) when the file changes
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()
+            os.unlink(self._out.name)
+            self._out = None
+
+
+class TinyDBBackend:
+    """The TinyDB file used by validation_api_tinydb.py (STORAGE_ENGINE=tinydb)."""
+
+    max_writers = 1
+
+    def __init__(self, location: str):
+        from tinydb import TinyDB, Query
+        self.path = Path(location)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = TinyDB(str(self.path))
+        self.Validation = Query()
+
+    def iter_groups(self) -> Iterator[VideoGroup]:
+        # TinyDB keeps the whole file in memory anyway; group it by video
+        by_video: Dict[str, List[dict]] = {}
+        for doc in self.db.all():
+            validation = dict(doc)
+            by_video.setdefault(validation.pop("video_id", None), []).append(validation)
+        by_video.pop(None, None)
+        for video_id in sorted(by_video):
+            yield video_id, by_video[video_id]
+
+    def change_token(self):
+        return file_token(self.path)
+
+    def begin_copy(self):
+        self.db.truncate()
+
+    def write_groups(self, groups: List[VideoGroup]):
+        self.db.insert_multiple(
+            {**validation, "video_id": video_id} for video_id, validations in groups for validation in validations
+        )
+
+    def finish(self):
+        pass
+
+    def replace_videos(self, groups: List[VideoGroup]):
+        self.db.remove(self.Validation.video_id.one_of([video_id for video_id, _ in groups]))
+        self.write_groups(groups)
+
+    def invalidate(self, video_ids=None):
+        pass  # versions are per process; the TinyDB API rebuilds them on start
+
+    def close(self):
+        self.db.close()
+
+
+class SQLiteBackend:
+    """The database used by validation_api_sqlite.py."""
+
+    max_writers = 1  # SQLite has one writer; a second thread would only wait on the lock
+
+    def __init__(self, location: str):
+        import validation_api_sqlite as sqlite_api
+        self.api = sqlite_api
+        self.path = Path(location)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._watch = None
+        conn = self.connection()
+        sqlite_api.drop_keys_without_video(conn)
+        conn.executescript(sqlite_api.SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.api.SQLITE_BUSY_TIMEOUT_MS / 1000,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def iter_groups(self) -> Iterator[VideoGroup]:
+        # Own connection and read transaction: a consistent snapshot while streaming
+        conn = sqlite3.connect(str(self.path), timeout=self.api.SQLITE_BUSY_TIMEOUT_MS / 1000,
+                               isolation_level=None)
+        try:
+            conn.execute("BEGIN")
+            rows = conn.execute("SELECT video_id, timestamp, status, feedback, validator FROM validations "
+                                "ORDER BY video_id, timestamp, id")
+            for video_id, group in groupby(rows, key=lambda row: row[0]):
+                yield video_id, [
+                    {"timestamp": ts, "status": status, "feedback": feedback, "validator": validator}
+                    for _, ts, status, feedback, validator in group
+                ]
+        finally:
+            conn.close()
+
+    def change_token(self):
+        # data_version changes whenever another connection commits
+        if self._watch is None:
+            self._watch = sqlite3.connect(str(self.path), isolation_level=None)
+        return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def _insert(self, conn: sqlite3.Connection, groups: List[VideoGroup]):
+        conn.executemany(self.api.SQL_INSERT, (
+            (video_id, v["timestamp"], v["status"], v.get("feedback", ""), v.get("validator", "community_member"))
+            for video_id, validations in groups for v in validations
+        ))
+
+    def begin_copy(self):
+        conn = self.connection()
+        with self.api.write_transaction(conn):
+            conn.execute("DELETE FROM validations")
+            # The replaced saves must not be replayed
+            conn.execute("DELETE FROM idempotency_keys")
+
+    def write_groups(self, groups: List[VideoGroup]):
+        conn = self.connection()
+        with self.api.write_transaction(conn):
+            self._insert(conn, groups)
+
+    def finish(self):
+        pass
+
+    def replace_videos(self, groups: List[VideoGroup]):
+        conn = self.connection()
+        with self.api.write_transaction(conn):
+            conn.executemany(self.api.SQL_DELETE_VIDEO, ((video_id,) for video_id, _ in groups))
+            conn.executemany(self.api.SQL_DELETE_VIDEO_IDEMPOTENCY, ((video_id,) for video_id, _ in groups))
+            self._insert(conn, groups)
+
+    def invalidate(self, video_ids=None):
+        """
+        Bump the stored versions so ETags change. Nothing is logged under the new
+        version, so delta-sync clients see a gap and do a full resync.
+        """
+        conn = self.connection()
+        with self.api.write_transaction(conn):
+            if video_ids is None:
+                version = self.api.bump_versions(conn, [])
+                conn.execute("UPDATE versions SET version = ?", (version,))
+                conn.execute("INSERT INTO versions (key, version) "
+                             "SELECT DISTINCT 'video:' || video_id, ? FROM validations WHERE true "
+                             "ON CONFLICT (key) DO UPDATE SET version = excluded.version", (version,))
+            else:
+                self.api.bump_versions(conn, video_ids)
+
+    def close(self):
+        if self._watch is not None:
+            self._watch.close()
+
+
+class MongoDBBackend:
+    """The collections used by validation_api_mongodb.py / validation_api_mongodb_async.py."""
+
+    def __init__(self, location: str):
+        from pymongo import MongoClient, ReturnDocument, UpdateOne, DeleteOne
+        from validation_mongo import MongoStore, run
+        self.ReturnDocument, self.UpdateOne, self.DeleteOne = ReturnDocument, UpdateOne, DeleteOne
+        self.max_writers = WORKERS
+        self.client = MongoClient(location, serverSelectionTimeoutMS=5000)
+        self.client.admin.command('ping')
+        store = MongoStore(self.client[MONGODB_DB_NAME])
+        self.collection = store.validations
+        self.versions = store.versions
+        self.counts = store.counts
+        self.keys = store.keys
+        run(store.setup())
+
+    def iter_groups(self) -> Iterator[VideoGroup]:
+        docs = self.collection.find({}, {"_id": 0}).sort([("video_id", 1), ("timestamp", 1)]).batch_size(1000)
+        for video_id, group in groupby(docs, key=lambda doc: doc["video_id"]):
+            yield video_id, [{k: v for k, v in doc.items() if k != "video_id"} for doc in group]
+
+    def change_token(self):
+        version = self.versions.find_one({"_id": "*"})
+        return (version["version"] if version else 0, self.collection.estimated_document_count())
+
+    def begin_copy(self):
+        self.collection.delete_many({})
+        self.counts.delete_many({})
+        self.keys.delete_many({})
+
+    def write_groups(self, groups: List[VideoGroup]):
+        docs = [{**v, "video_id": video_id} for video_id, validations in groups for v in validations]
+        if docs:
+            self.collection.insert_many(docs, ordered=False)
+        self._set_counts(groups)
+
+    def _set_counts(self, groups: List[VideoGroup]):
+        # Per-video counters read by validation_api_mongodb_async.py
+        ops = [
+            self.UpdateOne({"_id": video_id}, {"$set": {"count": len(validations)}}, upsert=True)
+            if validations else self.DeleteOne({"_id": video_id})
+            for video_id, validations in groups
+        ]
+        if ops:
+            self.counts.bulk_write(ops, ordered=False)
+
+    def finish(self):
+        pass
+
+    def replace_videos(self, groups: List[VideoGroup]):
+        video_ids = [video_id for video_id, _ in groups]
+        self.collection.delete_many({"video_id": {"$in": video_ids}})
+        self.keys.delete_many({"video_id": {"$in": video_ids}})
+        self.write_groups(groups)
+
+    def invalidate(self, video_ids=None):
+        """Bump the stored versions (see SQLiteBackend.invalidate)."""
+        version = self.versions.find_one_and_update(
+            {"_id": "*"}, {"$inc": {"version": 1}}, upsert=True,
+            return_document=self.ReturnDocument.AFTER
+        )["version"]
+        if video_ids is None:
+            self.versions.update_many({}, {"$max": {"version": version}})
+            video_ids = (item["_id"] for item in self.collection.aggregate([{"$group": {"_id": "$video_id"}}]))
+        batch = []
+        for video_id in video_ids:
+            batch.append(self.UpdateOne({"_id": f"video:{video_id}"}, {"$max": {"version": version}}, upsert=True))
+            if len(batch) >= BATCH_SIZE:
+                self.versions.bulk_write(batch, ordered=False)
+                batch = []
+        if batch:
+            self.versions.bulk_write(batch, ordered=False)
+
+    def close(self):
+        self.client.close()
+
+
+BACKENDS = {
+    "json": JSONBackend,
+    "tinydb": TinyDBBackend,
+    "sqlite": SQLiteBackend,
+    "mongodb": MongoDBBackend,
+}
+
+
+def open_backend(spec: str):
+    """Open a backend from KIND[:LOCATION] (a bare mongodb:// URI also works)."""
+    if spec.startswith(("mongodb://", "mongodb+srv://")):
+        kind, location = "mongodb", spec
+    else:
+        kind, _, location = spec.partition(":")
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown backend '{kind}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[kind](location or DEFAULT_LOCATIONS[kind])
+
+
+class BatchPipeline:
+    """Writes batches on a thread pool with a bounded number in flight."""
+
+    def __init__(self, write, workers: int):
+        self.write = write
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.in_flight = deque()
+
+    def submit(self, batch: List[VideoGroup]):
+        while len(self.in_flight) >= self.workers * 2:
+            self.in_flight.popleft().result()
+        self.in_flight.append(self.executor.submit(self.write, batch))
+
+    def drain(self):
+        while self.in_flight:
+            self.in_flight.popleft().result()
+
+    def close(self):
+        try:
+            self.drain()
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def summarize(backend) -> Dict[str, int]:
+    videos = records = checksum = 0
+    for video_id, validations in backend.iter_groups():
+        count, digest = group_digest(video_id, validations)
+        videos += 1
+        records += count
+        checksum = (checksum + digest) % _CHECKSUM_MOD
+    return {"videos": videos, "records": records, "checksum": checksum}
+
+
+def copy(source, dest, batch_size: int) -> Dict[str, Tuple[int, int]]:
+    """Full copy; returns the per-video digests of what was written."""
+    digests = {}
+    pipeline = BatchPipeline(dest.write_groups, min(WORKERS, dest.max_writers))
+    started = time.monotonic()
+    written = 0
+    batch, batch_records = [], 0
+    dest.begin_copy()
+    try:
+        for video_id, validations in source.iter_groups():
+            digests[video_id] = group_digest(video_id, validations)
+            batch.append((video_id, validations))
+            batch_records += len(validations)
+            if batch_records >= batch_size:
+                pipeline.submit(batch)
+                written += batch_records
+                batch, batch_records = [], 0
+                elapsed = time.monotonic() - started
+                print(f"  {written} records, {written / elapsed if elapsed else 0:.0f} records/sec")
+        if batch:
+            pipeline.submit(batch)
+            written += batch_records
+        pipeline.drain()
+        dest.finish()
+    finally:
+        pipeline.close()
+    dest.invalidate()
+    elapsed = time.monotonic() - started
+    print(f"✓ Copied {len(digests)} videos / {written} records in {elapsed:.1f}s "
+          f"({written / elapsed if elapsed else 0:.0f} records/sec)")
+    return digests
+
+
+def sync_changes(source, dest, digests: Dict[str, Tuple[int, int]], batch_size: int) -> Tuple[int, int]:
+    """One follow pass: replace changed videos, delete vanished ones. Returns (changed, deleted)."""
+    seen = set()
+    changed = []
+    pending, pending_records = [], 0
+    for video_id, validations in source.iter_groups():
+        seen.add(video_id)
+        digest = group_digest(video_id, validations)
+        if digests.get(video_id) != digest:
+            digests[video_id] = digest
+            changed.append(video_id)
+            pending.append((video_id, validations))
+            pending_records += len(validations)
+            if pending_records >= batch_size:
+                dest.replace_videos(pending)
+                pending, pending_records = [], 0
+    deleted = [video_id for video_id in digests if video_id not in seen]
+    for video_id in deleted:
+        del digests[video_id]
+    pending.extend((video_id, []) for video_id in deleted)
+    if pending:
+        dest.replace_videos(pending)
+    if changed or deleted:
+        dest.invalidate(changed + deleted)
+    return len(changed), len(deleted)
+
+
+def follow(source, dest, digests, batch_size: int, interval: float):
+    print(f"\nFollowing source (every {interval}s); Ctrl+C to stop...")
+    token = source.change_token()
+    try:
+        while True:
+            time.sleep(interval)
+            current = source.change_token()
+            if current == token:
+                continue
+            # Take the token before reading so a write during the pass triggers another
+            token = current
+            started = time.monotonic()
+            changed, deleted = sync_changes(source, dest, digests, batch_size)
+            if changed or deleted:
+                print(f"✓ Synced {changed} changed, {deleted} deleted videos "
+                      f"({(time.monotonic() - started) * 1000:.0f} ms)")
+    except KeyboardInterrupt:
+        print("\nStopped following")
+
+
+def verify(source, dest) -> bool:
+    print("\nVerifying...")
+    expected, actual = summarize(source), summarize(dest)
+    for key in ("videos", "records", "checksum"):
+        mark = "✓" if expected[key] == actual[key] else "✗"
+        print(f"  {mark} {key}: source {expected[key]}, destination {actual[key]}")
+    return expected == actual
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Copy or replicate validations between storage backends")
+    parser.add_argument("source", help="KIND[:LOCATION], e.g. json, tinydb:data/db.json, mongodb://host/")
+    parser.add_argument("dest", help="KIND[:LOCATION]")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"records per write batch (default {BATCH_SIZE})")
+    parser.add_argument("--follow", action="store_true", help="keep syncing changes after the copy")
+    parser.add_argument("--interval", type=float, default=FOLLOW_INTERVAL,
+                        help=f"seconds between source polls with --follow (default {FOLLOW_INTERVAL})")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="replace the destination's data if it is not empty")
+    args = parser.parse_args()
+
+    if args.source == args.dest:
+        print("✗ Source and destination are the same")
+        return 2
+    try:
+        source = open_backend(args.source)
+        dest = open_backend(args.dest)
+    except Exception as e:
+        print(f"✗ {e}")
+        return 2
+
+    try:
+        if not args.overwrite and next(dest.iter_groups(), None) is not None:
+            print(f"✗ Destination {args.dest} already holds validations; pass --overwrite to replace them")
+            return 2
+        print(f"Copying {args.source} → {args.dest} (batch size {args.batch_size})...")
+        digests = copy(source, dest, args.batch_size)
+        if args.follow:
+            follow(source, dest, digests, args.batch_size, args.interval)
+        return 0 if verify(source, dest) else 1
+    finally:
+        source.close()
+        dest.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Shared fixtures. The API modules read their configuration (DB_PATH,
+STORAGE_ENGINE, BATCH_MAX_ITEMS, ...) from the environment when imported, so
+every test imports a fresh copy pointed at its own temporary files.
+"""
+
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+API_MODULES = {
+    "json": "validation_api",
+    "sqlite": "validation_api_sqlite",
+    "tinydb": "validation_api_tinydb",
+    "mongodb": "validation_api_mongodb",
+    "mongodb_async": "validation_api_mongodb_async",
+}
+# Deployment markers that switch the APIs to /tmp paths or multi-worker mode
+DEPLOYMENT_ENV = ("PORT", "RENDER", "RAILWAY_ENVIRONMENT", "DYNO", "WEB_CONCURRENCY", "MULTI_WORKER")
+
+
+@pytest.fixture
+def fresh_import():
+    """fresh_import(name) imports `name` anew; the copy is dropped after the test."""
+    loaded = []
+
+    def load(name):
+        sys.modules.pop(name, None)
+        loaded.append(name)
+        return importlib.import_module(name)
+
+    yield load
+    for name in loaded:
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """A mongomock client (tests using it are skipped without mongomock)."""
+    mongomock = pytest.importorskip("mongomock")
+    from mongo_standin import patch_bulk_updates
+    patch_bulk_updates(monkeypatch)
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def start_api(tmp_path, monkeypatch, fresh_import, request):
+    """
+    start_api(backend, **env) -> (module, TestClient) for a freshly imported
+    API on the files in tmp_path. Starting the same backend again (e.g. after
+    stopping the first client) reopens the same files. MongoDB backends run on
+    the `mongo_client` fixture's in-process database.
+    """
+    clients = []
+
+    def start(backend, **env):
+        for name in DEPLOYMENT_ENV:
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setenv("DB_PATH", str(tmp_path / "validations.json"))
+        monkeypatch.setenv("SQLITE_DB_PATH", str(tmp_path / "validations.sqlite3"))
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        module = fresh_import(API_MODULES[backend])
+        if backend == "mongodb":
+            assert module.connect_mongodb(request.getfixturevalue("mongo_client"))
+        elif backend == "mongodb_async":
+            from mongo_standin import AsyncMongomockClient
+            standin = AsyncMongomockClient(request.getfixturevalue("mongo_client"))
+            assert asyncio.run(module.connect_mongodb(standin))
+        client = TestClient(module.app)
+        client.__enter__()
+        clients.append(client)
+        return module, client
+
+    yield start
+    for client in reversed(clients):
+        client.__exit__(None, None, None)
+
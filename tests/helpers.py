@@ -0,0 +1,7 @@
+"""Request bodies shared by the tests."""
+
+
+def validation(video_id, timestamp="2024-01-01T00:00:00", status="correct", feedback="", validator="tester"):
+    """A POST /api/validations body."""
+    return {"video_id": video_id, "validation": {"timestamp": timestamp, "status": status,
+                                                 "feedback": feedback, "validator": validator}}
@@ -0,0 +1,80 @@
+"""
+In-process MongoDB for the tests: mongomock, and an asyncio wrapper around it
+with the part of the AsyncMongoClient API validation_api_mongodb_async.py uses.
+"""
+
+import mongomock
+from mongomock.collection import BulkOperationBuilder
+
+
+def patch_bulk_updates(monkeypatch):
+    """mongomock 4.x rejects the `sort` newer pymongo passes for each UpdateOne in bulk_write()."""
+    add_update = BulkOperationBuilder.add_update
+    monkeypatch.setattr(BulkOperationBuilder, "add_update",
+                        lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs))
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._cursor:
+            yield doc
+
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline, **kwargs):
+        return AsyncCursor(self._collection.aggregate(pipeline, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncDatabase:
+    def __init__(self, db):
+        self._db = db
+
+    def __getitem__(self, name):
+        return AsyncCollection(self._db[name])
+
+    async def command(self, *args, **kwargs):
+        return self._db.command(*args, **kwargs)
+
+
+class AsyncMongomockClient:
+    """`client` (a mongomock.MongoClient) behind the AsyncMongoClient interface."""
+
+    def __init__(self, client=None):
+        self.sync = client or mongomock.MongoClient()
+        self.admin = AsyncDatabase(self.sync.admin)
+
+    def __getitem__(self, name):
+        return AsyncDatabase(self.sync[name])
+
+    async def close(self):
+        pass
@@ -0,0 +1,47 @@
+"""POST /api/validations/batch on every backend."""
+
+import pytest
+
+import validation_batch
+from helpers import validation
+
+BACKENDS = ["json", "sqlite", "tinydb", "mongodb", "mongodb_async"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_batch_saves_every_item(start_api, backend):
+    _, client = start_api(backend)
+    items = [validation(f"v{n % 3}", timestamp=f"2024-01-{n + 1:02d}T00:00:00") for n in range(7)]
+    body = client.post("/api/validations/batch", json=items).json()
+    assert body["success"] is True and (body["saved"], body["replayed"], body["failed"]) == (7, 0, 0)
+    assert [r["index"] for r in body["results"]] == list(range(7))
+    assert [r["video_id"] for r in body["results"]] == [item["video_id"] for item in items]
+    assert body["totals"] == {"v0": 3, "v1": 2, "v2": 2}
+    assert [r["total_validations"] for r in body["results"] if r["video_id"] == "v0"] == [1, 2, 3]
+    assert len(client.get("/api/validations/v0").json()["validations"]) == 3
+    assert client.get("/api/stats").json()["total_videos"] == 3
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_invalid_item_writes_nothing(start_api, backend):
+    _, client = start_api(backend)
+    items = [validation("v1"), {"video_id": "v2", "validation": {"status": "correct"}}]
+    assert client.post("/api/validations/batch", json=items).status_code == 422
+    assert client.get("/api/validations").json()["validations"] == {}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_oversized_batch_is_refused(start_api, backend, monkeypatch):
+    _, client = start_api(backend)
+    monkeypatch.setattr(validation_batch, "BATCH_MAX_ITEMS", 2)
+    items = [validation(f"v{n}") for n in range(3)]
+    response = client.post("/api/validations/batch", json=items)
+    assert response.status_code == 413 and "At most 2" in response.json()["detail"]
+    assert client.get("/api/validations").json()["validations"] == {}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_empty_batch(start_api, backend):
+    _, client = start_api(backend)
+    body = client.post("/api/validations/batch", json=[]).json()
+    assert body["success"] is True and body["saved"] == 0 and body["results"] == [] and body["totals"] == {}
@@ -0,0 +1,112 @@
+"""GET /api/bootstrap (validation_bootstrap.py) on the TinyDB API."""
+
+import json
+import os
+import time
+
+import pytest
+
+import validation_bootstrap
+from helpers import validation
+from validation_bootstrap import AnnotationFile, VideoUrlResolver
+
+
+def write_annotations(path, video_ids):
+    path.write_text(json.dumps({"annotations": [{"video_id": video_id, "segments": []} for video_id in video_ids]}))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """The URLs probed; only URLs ending in "ok" answer."""
+    probed = []
+
+    def probe(url):
+        probed.append(url)
+        return url.endswith("ok")
+
+    monkeypatch.setattr(validation_bootstrap, "probe_url", probe)
+    return probed
+
+
+@pytest.fixture
+def annotations(tmp_path, monkeypatch):
+    path = tmp_path / "annotations.json"
+    write_annotations(path, ["v1", "v2"])
+    monkeypatch.setenv("ANNOTATIONS_PATH", str(path))
+    return path
+
+
+def test_annotation_file_is_reread_only_when_it_changes(tmp_path):
+    path = tmp_path / "annotations.json"
+    write_annotations(path, ["v1"])
+    annotation_file = AnnotationFile([tmp_path / "missing.json", path])
+    stamp, data = annotation_file.load()
+    assert annotation_file.load() == (stamp, data) and annotation_file.load()[1] is data
+    write_annotations(path, ["v1", "v2"])
+    os.utime(path, ns=(stamp[1] + 10**9, stamp[1] + 10**9))
+    new_stamp, new_data = annotation_file.load()
+    assert new_stamp != stamp and len(new_data["annotations"]) == 2
+    assert AnnotationFile([tmp_path / "missing.json"]).load() == (None, None)
+
+
+def test_resolver_serves_the_fallback_until_probed(probes):
+    resolver = VideoUrlResolver(lambda video_id, kind: [f"https://a/{video_id}-{kind}", f"https://b/{video_id}-ok"],
+                                lambda video_id, kind: f"/api/videos/{video_id}/{kind}", ttl=60, probe=True)
+    try:
+        first = resolver.urls(["v1"])
+        assert first["v1"]["regular"] in ("/api/videos/v1/regular", "https://b/v1-ok")
+        wait_for(lambda: resolver.stats()["resolved"] == 2)
+        assert resolver.urls(["v1"]) == {"v1": {"annotation": "https://b/v1-ok", "regular": "https://b/v1-ok"}}
+        assert resolver.generation == 2
+        assert sorted(probes) == sorted(["https://a/v1-annotation", "https://b/v1-ok",
+                                         "https://a/v1-regular", "https://b/v1-ok"])
+    finally:
+        resolver.close()
+
+
+def test_resolver_without_probes():
+    resolver = VideoUrlResolver(lambda video_id, kind: ["https://a/ok"], lambda video_id, kind: "/fallback",
+                                probe=False)
+    assert resolver.urls(["v1"]) == {"v1": {"annotation": "/fallback", "regular": "/fallback"}}
+    assert resolver.stats()["pending"] == 0
+
+
+def test_bootstrap_bundles_the_page_data(start_api, probes, annotations):
+    _, client = start_api("tinydb")
+    client.post("/api/validations", json=validation("v1", status="incorrect"))
+    body = client.get("/api/bootstrap").json()
+    assert [a["video_id"] for a in body["annotations"]["annotations"]] == ["v1", "v2"]
+    assert body["statuses"]["v1"]["status"] == "incorrect" and body["statuses"]["v2"]["status"] == "pending"
+    assert set(body["videos"]["v1"]) == {"annotation", "regular"}
+    assert body["stats"]["total_videos"] == 1
+    assert body["version"] == client.get("/api/validations/changes").json()["version"]
+
+
+def test_bootstrap_is_revalidated(start_api, probes, annotations):
+    module, client = start_api("tinydb")
+    wait_for(lambda: module.video_urls.stats()["pending"] == 0)
+    tag = client.get("/api/bootstrap").headers["ETag"]
+    assert client.get("/api/bootstrap", headers={"If-None-Match": tag}).status_code == 304
+
+    client.post("/api/validations", json=validation("v2"))
+    written = client.get("/api/bootstrap")
+    assert written.headers["ETag"] != tag and written.json()["statuses"]["v2"]["status"] == "correct"
+
+    stamp = os.stat(annotations).st_mtime_ns + 10**9
+    write_annotations(annotations, ["v1", "v2", "v3"])
+    os.utime(annotations, ns=(stamp, stamp))
+    changed = client.get("/api/bootstrap", headers={"If-None-Match": written.headers["ETag"]})
+    assert changed.status_code == 200 and "v3" in changed.json()["statuses"]
+
+
+def test_bootstrap_without_annotations(start_api, probes, tmp_path, monkeypatch):
+    monkeypatch.setenv("ANNOTATIONS_PATH", str(tmp_path / "missing.json"))
+    _, client = start_api("tinydb")
+    assert client.get("/api/bootstrap").status_code == 404
@@ -0,0 +1,77 @@
+"""Delta sync (GET /api/validations/changes) on every backend."""
+
+import pytest
+
+from helpers import validation
+
+BACKENDS = ["json", "sqlite", "tinydb", "mongodb", "mongodb_async"]
+
+
+def limit_retention(backend, module, monkeypatch, retention):
+    """Keep only the last `retention` changes (or versions, where the log is stored)."""
+    if backend == "sqlite":
+        monkeypatch.setattr(module, "CHANGE_LOG_RETENTION", retention)
+    elif backend.startswith("mongodb"):
+        import validation_mongo
+        monkeypatch.setattr(validation_mongo, "CHANGE_LOG_RETENTION", retention)
+    else:
+        module.change_log.retention = retention
+
+
+def apply(validations, changes):
+    """A client's copy after applying a delta."""
+    validations = {video_id: list(items) for video_id, items in validations.items()}
+    for change in changes:
+        if change["op"] == "insert":
+            validations.setdefault(change["video_id"], []).append(change["validation"])
+        else:
+            validations.pop(change["video_id"], None)
+    return validations
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_delta_brings_a_copy_up_to_date(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    client.post("/api/validations", json=validation("v2"))
+    full = client.get("/api/validations/changes").json()
+    assert full["full"] is True and sorted(full["validations"]) == ["v1", "v2"]
+
+    client.post("/api/validations", json=validation("v1", timestamp="2024-01-02T00:00:00", status="incorrect"))
+    client.post("/api/validations/batch", json=[validation("v3"), validation("v4")])
+    client.delete("/api/validations/v2")
+    delta = client.get("/api/validations/changes", params={"since": full["version"]}).json()
+    assert delta["full"] is False
+    assert [(c["op"], c["video_id"]) for c in delta["changes"]] == [
+        ("insert", "v1"), ("insert", "v3"), ("insert", "v4"), ("delete", "v2")]
+    assert apply(full["validations"], delta["changes"]) == client.get("/api/validations").json()["validations"]
+
+    assert client.get("/api/validations/changes", params={"since": delta["version"]}).json()["changes"] == []
+    assert delta["version"] == client.get("/api/validations/changes").json()["version"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_unknown_versions_get_a_resync(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    current = client.get("/api/validations/changes").json()["version"]
+    for since in ("not-a-version", "999999", "-1"):
+        response = client.get("/api/validations/changes", params={"since": since})
+        assert response.status_code == 410
+        assert response.json()["resync"] is True and response.json()["version"] == current
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_versions_past_retention_get_a_resync(start_api, backend, monkeypatch):
+    module, client = start_api(backend)
+    limit_retention(backend, module, monkeypatch, 2)
+    client.post("/api/validations", json=validation("v0"))
+    old = client.get("/api/validations/changes").json()["version"]
+    # MongoDB prunes its log every 100 versions
+    client.post("/api/validations/batch", json=[validation(f"b{n}") for n in range(100)])
+    recent = client.get("/api/validations/changes").json()["version"]
+    client.post("/api/validations", json=validation("v5"))
+
+    assert client.get("/api/validations/changes", params={"since": old}).status_code == 410
+    delta = client.get("/api/validations/changes", params={"since": recent}).json()
+    assert [c["video_id"] for c in delta["changes"]] == ["v5"]
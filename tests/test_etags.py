@@ -0,0 +1,82 @@
+"""ETag / If-None-Match on the read endpoints of every backend."""
+
+import pytest
+
+from helpers import validation
+
+BACKENDS = ["json", "sqlite", "tinydb", "mongodb", "mongodb_async"]
+GLOBAL_READS = ["/api/validations", "/api/stats"]
+VIDEO_READS = ["/api/validations/v1", "/api/status/v1"]
+
+
+def etag(client, path, **kwargs):
+    response = client.get(path, **kwargs)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+def revalidate(client, path, tag):
+    return client.get(path, headers={"If-None-Match": tag}).status_code
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_unchanged_reads_answer_304(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    for path in GLOBAL_READS + VIDEO_READS:
+        tag = etag(client, path)
+        assert revalidate(client, path, tag) == 304
+        assert revalidate(client, path, f"W/{tag}") == 304
+        assert client.get(path, headers={"If-None-Match": f'"other", {tag}'}).status_code == 304
+        assert revalidate(client, path, '"other"') == 200
+        assert revalidate(client, path, "*") == 304
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_writes_change_the_tags_they_affect(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    client.post("/api/validations", json=validation("v2"))
+    before = {path: etag(client, path) for path in GLOBAL_READS + VIDEO_READS + ["/api/validations/v2"]}
+
+    client.post("/api/validations", json=validation("v1", timestamp="2024-01-02T00:00:00"))
+    for path in GLOBAL_READS + VIDEO_READS:
+        assert revalidate(client, path, before[path]) == 200
+    # Another video's tag is per video and survives the write
+    assert revalidate(client, "/api/validations/v2", before["/api/validations/v2"]) == 304
+
+    after = etag(client, "/api/validations/v1")
+    client.delete("/api/validations/v1")
+    assert revalidate(client, "/api/validations/v1", after) == 200
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_ndjson_has_its_own_tag(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    json_tag = etag(client, "/api/validations")
+    ndjson_tag = etag(client, "/api/validations", params={"format": "ndjson"})
+    assert ndjson_tag != json_tag
+    assert client.get("/api/validations", params={"format": "ndjson"},
+                      headers={"If-None-Match": json_tag}).status_code == 200
+    assert client.get("/api/validations", params={"format": "ndjson"},
+                      headers={"If-None-Match": ndjson_tag}).status_code == 304
+
+
+@pytest.mark.parametrize("backend", ["json", "tinydb"])
+def test_in_process_tags_do_not_survive_a_restart(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    tag = etag(client, "/api/validations")
+    client.__exit__(None, None, None)
+    _, client = start_api(backend)
+    assert revalidate(client, "/api/validations", tag) == 200
+
+
+def test_sqlite_tags_survive_a_restart(start_api):
+    _, client = start_api("sqlite")
+    client.post("/api/validations", json=validation("v1"))
+    tag = etag(client, "/api/validations")
+    client.__exit__(None, None, None)
+    _, client = start_api("sqlite")
+    assert revalidate(client, "/api/validations", tag) == 304
@@ -0,0 +1,104 @@
+"""Server-Sent Events (validation_events.py) and the TinyDB API's /api/events."""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from helpers import validation
+from validation_events import EventBroadcaster, format_sse
+
+
+def parse_sse(message: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in message.decode("utf-8").strip().split("\n"))
+    fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+def test_format_sse():
+    assert parse_sse(format_sse("validation", {"video_id": "v1"}, "7")) == {
+        "id": "7", "event": "validation", "data": {"video_id": "v1"}}
+    assert format_sse("ping", {}).endswith(b"\n\n")
+
+
+def test_events_published_from_other_threads_reach_the_stream():
+    broadcaster = EventBroadcaster(keepalive=0.01)
+
+    async def scenario():
+        subscriber = broadcaster.subscribe()
+        stream = broadcaster.stream(subscriber)
+        assert await stream.__anext__() == b"retry: 3000\n\n"
+        assert await stream.__anext__() == b": keepalive\n\n"
+        writer = threading.Thread(target=broadcaster.publish, args=("validation", {"n": 1}, "1"))
+        writer.start()
+        writer.join()
+        message = await stream.__anext__()
+        assert broadcaster.metrics()["subscribers"] == 1
+        await stream.aclose()
+        return message
+
+    assert parse_sse(asyncio.run(scenario()))["data"] == {"n": 1}
+    assert broadcaster.metrics() == {"subscribers": 0, "published": 1, "dropped_subscribers": 0, "queue_size": 100}
+
+
+@pytest.mark.parametrize("queue_size", [1, 3])
+def test_slow_consumer_is_dropped(queue_size):
+    broadcaster = EventBroadcaster(queue_size=queue_size)
+
+    async def scenario():
+        subscriber = broadcaster.subscribe()
+        for n in range(queue_size + 2):
+            broadcaster.publish("validation", {"n": n})
+        await asyncio.sleep(0)  # let the loop run the queued offers
+
+        async def collect():
+            return [message async for message in broadcaster.stream(subscriber)]
+        return await asyncio.wait_for(collect(), 5)
+
+    messages = asyncio.run(scenario())
+    assert messages[0].startswith(b"retry:")
+    assert [parse_sse(m)["event"] for m in messages[1:]] == ["dropped"]
+    assert broadcaster.metrics()["dropped_subscribers"] == 1
+
+
+def test_a_full_queue_still_delivers_its_events():
+    broadcaster = EventBroadcaster(queue_size=1, keepalive=0.01)
+
+    async def scenario():
+        subscriber = broadcaster.subscribe()
+        broadcaster.publish("validation", {"n": 0})
+        await asyncio.sleep(0)
+        stream = broadcaster.stream(subscriber)
+        received = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return received
+
+    assert [parse_sse(m)["data"] for m in asyncio.run(scenario())[1:]] == [{"n": 0}]
+    assert broadcaster.metrics()["dropped_subscribers"] == 0
+
+
+def test_api_publishes_each_write(start_api):
+    module, client = start_api("tinydb")
+
+    async def scenario():
+        subscriber = module.events.subscribe()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: client.post("/api/validations", json=validation("v1")))
+        await loop.run_in_executor(None, lambda: client.post("/api/validations", json=validation(
+            "v1", timestamp="2024-01-02T00:00:00", status="incorrect")))
+        await loop.run_in_executor(None, lambda: client.delete("/api/validations/v1"))
+        messages = [await asyncio.wait_for(subscriber.queue.get(), 5) for _ in range(3)]
+        module.events.unsubscribe(subscriber)
+        return [parse_sse(message) for message in messages]
+
+    saved, updated, deleted = asyncio.run(scenario())
+    assert saved["event"] == "validation"
+    assert saved["data"]["status"] == "correct" and saved["data"]["total_validations"] == 1
+    assert updated["data"]["status"] == "incorrect" and updated["data"]["total_validations"] == 2
+    assert updated["data"]["stats"]["total_videos"] == 1
+    assert deleted["data"]["status"] == "pending" and deleted["data"]["total_validations"] == 0
+
+    # The event id is the delta-sync token of the write
+    delta = client.get("/api/validations/changes", params={"since": updated["id"]}).json()
+    assert [c["op"] for c in delta["changes"]] == ["delete"] and delta["version"] == deleted["id"]
@@ -0,0 +1,108 @@
+"""Columnar export (validation_export.py): GET /api/export and `manage_validation_db.py export`."""
+
+import csv
+import io
+
+import pytest
+
+from helpers import validation
+from validation_export import EXPORT_COLUMNS, export_chunks
+
+EXPORT_BACKENDS = ["json", "sqlite", "tinydb", "mongodb", "mongodb_async"]
+
+ROWS = [
+    ("v1", "2024-01-01T00:00:00.000Z", "correct", "alice", ""),
+    ("v1", "2024-01-02T00:00:00.000Z", "incorrect", "bob", 'wrong hand, "again"'),
+    ("v2", "2024-01-03T00:00:00.000Z", "correct", "bob", "ü"),
+]
+
+
+def read_csv(body: bytes):
+    return [tuple(row) for row in csv.reader(io.StringIO(body.decode("utf-8")))]
+
+
+def read_arrow(body: bytes):
+    pa = pytest.importorskip("pyarrow")
+    return pa.ipc.open_stream(body).read_all()
+
+
+def read_parquet(body: bytes):
+    pq = pytest.importorskip("pyarrow.parquet")
+    return pq.read_table(io.BytesIO(body))
+
+
+@pytest.fixture(params=EXPORT_BACKENDS)
+def client(request, start_api):
+    _, client = start_api(request.param)
+    for video_id, timestamp, status, validator, feedback in ROWS:
+        client.post("/api/validations", json=validation(video_id, timestamp, status, feedback, validator))
+    return client
+
+
+def test_csv_in_small_batches():
+    chunks = list(export_chunks(iter(ROWS), "csv", batch_size=2))
+    assert len(chunks) == 2
+    assert read_csv(b"".join(chunks)) == [EXPORT_COLUMNS] + ROWS
+
+
+@pytest.mark.parametrize("format, read", [("arrow", read_arrow), ("parquet", read_parquet)])
+def test_columnar_formats_in_small_batches(format, read):
+    table = read(b"".join(export_chunks(iter(ROWS), format, batch_size=2)))
+    assert table.column_names == list(EXPORT_COLUMNS)
+    assert table.column("video_id").to_pylist() == ["v1", "v1", "v2"]
+    assert table.column("status").to_pylist() == ["correct", "incorrect", "correct"]
+    assert [ts.isoformat() for ts in table.column("timestamp").to_pylist()][0] == "2024-01-01T00:00:00+00:00"
+    assert table.column("feedback").to_pylist()[1] == 'wrong hand, "again"'
+
+
+def test_api_csv(client):
+    response = client.get("/api/export")
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="validations.csv"' in response.headers["content-disposition"]
+    assert sorted(read_csv(response.content)[1:]) == ROWS
+
+
+def test_api_filters(client):
+    by_bob = read_csv(client.get("/api/export", params={"validator": "bob"}).content)[1:]
+    assert sorted(by_bob) == ROWS[1:]
+    ranged = read_csv(client.get("/api/export", params={"since": "2024-01-02", "until": "2024-01-02T23"}).content)
+    assert ranged[1:] == [ROWS[1]]
+    assert read_csv(client.get("/api/export", params={"video_id": "v2", "status": "correct"}).content)[1:] == [ROWS[2]]
+
+
+@pytest.mark.parametrize("format, read", [("arrow", read_arrow), ("parquet", read_parquet)])
+def test_api_columnar(client, format, read):
+    table = read(client.get("/api/export", params={"format": format}).content)
+    assert sorted(table.column("validator").to_pylist()) == ["alice", "bob", "bob"]
+
+
+def test_api_rejects_unknown_format(client):
+    assert client.get("/api/export", params={"format": "xlsx"}).status_code == 400
+
+
+def test_cli_export(start_api, fresh_import, tmp_path, monkeypatch, capsys):
+    module, client = start_api("tinydb")
+    for video_id, timestamp, status, validator, feedback in ROWS:
+        client.post("/api/validations", json=validation(video_id, timestamp, status, feedback, validator))
+    client.__exit__(None, None, None)
+
+    monkeypatch.setenv("DB_PATH", str(module.DB_FILE))
+    manage = fresh_import("manage_validation_db")
+    output = tmp_path / "bob.csv"
+    manage.export_validations(["csv", str(output), "--validator", "bob"])
+    assert sorted(read_csv(output.read_bytes())[1:]) == ROWS[1:]
+    assert "Exported 2 validation(s)" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("backend", EXPORT_BACKENDS)
+def test_time_range_matches_the_listing(start_api, backend):
+    _, client = start_api(backend)
+    spellings = {"a": "2024-01-02T00:00:00.000Z", "b": "2024-01-02T00:00:00", "c": "2024-01-02T00:00:00+00:00",
+                 "d": "2024-01-02T01:00:00+02:00", "e": "2024-01-03T00:00:00Z", "f": "2024-01-01T23:59:59.999Z"}
+    for video_id, timestamp in spellings.items():
+        client.post("/api/validations", json=validation(video_id, timestamp))
+    params = {"since": "2024-01-02T00:00:00Z", "until": "2024-01-03T00:00:00.000Z"}
+    exported = sorted(row[0] for row in read_csv(client.get("/api/export", params=params).content)[1:])
+    listed = client.get("/api/validations", params={"from": params["since"], "to": params["until"]}).json()
+    assert exported == sorted(listed["validations"]) == ["a", "b", "c", "e"]
+    assert client.get("/api/export", params={"since": "yesterday"}).status_code == 400
@@ -0,0 +1,120 @@
+"""Group-commit write batching (validation_group_commit.py) and the TinyDB API's use of it."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from helpers import validation
+from validation_group_commit import GroupCommitter
+
+
+class Recorder:
+    """write_batch that records each batch; holds the writer thread until released."""
+
+    def __init__(self):
+        self.batches = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, docs):
+        self.entered.set()
+        self.release.wait(5)
+        self.batches.append(list(docs))
+        return [doc * 10 if doc >= 0 else ValueError(doc) for doc in docs]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+@pytest.fixture
+def committer(recorder):
+    committer = GroupCommitter(recorder, max_batch=8, max_delay=0.05)
+    committer.start()
+    yield committer
+    committer.stop()
+
+
+def test_writes_queued_during_a_write_share_the_next_batch(committer, recorder):
+    recorder.release.clear()
+    with ThreadPoolExecutor(8) as pool:
+        first = pool.submit(committer.submit, 0)
+        recorder.entered.wait(5)
+        queued = [pool.submit(committer.submit, n) for n in range(1, 6)]
+        wait_for(lambda: committer.metrics()["queue_depth"] == 5)
+        recorder.release.set()
+        assert first.result() == 0
+        assert [f.result() for f in queued] == [10, 20, 30, 40, 50]
+    assert [len(batch) for batch in recorder.batches] == [1, 5]
+    metrics = committer.metrics()
+    assert metrics["batches"] == 2 and metrics["records"] == 6 and metrics["max_batch_size"] == 5
+
+
+def test_batches_are_capped(committer, recorder):
+    recorder.release.clear()
+    with ThreadPoolExecutor(20) as pool:
+        first = pool.submit(committer.submit, 0)
+        recorder.entered.wait(5)
+        queued = [pool.submit(committer.submit, n) for n in range(1, 20)]
+        wait_for(lambda: committer.metrics()["queue_depth"] == 19)
+        recorder.release.set()
+        assert first.result() == 0
+        assert sorted(f.result() for f in queued) == [n * 10 for n in range(1, 20)]
+    assert max(len(batch) for batch in recorder.batches) == 8
+
+
+def test_submit_many_lands_in_one_batch(committer, recorder):
+    results = committer.submit_many([1, -2, 3])
+    assert results[0] == 10 and isinstance(results[1], ValueError) and results[2] == 30
+    assert [1, -2, 3] in recorder.batches
+    assert committer.submit_many([]) == []
+
+
+def test_document_and_batch_errors(committer):
+    with pytest.raises(ValueError):
+        committer.submit(-1)
+    assert committer.submit(2) == 20
+    committer.write_batch = lambda docs: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        committer.submit(3)
+    assert committer.metrics()["errors"] == 1
+
+
+def test_stop_flushes_the_queue(recorder):
+    committer = GroupCommitter(recorder, max_delay=0)
+    committer.start()
+    recorder.release.clear()
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(committer.submit, 0)]
+        recorder.entered.wait(5)
+        futures += [pool.submit(committer.submit, n) for n in range(1, 4)]
+        wait_for(lambda: committer.metrics()["queue_depth"] == 3)
+        recorder.release.set()
+        committer.stop()
+        assert [f.result() for f in futures] == [0, 10, 20, 30]
+
+
+def test_api_saves_concurrent_posts(start_api):
+    _, client = start_api("tinydb", GROUP_COMMIT=1, GROUP_COMMIT_MAX_DELAY_MS=20)
+
+    def save(n):
+        return client.post("/api/validations", json=validation(f"v{n % 4}", timestamp=f"2024-01-{n + 1:02d}T00:00:00"))
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(save, range(16)))
+    assert all(r.status_code == 200 for r in responses)
+    metrics = client.get("/api/metrics/group-commit").json()
+    assert metrics["enabled"] is True and metrics["records"] == 16
+    assert client.get("/api/stats").json()["total_videos"] == 4
+    assert sum(len(v) for v in client.get("/api/validations").json()["validations"].values()) == 16
@@ -0,0 +1,143 @@
+"""Idempotent saves (validation_idempotency.py) on every backend."""
+
+import sqlite3
+
+import pytest
+
+from helpers import validation
+from validation_idempotency import (WRITE, IdempotencyConflict, IdempotencyKey, IdempotencyStore, Repeat, Replay,
+                                    SQLiteIdempotencyStore, idempotency_key, plan_batch)
+
+BACKENDS = ["json", "sqlite", "tinydb", "mongodb", "mongodb_async"]
+
+
+def test_derived_key_ignores_feedback_but_fingerprint_does_not():
+    first = idempotency_key(None, "v1", validation("v1", feedback="a")["validation"])
+    second = idempotency_key(None, "v1", validation("v1", feedback="b")["validation"])
+    assert first.key == second.key
+    assert first.fingerprint != second.fingerprint
+    assert not first.explicit
+    assert idempotency_key("abc", "v1", {}).key == "key:abc"
+    with pytest.raises(ValueError):
+        idempotency_key(" ", "v1", {})
+
+
+def test_plan_batch():
+    store = IdempotencyStore()
+    store.put("k1", "v1", "f1", 1)
+    keys = [
+        IdempotencyKey("k1", "f1", True),   # stored: replay
+        IdempotencyKey("k2", "f2", True),   # new: write
+        IdempotencyKey("k2", "f2", True),   # same as the previous item
+        IdempotencyKey("k2", "f3", True),   # explicit key, other body
+        IdempotencyKey("k1", "f9", False),  # derived key, other body: a new validation
+        None,
+    ]
+    plan = plan_batch(store, keys)
+    assert plan[0] == Replay(1)
+    assert plan[1] is WRITE
+    assert plan[2] == Repeat(1)
+    assert isinstance(plan[3], IdempotencyConflict)
+    assert plan[4] is WRITE and plan[5] is WRITE
+
+
+@pytest.mark.parametrize("make_store", [IdempotencyStore, lambda: SQLiteIdempotencyStore(":memory:")],
+                         ids=["memory", "sqlite"])
+def test_store_discards_a_videos_keys(make_store):
+    store = make_store()
+    store.put_many([("k1", "v1", "f", 1), ("k2", "v1", "f", 2), ("k3", "v2", "f", 1)])
+    store.discard_videos(["v1"])
+    assert store.get("k1") is None and store.get("k2") is None
+    assert store.get("k3").result == 1
+
+
+def test_memory_store_expires_keys():
+    store = IdempotencyStore(ttl=0)
+    store.put("k1", "v1", "f", 1)
+    assert store.get("k1") is None
+    assert len(store) == 0
+
+
+def test_sqlite_store_replaces_keys_table_without_video_id(tmp_path):
+    path = tmp_path / "keys.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE idempotency_keys (key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+                 "result TEXT NOT NULL, expires_at REAL NOT NULL)")
+    conn.commit()
+    conn.close()
+    store = SQLiteIdempotencyStore(path)
+    store.put("k1", "v1", "f", 1)
+    assert store.get("k1").result == 1
+    store.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_retry_is_replayed_with_the_current_total(start_api, backend):
+    _, client = start_api(backend)
+    first = client.post("/api/validations", json=validation("v1"), headers={"Idempotency-Key": "save-1"})
+    client.post("/api/validations", json=validation("v1", timestamp="2024-01-02T00:00:00"))
+    retry = client.post("/api/validations", json=validation("v1"), headers={"Idempotency-Key": "save-1"})
+    assert first.json()["total_validations"] == 1
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["total_validations"] == 2
+    assert len(client.get("/api/validations/v1").json()["validations"]) == 2
+
+    other = client.post("/api/validations", json=validation("v1", status="incorrect"),
+                        headers={"Idempotency-Key": "save-1"})
+    assert other.status_code == 422
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_save_after_delete_is_written_again(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    client.post("/api/validations/batch", json=[validation("v1", timestamp="2024-01-02T00:00:00")])
+    assert client.delete("/api/validations/v1").status_code == 200
+
+    again = client.post("/api/validations", json=validation("v1"))
+    assert "Idempotent-Replayed" not in again.headers
+    assert again.json()["total_validations"] == 1
+    batch = client.post("/api/validations/batch", json=[validation("v1", timestamp="2024-01-02T00:00:00")]).json()
+    assert batch["saved"] == 1 and batch["replayed"] == 0
+    assert len(client.get("/api/validations/v1").json()["validations"]) == 2
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_batch_replays_agree_with_totals(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    items = [
+        validation("v1", timestamp="2024-01-02T00:00:00"),
+        validation("v1"),  # saved before the batch
+        validation("v1", timestamp="2024-01-03T00:00:00"),
+    ]
+    body = client.post("/api/validations/batch", json=items).json()
+    assert [r["replayed"] for r in body["results"]] == [False, True, False]
+    # Each item reports the video's count after it
+    assert [r["total_validations"] for r in body["results"]] == [2, 2, 3]
+    assert body["totals"] == {"v1": 3}
+
+    again = client.post("/api/validations/batch", json=items).json()
+    assert again["replayed"] == 3
+    assert {r["total_validations"] for r in again["results"]} == {3}
+
+
+def test_writer_batch_with_a_delete_between_saves(start_api):
+    """A save queued after a delete in the same writer batch is not replayed from before the delete."""
+    module, _ = start_api("json")
+    body = validation("v1")["validation"]
+    key = idempotency_key(None, "v1", body)
+    save = {"op": "insert", "video_id": "v1", "validation": body, "key": key}
+    results = module.write_database_many([save, {"op": "delete", "video_id": "v1"}, save])
+    assert results == [(1, False), True, (1, False)]
+    assert module.write_database(save) == (1, True)
+
+
+def test_tinydb_writer_batch_with_a_delete_between_saves(start_api):
+    module, _ = start_api("tinydb")
+    body = {**validation("v1")["validation"], "video_id": "v1"}
+    key = idempotency_key(None, "v1", validation("v1")["validation"])
+    save = {"op": "insert", "doc": body, "key": key}
+    results = module.submit_writes([save, {"op": "delete", "video_id": "v1"}, dict(save, doc=dict(body))])
+    assert results == [(1, False), 1, (1, False)]
+    assert module.submit_write(dict(save, doc=dict(body))) == (1, True)
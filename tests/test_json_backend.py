@@ -0,0 +1,47 @@
+"""The JSON file backend (validation_api.py): cached reads, atomic coalesced writes."""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import validation
+
+
+def test_concurrent_saves_are_all_kept(start_api):
+    module, client = start_api("json")
+
+    def save(n):
+        return client.post("/api/validations", json=validation(f"v{n % 5}", timestamp=f"2024-01-01T00:00:{n:02d}"))
+
+    with ThreadPoolExecutor(16) as pool:
+        assert all(response.status_code == 200 for response in pool.map(save, range(40)))
+    on_disk = json.loads(module.DB_FILE.read_text())["validations"]
+    assert sum(len(items) for items in on_disk.values()) == 40
+    assert not module.DB_FILE.with_name(module.DB_FILE.name + ".tmp").exists()
+
+
+def test_reads_come_from_the_cache_until_the_file_changes(start_api):
+    module, client = start_api("json")
+    client.post("/api/validations", json=validation("v1"))
+    assert module.load_database() is module.load_database()
+    tag = client.get("/api/validations").headers["ETag"]
+
+    # Another process rewrites the file
+    data = json.loads(module.DB_FILE.read_text())
+    data["validations"]["v2"] = [validation("v2")["validation"]]
+    stamp = os.stat(module.DB_FILE).st_mtime_ns + 10**9
+    module.DB_FILE.write_text(json.dumps(data))
+    os.utime(module.DB_FILE, ns=(stamp, stamp))
+
+    assert client.get("/api/validations", headers={"If-None-Match": tag}).status_code == 200
+    assert sorted(client.get("/api/validations").json()["validations"]) == ["v1", "v2"]
+    assert client.get("/api/status/v2").json()["status"] == "correct"
+
+
+def test_file_keeps_other_top_level_keys(start_api):
+    module, client = start_api("json")
+    module.DB_FILE.write_text(json.dumps({"schema": 1, "validations": {}}))
+    client.post("/api/validations", json=validation("v1"))
+    on_disk = json.loads(module.DB_FILE.read_text())
+    assert on_disk["schema"] == 1 and list(on_disk["validations"]) == ["v1"]
+
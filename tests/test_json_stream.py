@@ -0,0 +1,50 @@
+"""Incremental JSON database reader (validation_json_stream.py)."""
+
+import io
+import json
+
+import pytest
+
+from validation_json_stream import iter_tinydb_documents, iter_validations
+
+
+def records(videos=30, per_video=4):
+    return {f"video_{v}": [{"timestamp": f"2024-01-{n + 1:02d}T00:00:00", "status": "correct",
+                            "feedback": "ü " * n, "validator": "tester", "score": 12345.678 * n}
+                           for n in range(per_video)]
+            for v in range(videos)}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_every_record_in_file_order(chunk_size):
+    data = {"meta": {"skipped": [1, 2, {"validations": "not these"}]}, "validations": records(), "tail": 1.5}
+    text = json.dumps(data, indent=2)
+    expected = [(video_id, validation) for video_id, validations in data["validations"].items()
+                for validation in validations]
+    assert list(iter_validations(io.StringIO(text), chunk_size=chunk_size)) == expected
+
+
+@pytest.mark.parametrize("text", ['{}', '{"validations": {}}', '{"validations": {"v1": []}}'])
+def test_empty_databases(text):
+    assert list(iter_validations(io.StringIO(text), chunk_size=2)) == []
+
+
+def test_numbers_split_across_chunks():
+    text = '{"validations": {"v1": [12345678901234567890, -1.5e-3]}}'
+    for chunk_size in range(1, len(text) + 1):
+        assert list(iter_validations(io.StringIO(text), chunk_size=chunk_size)) == [("v1", 12345678901234567890),
+                                                                                   ("v1", -1.5e-3)]
+
+
+@pytest.mark.parametrize("text", ['{"validations": {"v1": [{"status": }]}}', '{"validations": [', ''])
+def test_malformed_file_raises(text):
+    with pytest.raises(ValueError):
+        list(iter_validations(io.StringIO(text), chunk_size=4))
+
+
+def test_tinydb_documents():
+    data = {"_default": {"1": {"video_id": "v1"}, "7": {"video_id": "v2"}}, "other": {"1": {"video_id": "x"}}}
+    text = json.dumps(data)
+    assert list(iter_tinydb_documents(io.StringIO(text), chunk_size=3)) == [(1, {"video_id": "v1"}),
+                                                                           (7, {"video_id": "v2"})]
+    assert list(iter_tinydb_documents(io.StringIO(text), table="other")) == [(1, {"video_id": "x"})]
@@ -0,0 +1,104 @@
+"""GET /api/validations: cursor pages, NDJSON streaming and filters, on every backend."""
+
+import json
+
+import pytest
+
+from helpers import validation
+from validation_paging import group_videos
+
+BACKENDS = ["json", "sqlite", "tinydb", "mongodb", "mongodb_async"]
+
+
+@pytest.fixture(params=BACKENDS)
+def client(request, start_api):
+    _, client = start_api(request.param)
+    for n, video_id in enumerate(["v3", "v1", "v5", "v2", "v4"]):
+        client.post("/api/validations", json=validation(video_id, timestamp=f"2024-01-{n + 1:02d}T00:00:00",
+                                                        status="incorrect" if n % 2 else "correct",
+                                                        validator="alice" if n < 3 else "bob"))
+    client.post("/api/validations", json=validation("v1", timestamp="2024-02-01T00:00:00", validator="bob"))
+    return client
+
+
+def test_pages_follow_video_id_order(client):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/validations", params=params).json()
+        assert len(page["validations"]) <= 2
+        seen.extend(page["validations"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        assert cursor == seen[-1]
+    assert seen == ["v1", "v2", "v3", "v4", "v5"]
+    assert client.get("/api/validations", params={"limit": 10}).json()["validations"] == \
+        client.get("/api/validations").json()["validations"]
+
+
+def test_limit_is_checked(client):
+    assert client.get("/api/validations", params={"limit": 0}).status_code == 422
+
+
+def test_ndjson_stream(client):
+    full = client.get("/api/validations").json()["validations"]
+    for kwargs in ({"params": {"format": "ndjson"}}, {"headers": {"Accept": "application/x-ndjson"}}):
+        response = client.get("/api/validations", **kwargs)
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["video_id"] for line in lines] == ["v1", "v2", "v3", "v4", "v5"]
+        assert {line["video_id"]: line["validations"] for line in lines} == full
+    after = client.get("/api/validations", params={"format": "ndjson", "cursor": "v3"}).text.splitlines()
+    assert [json.loads(line)["video_id"] for line in after] == ["v4", "v5"]
+
+
+def test_filters(client):
+    by_bob = client.get("/api/validations", params={"validator": "bob"}).json()["validations"]
+    assert sorted(by_bob) == ["v1", "v2", "v4"]
+    assert [v["timestamp"] for v in by_bob["v1"]] == ["2024-02-01T00:00:00"]
+
+    incorrect = client.get("/api/validations", params={"status": "incorrect", "validator": "alice"}).json()
+    assert list(incorrect["validations"]) == ["v1"]
+
+    january = client.get("/api/validations", params={"from": "2024-01-02T00:00:00", "to": "2024-01-04T00:00:00"})
+    assert sorted(january.json()["validations"]) == ["v1", "v2", "v5"]
+
+    page = client.get("/api/validations", params={"validator": "bob", "limit": 2}).json()
+    assert list(page["validations"]) == ["v1", "v2"] and page["next_cursor"] == "v2"
+    assert client.get("/api/validations", params={"from": "yesterday"}).status_code == 400
+
+    # Compared as instants, not strings: 23:00 UTC on the 1st
+    client.post("/api/validations", json=validation("v6", timestamp="2024-01-02T01:00:00+02:00"))
+    assert "v6" not in client.get("/api/validations", params={"from": "2024-01-02T00:00:00Z"}).json()["validations"]
+    assert "v6" in client.get("/api/validations", params={"to": "2024-01-01T23:00:00Z"}).json()["validations"]
+
+
+def test_groups_are_yielded_as_soon_as_the_next_video_starts():
+    read = []
+
+    def rows():
+        for video_id in ("a", "a", "b", "c", "c", "d"):
+            read.append(video_id)
+            yield video_id, {"video_id": video_id, "status": "correct"}
+
+    groups = group_videos(rows(), cursor="a")
+    assert next(groups) == ("b", [{"status": "correct"}]) and read == ["a", "a", "b", "c"]
+    assert [video_id for video_id, _ in groups] == ["c", "d"] and len(read) == 6
+
+
+def test_sqlite_reads_filtered_rows_in_chunks(start_api, monkeypatch):
+    module, client = start_api("sqlite")
+    client.post("/api/validations/batch", json=[validation(f"v{n % 4}", timestamp=f"2024-01-{n + 1:02d}T00:00:00",
+                                                           validator="bob" if n % 3 else "alice")
+                                                for n in range(20)])
+    params = {"validator": "bob", "format": "ndjson"}
+    whole = client.get("/api/validations", params=params).text
+    monkeypatch.setattr(module, "MATCH_CHUNK_ROWS", 2)
+    lines = [json.loads(line) for line in client.get("/api/validations", params=params).text.splitlines()]
+    assert client.get("/api/validations", params=params).text == whole
+    assert [line["video_id"] for line in lines] == ["v0", "v1", "v2", "v3"]
+    assert sum(len(line["validations"]) for line in lines) == 13
+    for line in lines:
+        timestamps = [v["timestamp"] for v in line["validations"]]
+        assert timestamps == sorted(timestamps)
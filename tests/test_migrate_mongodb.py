@@ -0,0 +1,89 @@
+"""The MongoDB migrations: migrate_json_to_mongodb.py and migrate_validations.py's MongoDB destination."""
+
+import json
+
+import pytest
+
+from helpers import validation
+
+pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def migrator(tmp_path, monkeypatch, fresh_import):
+    module = fresh_import("migrate_json_to_mongodb")
+    source = tmp_path / "validations.json"
+    monkeypatch.setattr(module, "JSON_DB_FILE", source)
+    monkeypatch.setattr(module, "CHECKPOINT_FILE", tmp_path / "validations.json.migrate-checkpoint")
+    return module, source
+
+
+def write_source(path, validations):
+    path.write_text(json.dumps({"validations": validations}))
+
+
+def test_migration_is_seen_by_the_api(migrator, start_api, mongo_client):
+    module, source = migrator
+    _, client = start_api("mongodb")
+    client.post("/api/validations", json=validation("v1"))
+    etag = client.get("/api/validations").headers["ETag"]
+    since = client.get("/api/validations/changes").json()["version"]
+
+    write_source(source, {"v1": [validation("v1")["validation"],
+                                 validation("v1", timestamp="2024-01-02T00:00:00")["validation"]],
+                          "v2": [validation("v2", status="incorrect")["validation"]]})
+    module.migrate(mongo_client=mongo_client)
+
+    db = mongo_client["sign_validation_db"]
+    assert db["validations"].count_documents({}) == 3
+    assert {doc["_id"]: doc["count"] for doc in db["validation_counts"].find()} == {"v1": 2, "v2": 1}
+    assert client.get("/api/validations", headers={"If-None-Match": etag}).status_code == 200
+    delta = client.get("/api/validations/changes", params={"since": since}).json()
+    assert [(c["op"], c["video_id"]) for c in delta["changes"]] == [("insert", "v1"), ("insert", "v2")]
+
+    # The API's key for v1's first save went with the migration
+    assert db["validation_idempotency_keys"].count_documents({"video_id": "v1"}) == 0
+    saved = client.post("/api/validations", json=validation("v1", timestamp="2024-01-03T00:00:00"))
+    assert saved.status_code == 200
+    assert saved.json()["total_validations"] == 3
+
+
+def test_rerun_skips_duplicates_but_not_other_statuses(migrator, mongo_client):
+    module, source = migrator
+    db = mongo_client["sign_validation_db"]
+    db["validations"].create_index([("video_id", 1), ("timestamp", 1), ("status", 1)], unique=True,
+                                   name=module.LEGACY_INDEX_NAME)
+    write_source(source, {"v1": [validation("v1")["validation"]]})
+    module.migrate(mongo_client=mongo_client)
+    assert module.LEGACY_INDEX_NAME not in db["validations"].index_information()
+
+    write_source(source, {"v1": [validation("v1")["validation"],
+                                 validation("v1", feedback="changed my mind")["validation"]]})
+    module.migrate(mongo_client=mongo_client)
+    assert db["validations"].count_documents({"video_id": "v1"}) == 2
+    assert db["validation_counts"].find_one({"_id": "v1"})["count"] == 2
+
+
+def test_invalid_records_are_skipped(migrator, mongo_client, capsys):
+    module, source = migrator
+    write_source(source, {"v1": [{"timestamp": "2024-01-01T00:00:00", "feedback": ""},
+                                 validation("v1")["validation"],
+                                 "not a validation"]})
+    module.migrate(mongo_client=mongo_client)
+    out = capsys.readouterr().out
+    assert "Migration complete" in out
+    assert "Skipped (invalid): 2 records" in out
+    assert mongo_client["sign_validation_db"]["validations"].count_documents({}) == 1
+
+
+def test_copy_destination_drops_replaced_keys(monkeypatch, mongo_client, fresh_import):
+    monkeypatch.setattr("pymongo.MongoClient", lambda *args, **kwargs: mongo_client)
+    migrate_validations = fresh_import("migrate_validations")
+    keys = mongo_client["sign_validation_db"]["validation_idempotency_keys"]
+    keys.insert_many([{"_id": "k1", "video_id": "v1"}, {"_id": "k2", "video_id": "v2"}])
+
+    backend = migrate_validations.MongoDBBackend("mongodb://test")
+    backend.replace_videos([("v1", [validation("v1")["validation"]])])
+    assert [doc["_id"] for doc in keys.find()] == ["k2"]
+    backend.begin_copy()
+    assert keys.count_documents({}) == 0
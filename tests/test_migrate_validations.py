@@ -0,0 +1,92 @@
+"""Any-to-any copy and follow (migrate_validations.py) between the file and SQLite backends."""
+
+import json
+import sys
+
+import pytest
+
+from helpers import validation
+
+
+@pytest.fixture
+def migrate(fresh_import):
+    return fresh_import("migrate_validations")
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A JSON database with three videos."""
+    path = tmp_path / "source.json"
+    path.write_text(json.dumps({"validations": {
+        f"v{n}": [validation(f"v{n}", timestamp=f"2024-01-0{day}T00:00:00.000Z", feedback=f"ü {day}")["validation"]
+                  for day in range(1, n + 2)]
+        for n in range(3)
+    }}))
+    return path
+
+
+def test_copy_through_every_file_backend(migrate, source, tmp_path):
+    chain = [f"json:{source}", f"sqlite:{tmp_path / 'db.sqlite3'}", f"tinydb:{tmp_path / 'tiny.json'}",
+             f"json:{tmp_path / 'back.json'}"]
+    expected = migrate.summarize(migrate.open_backend(chain[0]))
+    assert expected["videos"] == 3 and expected["records"] == 6
+    for src_spec, dest_spec in zip(chain, chain[1:]):
+        src, dest = migrate.open_backend(src_spec), migrate.open_backend(dest_spec)
+        try:
+            digests = migrate.copy(src, dest, batch_size=2)
+            assert len(digests) == 3
+            assert migrate.verify(src, dest)
+        finally:
+            src.close()
+            dest.close()
+    back = json.loads((tmp_path / "back.json").read_text())["validations"]
+    assert back == json.loads(source.read_text())["validations"]
+
+
+@pytest.mark.parametrize("dest_kind", ["json", "tinydb", "sqlite"])
+def test_sync_replaces_changed_and_deletes_vanished_videos(migrate, source, tmp_path, dest_kind):
+    src = migrate.open_backend(f"json:{source}")
+    dest = migrate.open_backend(f"{dest_kind}:{tmp_path / ('dest.' + dest_kind)}")
+    try:
+        digests = migrate.copy(src, dest, batch_size=100)
+        assert migrate.sync_changes(src, dest, digests, batch_size=100) == (0, 0)
+
+        data = json.loads(source.read_text())
+        data["validations"]["v0"].append(validation("v0", timestamp="2024-02-01T00:00:00.000Z")["validation"])
+        del data["validations"]["v2"]
+        data["validations"]["v9"] = [validation("v9")["validation"]]
+        source.write_text(json.dumps(data))
+
+        assert migrate.sync_changes(src, dest, digests, batch_size=1) == (2, 1)
+        assert migrate.verify(src, dest)
+        assert sorted(video_id for video_id, _ in dest.iter_groups()) == ["v0", "v1", "v9"]
+    finally:
+        src.close()
+        dest.close()
+
+
+def test_cli_refuses_a_full_destination(migrate, source, tmp_path, monkeypatch, capsys):
+    dest = f"json:{tmp_path / 'dest.json'}"
+    monkeypatch.setattr(sys, "argv", ["migrate_validations.py", f"json:{source}", dest])
+    assert migrate.main() == 0
+    assert migrate.main() == 2
+    assert "already holds validations" in capsys.readouterr().out
+    monkeypatch.setattr(sys, "argv", ["migrate_validations.py", f"json:{source}", dest, "--overwrite"])
+    assert migrate.main() == 0
+    monkeypatch.setattr(sys, "argv", ["migrate_validations.py", "csv:x", dest])
+    assert migrate.main() == 2
+
+
+def test_api_serves_a_migrated_sqlite_database(migrate, source, tmp_path, start_api):
+    src = migrate.open_backend(f"json:{source}")
+    dest = migrate.open_backend(f"sqlite:{tmp_path / 'validations.sqlite3'}")
+    try:
+        migrate.copy(src, dest, batch_size=100)
+    finally:
+        src.close()
+        dest.close()
+    _, client = start_api("sqlite")
+    assert len(client.get("/api/validations/v2").json()["validations"]) == 3
+    assert client.get("/api/stats").json()["total_videos"] == 3
+    saved = client.post("/api/validations", json=validation("v0", timestamp="2024-03-01T00:00:00.000Z"))
+    assert saved.json()["total_validations"] == 2
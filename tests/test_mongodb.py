@@ -0,0 +1,112 @@
+"""Both MongoDB APIs (pymongo and AsyncMongoClient) on an in-process mongomock database."""
+
+import pytest
+
+from helpers import validation
+
+MONGO_BACKENDS = ["mongodb", "mongodb_async"]
+
+
+@pytest.mark.parametrize("backend", MONGO_BACKENDS)
+def test_save_read_and_replay(start_api, backend):
+    _, client = start_api(backend)
+    first = client.post("/api/validations", json=validation("v1"))
+    assert first.status_code == 200
+    assert first.json()["total_validations"] == 1
+    assert "Idempotent-Replayed" not in first.headers
+
+    retry = client.post("/api/validations", json=validation("v1"))
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["total_validations"] == 1
+
+    body = client.get("/api/validations/v1").json()
+    assert body["validations"] == [validation("v1")["validation"]]
+    assert client.get("/api/status/v1").json()["status"] == "correct"
+    assert client.get("/api/stats").json()["total_videos"] == 1
+
+
+@pytest.mark.parametrize("backend", MONGO_BACKENDS)
+def test_listing_is_cached_until_a_write(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    first = client.get("/api/validations")
+    assert first.json() == {"validations": {"v1": [validation("v1")["validation"]]}}
+    assert client.get("/api/validations", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    client.post("/api/validations", json=validation("v2"))
+    second = client.get("/api/validations")
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert sorted(second.json()["validations"]) == ["v1", "v2"]
+
+
+@pytest.mark.parametrize("backend", MONGO_BACKENDS)
+def test_batch_counts_and_replays(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    items = [validation("v1"), validation("v1", timestamp="2024-01-02T00:00:00"), validation("v2")]
+    body = client.post("/api/validations/batch", json=items).json()
+    assert [r["replayed"] for r in body["results"]] == [True, False, False]
+    assert [r["total_validations"] for r in body["results"]][1:] == [2, 1]
+    assert body["totals"] == {"v1": 2, "v2": 1}
+
+
+@pytest.mark.parametrize("backend", MONGO_BACKENDS)
+def test_status_batch(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1", status="incorrect"))
+    statuses = client.get("/api/status", params={"ids": "v1,v2"}).json()["statuses"]
+    assert statuses["v1"]["status"] == "incorrect"
+    assert statuses["v2"]["status"] == "pending"
+    assert client.post("/api/status", json={"ids": ["v1"]}).json()["statuses"]["v1"]["status"] == "incorrect"
+
+
+@pytest.mark.parametrize("backend", MONGO_BACKENDS)
+def test_delta_sync(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    full = client.get("/api/validations/changes").json()
+    assert full["full"] is True
+    client.post("/api/validations", json=validation("v2"))
+    client.delete("/api/validations/v1")
+    delta = client.get("/api/validations/changes", params={"since": full["version"]}).json()
+    assert [(c["op"], c["video_id"]) for c in delta["changes"]] == [("insert", "v2"), ("delete", "v1")]
+    assert client.get("/api/validations/changes", params={"since": "999"}).status_code == 410
+
+
+@pytest.mark.parametrize("backend", MONGO_BACKENDS)
+def test_deleting_a_missing_video_is_not_logged(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    tag = client.get("/api/validations").headers["ETag"]
+    version = client.get("/api/validations/changes").json()["version"]
+    assert client.delete("/api/validations/v9").json()["message"] == "Deleted 0 validations for v9"
+    assert client.get("/api/validations", headers={"If-None-Match": tag}).status_code == 304
+    assert client.get("/api/validations/changes", params={"since": version}).json()["changes"] == []
+
+
+def test_async_counters_follow_the_sync_api(start_api, mongo_client):
+    """Counters written by the pymongo API are the ones the async API continues from."""
+    _, sync_client = start_api("mongodb")
+    sync_client.post("/api/validations", json=validation("v1"))
+    sync_client.post("/api/validations/batch", json=[validation("v1", timestamp="2024-01-02T00:00:00")])
+
+    _, async_client = start_api("mongodb_async")
+    saved = async_client.post("/api/validations", json=validation("v1", timestamp="2024-01-03T00:00:00"))
+    assert saved.json()["total_validations"] == 3
+    sync_client.delete("/api/validations/v1")
+    assert mongo_client["sign_validation_db"]["validation_counts"].find_one({"_id": "v1"}) is None
+
+
+def test_counters_are_rebuilt_at_startup(start_api, mongo_client):
+    """Validations written without updating the counters (e.g. by an older tool) are recounted."""
+    db = mongo_client["sign_validation_db"]
+    db["validations"].insert_many([
+        {"video_id": "v1", "timestamp": f"2024-01-0{day}T00:00:00", "status": "correct", "feedback": "",
+         "validator": "import"}
+        for day in (1, 2)
+    ])
+    db["validation_counts"].insert_one({"_id": "gone", "count": 4})
+
+    _, client = start_api("mongodb_async")
+    assert {doc["_id"]: doc["count"] for doc in db["validation_counts"].find()} == {"v1": 2}
+    assert client.post("/api/validations", json=validation("v1")).json()["total_validations"] == 3
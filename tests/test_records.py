@@ -0,0 +1,60 @@
+"""Compact validation records (validation_records.py)."""
+
+import pytest
+
+from validation_records import (STATUSES, UNKNOWN_TIME, Interner, ValidationRecord, format_timestamp, latest,
+                                parse_timestamp, to_dicts)
+
+
+@pytest.mark.parametrize("doc", [
+    {"timestamp": "2024-01-15T10:30:00.000Z", "status": "correct", "feedback": "", "validator": "alice"},
+    {"timestamp": "2024-01-15T10:30:00", "status": "incorrect", "feedback": "ü", "validator": "bob"},
+    {"timestamp": "2024-01-15T12:30:00.123456+02:00", "status": "needs_review", "feedback": "x", "validator": "c"},
+    {"timestamp": "", "status": "a new status", "feedback": "", "validator": "community_member"},
+    {"timestamp": "yesterday", "status": "correct", "feedback": "", "validator": "d", "score": 3, "tags": ["a"]},
+])
+def test_round_trip_is_lossless(doc):
+    record = ValidationRecord.from_dict(doc, "v1")
+    assert record.to_dict() == doc
+    assert record.to_dict(with_video_id=True) == {**doc, "video_id": "v1"}
+    assert ValidationRecord.from_dict({**doc, "video_id": "v1"}).to_dict() == doc
+
+
+def test_canonical_timestamps_are_not_stored_twice():
+    record = ValidationRecord.from_dict({"timestamp": "2024-01-15T10:30:00.000Z", "status": "correct"}, "v1")
+    assert record.ts_text is None and record.extra is None
+    other = ValidationRecord.from_dict({"timestamp": "2024-01-15T10:30:00Z", "status": "correct"}, "v1")
+    assert other.ts == record.ts and other.ts_text == "2024-01-15T10:30:00Z"
+
+
+def test_missing_fields_get_defaults():
+    record = ValidationRecord.from_dict({"feedback": None}, "v1")
+    assert record.ts == UNKNOWN_TIME
+    assert record.to_dict() == {"timestamp": "", "status": "", "feedback": "", "validator": "community_member"}
+
+
+def test_timestamps():
+    assert parse_timestamp("1970-01-01T00:00:01Z") == 1_000_000
+    assert parse_timestamp("1970-01-01T02:00:00+02:00") == 0
+    assert parse_timestamp("1970-01-01") == 0
+    assert parse_timestamp("not a time") == parse_timestamp(None) == UNKNOWN_TIME
+    assert format_timestamp(1_500_000) == "1970-01-01T00:00:01.500Z"
+
+
+def test_latest_compares_instants():
+    records = [ValidationRecord.from_dict({"timestamp": ts, "status": status}, "v1") for ts, status in [
+        ("2024-01-02T01:00:00+02:00", "incorrect"),  # 23:00 on the 1st
+        ("2024-01-01T23:30:00Z", "correct"),
+        ("2024-01-01T23:30:00.000Z", "needs_review"),  # same instant: the first one wins
+        ("", "pending"),
+    ]]
+    assert latest(records).status == "correct"
+    assert latest([]) is None
+    assert [doc["status"] for doc in to_dicts(records)] == ["incorrect", "correct", "needs_review", "pending"]
+
+
+def test_interner_shares_ids():
+    interner = Interner(["a"])
+    assert interner.id("a") == 0 and interner.id("b") == 1 and interner.id("a") == 0
+    assert interner.value(1) == "b" and len(interner) == 2
+    assert STATUSES.id("correct") == 0
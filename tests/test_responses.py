@@ -0,0 +1,117 @@
+"""Pre-serialized, compressed responses (validation_responses.py)."""
+
+import gzip
+import json
+import threading
+from datetime import datetime
+
+import pytest
+from starlette.requests import Request
+
+import validation_responses
+from helpers import validation
+from validation_responses import ENCODINGS, ResponseCache, choose_encoding, dumps
+
+BACKENDS = ["json", "sqlite", "tinydb", "mongodb", "mongodb_async"]
+
+
+def request_with(accept_encoding):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_dumps():
+    data = {"a": "ü", "when": datetime(2024, 1, 2, 3, 4, 5), 1: [None, True]}
+    decoded = json.loads(dumps(data))
+    assert decoded["a"] == "ü" and decoded["1"] == [None, True] and decoded["when"].startswith("2024-01-02")
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("*", ENCODINGS[0]),
+    ("*;q=0.5, gzip;q=0", "br" if "br" in ENCODINGS else None),
+    ("gzip;q=0.2, br;q=0.9", ENCODINGS[0]),
+    ("gzip;q=oops", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(request_with(header), 10 ** 6) == expected
+
+
+def test_small_bodies_are_not_compressed():
+    assert choose_encoding(request_with("gzip"), validation_responses.COMPRESS_MIN_BYTES - 1) is None
+
+
+def test_cache_drops_least_recently_used():
+    cache = ResponseCache(max_bytes=25)
+    cache.put("a", "x" * 8)
+    cache.put("b", "y" * 8)
+    assert cache.get("a") is not None  # now the most recent
+    cache.put("c", "z" * 8)
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    cache.put("huge", "w" * 100)
+    assert cache.stats()["entries"] == 1 and cache.get("huge") is not None
+
+
+def test_cache_builds_each_key_once():
+    cache = ResponseCache()
+    calls = []
+    started = threading.Barrier(8)
+
+    def build():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    def request():
+        started.wait()
+        return cache.get_or_build(("k", 1), build, '"v1"')
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and cache.stats()["builds"] == 1
+    entry = cache.get(("k", 1))
+    assert entry.etag == '"v1"' and json.loads(entry.body) == {"n": 1}
+    assert gzip.decompress(entry.encoded("gzip")) == entry.body and entry.encoded("gzip") is entry.encoded("gzip")
+
+
+@pytest.fixture(params=BACKENDS)
+def client(request, start_api):
+    _, client = start_api(request.param)
+    client.post("/api/validations/batch", json=[validation(f"video_{n:03d}", feedback="feedback " * 5)
+                                                for n in range(50)])
+    return client
+
+
+def test_listing_is_compressed_when_accepted(client):
+    plain = client.get("/api/validations", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and "Accept-Encoding" in plain.headers["vary"]
+    compressed = client.get("/api/validations", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert int(compressed.headers["content-length"]) < len(plain.content)
+    assert compressed.json() == plain.json() and len(plain.json()["validations"]) == 50
+    assert compressed.headers["etag"] == plain.headers["etag"]
+
+
+def test_full_resync_is_compressed(client):
+    response = client.get("/api/validations/changes", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip" and response.json()["full"] is True
+
+
+def test_cached_listing_is_rebuilt_after_a_write(start_api):
+    _, client = start_api("tinydb")
+    client.post("/api/validations", json=validation("v1"))
+    client.get("/api/validations")
+    client.get("/api/validations")
+    metrics = client.get("/api/metrics/responses").json()
+    assert metrics["hits"] >= 1
+    builds = metrics["builds"]
+    client.post("/api/validations", json=validation("v2"))
+    assert sorted(client.get("/api/validations").json()["validations"]) == ["v1", "v2"]
+    assert client.get("/api/metrics/responses").json()["builds"] == builds + 1
@@ -0,0 +1,86 @@
+"""Feedback search (validation_search.py): the saved index, its fingerprint and /api/search."""
+
+import json
+import time
+
+from helpers import validation
+from validation_search import SearchIndex, fingerprint, load_or_build
+
+
+def doc(video_id, feedback):
+    return {"video_id": video_id, "timestamp": "2024-01-01T00:00:00.000Z", "status": "correct",
+            "validator": "alice", "feedback": feedback}
+
+
+def docs_with(feedback_of):
+    return [(doc_id, doc(f"v{doc_id}", feedback_of(doc_id))) for doc_id in range(1, 3000, 7)]
+
+
+def test_saved_index_is_loaded_for_the_same_documents(tmp_path):
+    docs = docs_with(lambda doc_id: f"note {doc_id} boundary")
+    index = SearchIndex()
+    index.build(docs)
+    index.save(tmp_path / "search.json")
+    loaded = SearchIndex()
+    assert loaded.load(tmp_path / "search.json", fingerprint(docs))
+    assert loaded.search("boundary", 5) == index.search("boundary", 5)
+    assert loaded.fingerprint() == index.fingerprint() == fingerprint(docs)
+
+
+def test_index_is_rejected_for_other_content_with_the_same_ids(tmp_path):
+    docs = docs_with(lambda doc_id: "hand shape wrong")
+    index = SearchIndex()
+    index.build(docs)
+    index.save(tmp_path / "search.json")
+    # Same ids, one feedback edited (a restore, or a copy from another database)
+    edited = list(docs)
+    edited[3] = (edited[3][0], doc(edited[3][1]["video_id"], "movement too fast"))
+    assert not SearchIndex().load(tmp_path / "search.json", fingerprint(edited))
+    moved = [(doc_id, doc("elsewhere", d["feedback"])) if doc_id == 1 else (doc_id, d) for doc_id, d in docs]
+    assert not SearchIndex().load(tmp_path / "search.json", fingerprint(moved))
+
+    assert load_or_build(SearchIndex(), tmp_path / "search.json", edited) == "built"
+    rebuilt = SearchIndex()
+    assert load_or_build(rebuilt, tmp_path / "search.json", edited) == "loaded"
+    assert [hit.doc_id for hit in rebuilt.search("movement")[0]] == [edited[3][0]]
+
+
+def test_fingerprint_follows_adds_and_removes():
+    docs = docs_with(lambda doc_id: f"word{doc_id % 5}")
+    index = SearchIndex()
+    index.build(docs[:10])
+    copy = index.copy()
+    for doc_id, d in docs[10:20]:
+        copy.add(doc_id, d)
+    copy.remove(docs[:5])
+    assert copy.fingerprint() == fingerprint(docs[5:20])
+    assert index.fingerprint() == fingerprint(docs[:10])
+
+
+def test_a_stale_file_is_rebuilt_at_startup(start_api):
+    module, client = start_api("tinydb", SEARCH_INDEX_SAVE_SECONDS=0)
+    client.post("/api/validations", json=validation("v1", feedback="hand shape wrong"))
+    client.__exit__(None, None, None)
+    stale = module.SEARCH_INDEX_PATH.read_text()
+
+    # A later session that crashed before saving its index; v2 gets v1's document id back
+    module, client = start_api("tinydb", SEARCH_INDEX_SAVE_SECONDS=0)
+    client.delete("/api/validations/v1")
+    client.post("/api/validations", json=validation("v2", feedback="movement too fast"))
+    assert [doc.doc_id for doc in module.db.all()] == [1]
+    client.__exit__(None, None, None)
+    module.SEARCH_INDEX_PATH.write_text(stale)
+
+    _, client = start_api("tinydb")
+    assert client.get("/api/search", params={"q": "movement"}).json()["video_ids"] == ["v2"]
+
+
+def test_changed_index_is_saved_periodically(start_api):
+    module, client = start_api("tinydb", SEARCH_INDEX_SAVE_SECONDS=0.05)
+    saved = json.loads(module.SEARCH_INDEX_PATH.read_text())["fingerprint"]
+    client.post("/api/validations", json=validation("v1", feedback="hand shape wrong"))
+    deadline = time.monotonic() + 5
+    while json.loads(module.SEARCH_INDEX_PATH.read_text())["fingerprint"] == saved:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert json.loads(module.SEARCH_INDEX_PATH.read_text())["fingerprint"] == module.snapshot.search.fingerprint()
@@ -0,0 +1,104 @@
+"""Copy-on-write snapshots (validation_snapshot.py) and the indexes they publish."""
+
+import random
+
+import pytest
+
+from helpers import validation
+from validation_index import LatestStatusTable, SecondaryIndex, TimeOrderedKeys, ValidationQuery
+from validation_records import parse_timestamp
+from validation_search import SearchIndex
+from validation_snapshot import EMPTY_SNAPSHOT, SnapshotBuilder
+
+
+def doc(video_id, day, status="correct", validator="alice", feedback=""):
+    return {"video_id": video_id, "timestamp": f"2024-01-{day:02d}T00:00:00.000Z", "status": status,
+            "validator": validator, "feedback": feedback}
+
+
+def test_time_ordered_keys_match_a_sorted_list():
+    rng = random.Random(7)
+    keys, expected = TimeOrderedKeys(), []
+    for n in range(3000):
+        if expected and rng.random() < 0.3:
+            entry = expected.pop(rng.randrange(len(expected)))
+            assert keys.remove(*entry)
+        else:
+            entry = (rng.randrange(200), n)
+            keys.add(*entry)
+            expected.append(entry)
+            expected.sort(key=lambda e: e[0])  # stable: equal timestamps keep insertion order
+    assert keys.between() == [key for _, key in expected]
+    assert keys.count(50, 60) == len(keys.between(50, 60)) == sum(50 <= ts <= 60 for ts, _ in expected)
+    assert not keys.remove(500, -1)
+
+
+def test_time_ordered_keys_copy_leaves_the_original_alone():
+    original = TimeOrderedKeys()
+    original.build((ts, ts) for ts in range(2000))
+    copy = original.copy()
+    copy.add(5, "new")
+    copy.remove(1500, 1500)
+    assert len(original) == 2000 and original.between(5, 5) == [5] and original.count(1500, 1500) == 1
+    assert copy.between(5, 5) == [5, "new"] and copy.count(1500, 1500) == 0
+
+
+def test_search_index_copy_leaves_the_original_alone():
+    original = SearchIndex()
+    original.build([(1, doc("v1", 1, feedback="hand shape wrong")), (2, doc("v2", 1, feedback="hand ok"))])
+    copy = original.copy()
+    copy.add(3, doc("v3", 1, feedback="handshape changed"))
+    copy.remove([(1, doc("v1", 1, feedback="hand shape wrong"))])
+    assert [hit.doc_id for hit in original.search("hand*")[0]] == [2, 1]
+    assert sorted(hit.doc_id for hit in copy.search("hand*")[0]) == [2, 3]
+    assert original.search("shape")[1] == 1 and copy.search("shape")[1] == 0
+
+
+def test_builder_does_not_change_the_published_snapshot():
+    table = LatestStatusTable()
+    first = SnapshotBuilder.from_documents(
+        [(1, doc("v1", 1, feedback="early")), (2, doc("v2", 2, validator="bob", feedback="late"))], table
+    ).build(1)
+    builder = SnapshotBuilder(first, table)
+    builder.insert(3, doc("v3", 3, status="incorrect", feedback="early too"))
+    builder.delete("v1")
+    # Nothing is visible until build(); the published snapshot keeps its own indexes
+    assert [r.video_id for r in first.index.candidates(ValidationQuery())] == ["v1", "v2"]
+    assert [hit.video_id for hit in first.search.search("early")[0]] == ["v1"]
+
+    second = builder.build(2)
+    assert [r.video_id for r in second.index.candidates(ValidationQuery())] == ["v2", "v3"]
+    assert [r.video_id for r in second.index.candidates(ValidationQuery(status="incorrect"))] == ["v3"]
+    assert [hit.video_id for hit in second.search.search("early")[0]] == ["v3"]
+    assert second.status_counts == {"correct": 1, "incorrect": 1}
+    assert EMPTY_SNAPSHOT.index.candidates(ValidationQuery()) == []
+
+
+def test_secondary_index_picks_the_narrowest_list():
+    index = SecondaryIndex()
+    docs = [doc(f"v{n}", 1 + n % 28, validator="bob" if n % 10 == 0 else "alice") for n in range(100)]
+    index.build((n, d) for n, d in enumerate(docs))
+    query = ValidationQuery(validator="bob", start="2024-01-05T00:00:00Z")
+    candidates = index.candidates(query)
+    assert set(candidates) == {n for n, d in enumerate(docs)
+                               if d["validator"] == "bob" and parse_timestamp(d["timestamp"]) >= query.bounds()[0]}
+
+
+def test_filtered_reads_and_search(start_api):
+    _, client = start_api("tinydb")
+    client.post("/api/validations", json=validation("v1", feedback="wrong handshape", status="incorrect"))
+    client.post("/api/validations", json=validation("v2", timestamp="2024-01-03T00:00:00", validator="bob"))
+    client.post("/api/validations", json=validation("v3", timestamp="2024-01-05T00:00:00", feedback="hand fine"))
+
+    def listed(**params):
+        return sorted(client.get("/api/validations", params=params).json()["validations"])
+
+    assert listed(validator="bob") == ["v2"]
+    assert listed(status="correct", **{"from": "2024-01-02T00:00:00Z"}) == ["v2", "v3"]
+    assert client.get("/api/search", params={"q": "hand*"}).json()["video_ids"] == ["v3", "v1"]
+
+    client.delete("/api/validations/v3")
+    assert listed(status="correct") == ["v2"]
+    assert client.get("/api/search", params={"q": "hand*"}).json()["video_ids"] == ["v1"]
+    with pytest.raises(ValueError):
+        ValidationQuery(start="yesterday")
@@ -0,0 +1,64 @@
+"""The SQLite backend (validation_api_sqlite.py): WAL, indexed queries, concurrent writers."""
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import validation
+
+
+def test_database_uses_wal_and_indexes(start_api):
+    module, client = start_api("sqlite")
+    client.post("/api/validations", json=validation("v1"))
+    conn = sqlite3.connect(str(module.DB_FILE))
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + module.SQL_VIDEO, ("v1",)))
+        assert "idx_validations_video_ts" in plan
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM validations WHERE validator = ? AND timestamp >= ?", ("a", "2024")))
+        assert "idx_validations_validator_ts" in plan
+    finally:
+        conn.close()
+
+
+def test_concurrent_saves_are_all_kept(start_api):
+    _, client = start_api("sqlite")
+
+    def save(n):
+        return client.post("/api/validations", json=validation(f"v{n % 5}", timestamp=f"2024-01-01T00:00:{n:02d}"))
+
+    with ThreadPoolExecutor(16) as pool:
+        totals = [response.json()["total_validations"] for response in pool.map(save, range(40))]
+    assert sorted(totals) == sorted(list(range(1, 9)) * 5)
+    assert client.get("/api/stats").json()["total_videos"] == 5
+
+
+def test_another_process_sees_committed_writes(start_api):
+    module, client = start_api("sqlite")
+    client.post("/api/validations", json=validation("v1"))
+    other = sqlite3.connect(str(module.DB_FILE))
+    try:
+        other.execute(module.SQL_INSERT, ("v2", "2024-01-01T00:00:00.000Z", "incorrect", "", "cli"))
+        other.commit()
+    finally:
+        other.close()
+    assert client.get("/api/status/v2").json()["status"] == "incorrect"
+
+
+def test_data_survives_a_restart(start_api):
+    _, client = start_api("sqlite")
+    client.post("/api/validations", json=validation("v1", feedback="ü"))
+    client.__exit__(None, None, None)
+    _, client = start_api("sqlite")
+    assert client.get("/api/validations/v1").json()["validations"] == [validation("v1", feedback="ü")["validation"]]
+
+
+def test_deleting_a_missing_video_changes_nothing(start_api):
+    _, client = start_api("sqlite")
+    client.post("/api/validations", json=validation("v1"))
+    tag = client.get("/api/validations").headers["ETag"]
+    version = client.get("/api/validations/changes").json()["version"]
+    assert client.delete("/api/validations/v9").status_code == 404
+    assert client.get("/api/validations", headers={"If-None-Match": tag}).status_code == 304
+    assert client.get("/api/validations/changes", params={"since": version}).json()["changes"] == []
+    assert client.delete("/api/validations/v1").json()["count"] == 1
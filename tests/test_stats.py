@@ -0,0 +1,93 @@
+"""Latest-status table (validation_index.LatestStatusTable) behind /api/stats and /api/status."""
+
+import pytest
+
+from helpers import validation
+from validation_index import LatestStatusTable
+
+BACKENDS = ["sqlite", "tinydb", "mongodb", "mongodb_async"]
+# The JSON API keeps its original stats fields (completed = correct, needs_review = incorrect)
+CORRECT_FIELD = {"json": "completed"}
+
+
+def doc(video_id, day, status):
+    return {"video_id": video_id, "timestamp": f"2024-01-{day:02d}T00:00:00.000Z", "status": status}
+
+
+def test_only_a_newer_validation_replaces_the_latest():
+    table = LatestStatusTable()
+    table.apply_insert(doc("v1", 2, "correct"))
+    table.apply_insert(doc("v1", 1, "incorrect"))  # older
+    table.apply_insert(doc("v1", 2, "needs_review"))  # same time: the first one stays
+    table.apply_insert(doc("v2", 1, "correct"))
+    assert table.get("v1").status == "correct"
+    assert table.status_counts == {"correct": 2}
+    table.apply_insert(doc("v1", 3, "incorrect"))
+    table.apply_delete("v2")
+    assert table.status_counts == {"incorrect": 1} and len(table) == 1 and "v2" not in table
+
+
+def test_check_reports_drift():
+    docs = [doc("v1", 1, "correct"), doc("v2", 1, "incorrect")]
+    table = LatestStatusTable()
+    table.rebuild(docs)
+    assert table.check(docs) == []
+    table.apply_insert(doc("v1", 5, "needs_review"))
+    problems = table.check(docs)
+    assert any(problem.startswith("v1:") for problem in problems)
+    assert any(problem.startswith("status counts") for problem in problems)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_stats_and_statuses_follow_the_latest_validation(start_api, backend):
+    _, client = start_api(backend)
+    for video_id, day, status in [("v1", 2, "correct"), ("v1", 1, "incorrect"), ("v2", 1, "incorrect"),
+                                  ("v3", 1, "needs_review"), ("v3", 4, "correct")]:
+        client.post("/api/validations", json=validation(video_id, f"2024-01-{day:02d}T00:00:00.000Z", status))
+    client.delete("/api/validations/v2")
+
+    stats = client.get("/api/stats").json()
+    assert (stats["total_videos"], stats["correct"], stats["incorrect"], stats["needs_review"]) == (2, 2, 0, 0)
+    v1 = client.get("/api/status/v1").json()
+    assert v1["status"] == "correct" and v1["last_updated"] == "2024-01-02T00:00:00.000Z"
+    assert client.get("/api/status/v2").json()["status"] == "pending"
+
+
+def test_tinydb_check_and_rebuild(start_api):
+    _, client = start_api("tinydb")
+    client.post("/api/validations", json=validation("v1", status="incorrect"))
+    client.post("/api/validations", json=validation("v2"))
+    assert client.get("/api/stats/check").json() == {"consistent": True, "problems": []}
+    rebuilt = client.post("/api/stats/rebuild").json()
+    assert rebuilt["success"] is True and rebuilt["total_videos"] == 2
+    assert client.get("/api/stats").json()["incorrect"] == 1
+
+
+def test_tinydb_tables_are_rebuilt_from_the_file(start_api):
+    _, client = start_api("tinydb")
+    client.post("/api/validations", json=validation("v1", timestamp="2024-01-02T00:00:00.000Z"))
+    client.post("/api/validations", json=validation("v1", status="incorrect"))
+    client.__exit__(None, None, None)
+    _, client = start_api("tinydb")
+    assert client.get("/api/status/v1").json()["status"] == "correct"
+    assert len(client.get("/api/validations/v1").json()["validations"]) == 2
+
+
+@pytest.mark.parametrize("backend", ["json"] + BACKENDS)
+def test_a_back_dated_save_does_not_become_the_latest(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1", "2024-01-05T00:00:00.000Z", "correct"))
+    client.post("/api/validations", json=validation("v1", "2024-01-01T00:00:00+00:00", "incorrect"))
+    single = client.get("/api/status/v1").json()
+    batched = client.get("/api/status", params={"ids": "v1"}).json()["statuses"]["v1"]
+    for status in (single, batched):
+        assert status["status"] == "correct" and status["last_updated"] == "2024-01-05T00:00:00.000Z"
+    assert client.get("/api/stats").json()[CORRECT_FIELD.get(backend, "correct")] == 1
+
+
+def test_tinydb_lists_a_video_in_time_order(start_api):
+    _, client = start_api("tinydb")
+    for timestamp in ("2024-01-02T00:00:00Z", "2024-01-01T23:00:00.000Z", "2024-01-02T01:00:00+02:00"):
+        client.post("/api/validations", json=validation("v1", timestamp))
+    listed = [v["timestamp"] for v in client.get("/api/validations/v1").json()["validations"]]
+    assert listed == ["2024-01-01T23:00:00.000Z", "2024-01-02T01:00:00+02:00", "2024-01-02T00:00:00Z"]
@@ -0,0 +1,51 @@
+"""Batch status lookups (GET/POST /api/status) on every backend."""
+
+import pytest
+
+import validation_batch
+from helpers import validation
+from validation_batch import status_ids
+
+BACKENDS = ["json", "sqlite", "tinydb", "mongodb", "mongodb_async"]
+
+
+def test_status_ids():
+    assert status_ids(" v2,v1,,v2 , ") == ["v2", "v1"]
+    assert status_ids(["v1", " ", "v1"]) == ["v1"]
+    assert status_ids("") == []
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_batch_matches_single_lookups(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1", status="incorrect", feedback="hand"))
+    client.post("/api/validations", json=validation("v2"))
+    ids = ["v3", "v1", "v2"]
+
+    by_get = client.get("/api/status", params={"ids": ",".join(ids + ["v1"])}).json()["statuses"]
+    by_post = client.post("/api/status", json={"ids": ids}).json()["statuses"]
+    assert list(by_get) == list(by_post) == ids
+    for video_id in ids:
+        single = client.get(f"/api/status/{video_id}").json()
+        assert by_get[video_id] == by_post[video_id] == single
+    assert by_get["v1"]["status"] == "incorrect" and by_get["v1"]["has_feedback"] is True
+    assert by_get["v3"] == {"video_id": "v3", "status": "pending", "last_updated": None, "has_feedback": False}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_get_is_revalidated_with_the_global_tag(start_api, backend):
+    _, client = start_api(backend)
+    client.post("/api/validations", json=validation("v1"))
+    tag = client.get("/api/status", params={"ids": "v1"}).headers["ETag"]
+    assert client.get("/api/status", params={"ids": "v1"}, headers={"If-None-Match": tag}).status_code == 304
+    client.post("/api/validations", json=validation("v2"))
+    assert client.get("/api/status", params={"ids": "v1"}, headers={"If-None-Match": tag}).status_code == 200
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_too_many_ids(start_api, backend, monkeypatch):
+    _, client = start_api(backend)
+    monkeypatch.setattr(validation_batch, "BATCH_MAX_ITEMS", 2)
+    assert client.get("/api/status", params={"ids": "a,b,c"}).status_code == 413
+    assert client.post("/api/status", json={"ids": ["a", "b", "c"]}).status_code == 413
+    assert client.get("/api/status", params={"ids": "a,b,a"}).status_code == 200
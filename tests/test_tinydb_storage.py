@@ -0,0 +1,98 @@
+"""validation_api_tinydb.py's storage engines: sharded TinyDB and the append-only log."""
+
+import json
+
+import pytest
+
+from helpers import validation
+
+pytest.importorskip("tinydb")
+from tinydb import TinyDB  # noqa: E402
+
+from validation_log_storage import LogStructuredDB  # noqa: E402
+from validation_shards import ShardCountMismatch, ShardedTinyDB, shard_of  # noqa: E402
+
+
+def write_tinydb_file(path, video_ids):
+    table = {str(i): {**validation(video_id)["validation"], "video_id": video_id}
+             for i, video_id in enumerate(video_ids, start=1)}
+    path.write_text(json.dumps({"_default": table}))
+
+
+def restart(start_api, client, **env):
+    client.__exit__(None, None, None)
+    return start_api("tinydb", **env)
+
+
+def test_documents_go_to_their_videos_shard(tmp_path):
+    sharded = ShardedTinyDB(tmp_path / "db", 4, TinyDB)
+    video_ids = [f"video{i}" for i in range(20)]
+    doc_ids = sharded.insert_multiple({"video_id": video_id} for video_id in video_ids)
+    assert [doc_id % 4 for doc_id in doc_ids] == [shard_of(video_id, 4) for video_id in video_ids]
+    assert sorted(doc["video_id"] for doc in sharded.all()) == sorted(video_ids)
+    assert sharded.remove([doc_ids[0], doc_ids[0] + 400]) == [doc_ids[0]]
+    assert sum(stats["records"] for stats in sharded.shard_stats()) == 19
+    sharded.close()
+
+
+def test_other_shard_count_is_refused(tmp_path):
+    ShardedTinyDB(tmp_path / "db", 4, TinyDB).close()
+    with pytest.raises(ShardCountMismatch):
+        ShardedTinyDB(tmp_path / "db", 8, TinyDB)
+    assert not list(tmp_path.glob("db.shard*-of-08.json"))
+    ShardedTinyDB(tmp_path / "db", 4, TinyDB).close()
+
+
+def test_sharded_store_is_seeded_once(start_api, tmp_path):
+    write_tinydb_file(tmp_path / "validations.json", ["v1", "v2"])
+    _, client = start_api("tinydb", STORAGE_ENGINE="sharded", SHARD_COUNT=4)
+    assert sorted(client.get("/api/validations").json()["validations"]) == ["v1", "v2"]
+    assert sum(s["records"] for s in client.get("/api/metrics/shards").json()["shards"]) == 2
+    client.delete("/api/validations/v1")
+    client.delete("/api/validations/v2")
+
+    _, client = restart(start_api, client, STORAGE_ENGINE="sharded", SHARD_COUNT=4)
+    assert client.get("/api/validations").json()["validations"] == {}
+
+
+def test_api_refuses_other_shard_count(start_api, fresh_import, monkeypatch, tmp_path):
+    _, client = start_api("tinydb", STORAGE_ENGINE="sharded", SHARD_COUNT=4)
+    client.post("/api/validations", json=validation("v1"))
+    client.__exit__(None, None, None)
+
+    monkeypatch.setenv("SHARD_COUNT", "8")
+    module = fresh_import("validation_api_tinydb")
+    with pytest.raises(ShardCountMismatch):
+        module.open_database()
+
+
+def test_log_compaction_and_replay(tmp_path):
+    log_db = LogStructuredDB(tmp_path / "db", fsync="never", auto_compact=False)
+    ids = log_db.insert_multiple({**validation(v)["validation"], "video_id": v} for v in ("v1", "v2", "v3"))
+    log_db.remove([ids[1]])
+    log_db.compact()
+    assert log_db.log_size() == 0
+    log_db.insert({**validation("v4")["validation"], "video_id": "v4"})
+    log_db.close()
+
+    # A write torn by a crash is dropped on replay
+    with open(log_db.log_path, "a") as f:
+        f.write('{"op": "insert", "id": 99, "doc"')
+    reopened = LogStructuredDB(tmp_path / "db", fsync="never", auto_compact=False)
+    assert sorted(doc["video_id"] for doc in reopened.all()) == ["v1", "v3", "v4"]
+    assert reopened.log_path.read_text().endswith("\n")
+    assert reopened.insert({"video_id": "v5"}) == 5
+    reopened.close()
+
+
+def test_log_store_is_seeded_once(start_api, tmp_path):
+    write_tinydb_file(tmp_path / "validations.json", ["v1"])
+    _, client = start_api("tinydb", STORAGE_ENGINE="log")
+    assert list(client.get("/api/validations").json()["validations"]) == ["v1"]
+    client.delete("/api/validations/v1")
+
+    _, client = restart(start_api, client, STORAGE_ENGINE="log")
+    assert client.get("/api/validations").json()["validations"] == {}
+    client.post("/api/validations", json=validation("v2"))
+    _, client = restart(start_api, client, STORAGE_ENGINE="log")
+    assert list(client.get("/api/validations").json()["validations"]) == ["v2"]
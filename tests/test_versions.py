@@ -0,0 +1,72 @@
+"""Write versions, ETags and delta-sync tokens (validation_versions.py, validation_workers.SharedVersion)."""
+
+import pytest
+
+from helpers import validation
+from validation_versions import ChangeLog, VersionTracker
+from validation_workers import FCNTL_AVAILABLE, SharedVersion
+
+
+def test_tracker_takes_an_explicit_version():
+    versions = VersionTracker(epoch="e1")
+    assert versions.bump(["v1"]) == 1
+    assert versions.bump(["v2"], 7) == 7
+    assert versions.etag("v1") != versions.etag("v2")
+    assert versions.bump_all(9) == 9
+    assert versions.etag("v1") == versions.etag("v2")
+    assert "e1" in versions.etag()
+
+
+def test_change_log_only_accepts_recorded_versions():
+    log = ChangeLog()
+    log.reset(2)
+    log.record(3, [{"op": "insert", "video_id": "v1"}])
+    log.record(6, [{"op": "insert", "video_id": "v2"}, {"op": "delete", "video_id": "v1"}])
+    assert [c["video_id"] for c in log.since(2)[1]] == ["v1", "v2", "v1"]
+    assert [c["video_id"] for c in log.since(3)[1]] == ["v2", "v1"]
+    assert log.since(6) == (6, [])
+    # 4 and 5 were folded into 6, so the log cannot tell what came after them
+    assert log.since(4) is None
+    assert log.since(1) is None and log.since(7) is None
+
+
+def test_change_log_drops_versions_below_the_floor():
+    log = ChangeLog(retention=2)
+    for version in (1, 2, 3):
+        log.record(version, [{"op": "insert", "video_id": f"v{version}"}])
+    assert log.floor == 1
+    assert log.since(0) is None
+    assert [c["video_id"] for c in log.since(1)[1]] == ["v2", "v3"]
+
+
+def test_shared_version(tmp_path):
+    shared = SharedVersion(tmp_path / "db.version")
+    epoch, version = shared.read()
+    assert version == 0
+    assert shared.claim() == (epoch, 1)
+    assert SharedVersion(tmp_path / "db.version").read() == (epoch, 1)
+
+    (tmp_path / "db.version").write_text("not json")
+    new_epoch, version = shared.read()
+    assert version == 0 and new_epoch != epoch
+
+
+@pytest.mark.skipif(not FCNTL_AVAILABLE, reason="multi-worker mode needs fcntl")
+def test_workers_agree_on_etags_and_tokens(start_api):
+    first, one = start_api("tinydb", MULTI_WORKER=1)
+    second, two = start_api("tinydb", MULTI_WORKER=1)
+    assert first is not second
+
+    one.post("/api/validations", json=validation("v1"))
+    token = two.get("/api/validations/changes").json()["version"]
+    etag = two.get("/api/validations").headers["ETag"]
+    assert one.get("/api/validations").headers["ETag"] == etag
+    assert one.get("/api/validations", headers={"If-None-Match": etag}).status_code == 304
+
+    two.post("/api/validations", json=validation("v2"))
+    one.delete("/api/validations/v1")
+    for client in (one, two):
+        delta = client.get("/api/validations/changes", params={"since": token})
+        assert delta.status_code == 200
+        assert [(c["op"], c["video_id"]) for c in delta.json()["changes"]] == [("insert", "v2"), ("delete", "v1")]
+    assert one.get("/api/validations").headers["ETag"] == two.get("/api/validations").headers["ETag"]
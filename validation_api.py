@@ -4,14 +4,29 @@ FastAPI backend for storing and retrieving sign segmentation validation results.
 Uses JSON file storage (NoSQL-like) for simplicity and persistence.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 from pathlib import Path
 import json
+import threading
 from datetime import datetime
+from itertools import groupby
+from operator import attrgetter
+
+from validation_batch import (BatchValidationResponse, StatusBatchRequest, batch_keys, batch_response,
+                              status_ids)
+from validation_export import ExportFilters, export_response, export_row
+from validation_group_commit import GroupCommitter
+from validation_idempotency import (WRITE, IdempotencyConflict, IdempotencyStore, Repeat, Replay,
+                                    idempotency_key, mark_replayed, plan_batch)
+from validation_index import SecondaryIndex, ValidationQuery
+from validation_records import ValidationRecord, latest as latest_record, to_dicts
+from validation_paging import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, ndjson_response, paginate, wants_ndjson
+from validation_responses import ResponseCache, body_response, json_response
+from validation_versions import ChangeLog, VersionTracker, etag_variant, not_modified, resync_response, set_etag
 
 app = FastAPI(title="Sign Segmentation Validator API")
 
@@ -63,19 +78,192 @@ class ValidationResponse(BaseModel):
     total_validations: int
 
 
-def load_database() -> Dict:
-    """Load validation database from JSON file."""
+# Parsed database, keyed on the file's (mtime_ns, size). Replaced as a whole
+# tuple so readers always see a matching key/data pair. Treat data as read-only.
+# data["validations"] maps video_id -> [ValidationRecord] (compact in memory;
+# converted back to dicts for responses and when saving).
+_cache = (None, None)
+# Reentrant: the writer holds it across save + version bump so a snapshot
+# read under it always pairs data with the matching version.
+_cache_lock = threading.RLock()
+
+# Write versions behind the ETags on GET responses. Bumped after each write,
+# and for every video when the file is re-parsed after an outside change.
+versions = VersionTracker()
+# Recent inserts/deletes for delta sync (/api/validations/changes)
+change_log = ChangeLog()
+# Cached records by timestamp, per validator and per status (validator/status/from/to
+# queries). Rebuilt when the file is re-parsed, updated by the writer thread.
+query_index = SecondaryIndex()
+_index_lock = threading.Lock()
+
+# Single writer thread; concurrent writes queued while a write is in progress
+# are coalesced into the next file write.
+JSON_WRITE_MAX_BATCH = int(os.getenv("JSON_WRITE_MAX_BATCH", "256"))
+JSON_WRITE_COALESCE_MS = float(os.getenv("JSON_WRITE_COALESCE_MS", "0"))
+_writer = None
+_writer_lock = threading.Lock()
+# Idempotency keys of recent saves (checked on the writer thread)
+idempotency = IdempotencyStore()
+# Serialized (and compressed) bodies of the large reads, keyed on the data version
+response_cache = ResponseCache()
+
+
+def _file_key():
     try:
-        with open(DB_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {"validations": {}}
+        st = os.stat(DB_FILE)
+        return (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+
+def load_database() -> Dict:
+    """Load validation database, re-parsing the file only if it changed."""
+    global _cache
+    key = _file_key()
+    cached_key, cached_data = _cache
+    if key is not None and key == cached_key:
+        return cached_data
+    with _cache_lock:
+        cached_key, cached_data = _cache
+        if key is not None and key == cached_key:
+            return cached_data
+        try:
+            with open(DB_FILE, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {"validations": {}}
+        data["validations"] = {
+            video_id: [ValidationRecord.from_dict(v, video_id) for v in validations]
+            for video_id, validations in data.get("validations", {}).items()
+        }
+        with _index_lock:
+            query_index.build(
+                (record, record) for records in data["validations"].values() for record in records
+            )
+        _cache = (key, data)
+        change_log.reset(versions.bump_all())
+        return data
 
 
 def save_database(data: Dict):
-    """Save validation database to JSON file."""
-    with open(DB_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    """Atomically save the database (temp file + rename) and refresh the cache."""
+    global _cache
+    tmp_file = DB_FILE.with_name(DB_FILE.name + ".tmp")
+    with open(tmp_file, 'w') as f:
+        # Written video by video so the dict form never exists for the whole database
+        f.write("{")
+        for key, value in data.items():
+            if key != "validations":
+                f.write(json.dumps(key) + ":" + json.dumps(value, separators=(",", ":")) + ",")
+        f.write('"validations":{')
+        for i, (video_id, records) in enumerate(data.get("validations", {}).items()):
+            f.write(("," if i else "") + json.dumps(video_id) + ":" +
+                    json.dumps(to_dicts(records), separators=(",", ":")))
+        f.write("}}")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, DB_FILE)
+    with _cache_lock:
+        _cache = (_file_key(), data)
+
+
+def _apply_writes(ops: List[Dict]) -> List:
+    """
+    Apply a batch of queued writes (runs on the writer thread). Saves queued
+    after a delete go into a second file write, so they are checked against
+    the idempotency keys as the delete left them.
+    """
+    results = []
+    start = 0
+    for end in range(1, len(ops) + 1):
+        if end == len(ops) or (ops[end]["op"] == "insert" and ops[end - 1]["op"] == "delete"):
+            results.extend(_commit_writes(ops[start:end]))
+            start = end
+    return results
+
+
+def _commit_writes(ops: List[Dict]) -> List:
+    """
+    Apply writes (saves before deletes) with one file write. Builds a new
+    top-level dict and copies only the touched per-video lists, so readers
+    holding the previous cached data never see a partial update.
+    """
+    data = load_database()
+    validations = dict(data.get("validations", {}))
+    results = []
+    changes = []
+    added = []
+    removed = []
+    touched = []
+    deleted = set()
+    # Retried saves are answered from their idempotency key, not written again;
+    # a replay reports the video's current count
+    plan = plan_batch(idempotency, [op.get("key") for op in ops])
+    for op, step in zip(ops, plan):
+        video_id = op["video_id"]
+        if isinstance(step, (Replay, Repeat)):
+            results.append((len(validations.get(video_id, [])), True))
+        elif step is not WRITE:
+            results.append(step)  # IdempotencyConflict
+        elif op["op"] == "insert":
+            record = ValidationRecord.from_dict(op["validation"], video_id)
+            validations[video_id] = validations.get(video_id, []) + [record]
+            added.append(record)
+            touched.append(video_id)
+            results.append((len(validations[video_id]), False))
+            changes.append({"op": "insert", "video_id": video_id, "validation": op["validation"]})
+        elif op["op"] == "delete":
+            records = validations.pop(video_id, None)
+            touched.append(video_id)
+            deleted.add(video_id)
+            results.append(records is not None)
+            if records is not None:
+                removed.extend(records)
+                changes.append({"op": "delete", "video_id": video_id})
+    if not touched:
+        return results
+    with _cache_lock:
+        save_database({**data, "validations": validations})
+        with _index_lock:
+            for record in added:
+                query_index.add(record, record)
+            for record in removed:
+                query_index.remove(record, record)
+        change_log.record(versions.bump(touched), changes)
+    # A deleted save must not be replayed: its video's keys go with it
+    idempotency.discard_videos(deleted)
+    idempotency.put_many(
+        (op["key"].key, op["video_id"], op["key"].fingerprint, result[0])
+        for op, step, result in zip(ops, plan, results)
+        if step is WRITE and op.get("key") is not None and op["video_id"] not in deleted
+    )
+    return results
+
+
+def get_writer() -> GroupCommitter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                writer = GroupCommitter(
+                    _apply_writes,
+                    max_batch=JSON_WRITE_MAX_BATCH,
+                    max_delay=JSON_WRITE_COALESCE_MS / 1000,
+                )
+                writer.start()
+                _writer = writer
+    return _writer
+
+
+def write_database(op: Dict):
+    """Queue a write for the writer thread and wait until it is on disk."""
+    return get_writer().submit(op)
+
+
+def write_database_many(ops: List[Dict]) -> List:
+    """Queue writes that go to disk together; returns their results (failures as exceptions)."""
+    return get_writer().submit_many(ops)
 
 
 @app.get("/")
@@ -83,59 +271,207 @@ def root():
     return {"message": "Sign Segmentation Validator API", "status": "running"}
 
 
+def iter_video_validations(cursor: Optional[str] = None):
+    """Yield (video_id, validations) in video_id order, after `cursor`."""
+    validations = load_database().get("validations", {})
+    for video_id in sorted(validations):
+        if cursor is None or video_id > cursor:
+            yield video_id, to_dicts(validations[video_id])
+
+
+def iter_matching_validations(query: ValidationQuery, cursor: Optional[str] = None):
+    """
+    Filtered (video_id, validations) groups, after `cursor`, from the secondary
+    indexes. The matching records are ordered by video, so each group is
+    converted only when it is reached.
+    """
+    load_database()
+    with _index_lock:
+        records = query_index.candidates(query)
+    matching = sorted((record for record in records
+                       if (cursor is None or record.video_id > cursor) and query.matches(record)),
+                      key=lambda record: record.video_id)
+    return ((video_id, to_dicts(group)) for video_id, group in groupby(matching, key=attrgetter("video_id")))
+
+
 @app.get("/api/validations")
-def get_all_validations():
-    """Get all validation results."""
-    db = load_database()
-    return {"validations": db.get("validations", {})}
+def get_all_validations(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+    validator: Optional[str] = None,
+    status: Optional[str] = None,
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+):
+    """
+    Get all validation results.
+    Pass limit/cursor to page through videos, or format=ndjson
+    (or Accept: application/x-ndjson) to stream one video per line.
+    validator/status/from/to (inclusive ISO timestamps) filter the validations.
+    """
+    try:
+        query = ValidationQuery(validator, status, from_, to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    load_database()  # picks up outside changes to the file before tagging
+    ndjson = wants_ndjson(request, format)
+    etag = etag_variant(versions.etag(), "ndjson") if ndjson else versions.etag()
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    if query:
+        groups = iter_matching_validations(query, cursor)
+        if ndjson:
+            return set_etag(ndjson_response(groups), etag)
+        if limit is None and cursor is None:
+            return json_response(request, {"validations": dict(groups)}, etag)
+        set_etag(response, etag)
+        return paginate(groups, limit or DEFAULT_PAGE_SIZE)
+    if ndjson:
+        return set_etag(ndjson_response(iter_video_validations(cursor)), etag)
+    if limit is None and cursor is None:
+        # The same bytes for every request until the next write
+        entry = response_cache.get_or_build(("validations", etag), lambda: {"validations": {
+            video_id: to_dicts(records) for video_id, records in load_database().get("validations", {}).items()
+        }}, etag)
+        return body_response(request, entry)
+    set_etag(response, etag)
+    return paginate(iter_video_validations(cursor), limit or DEFAULT_PAGE_SIZE)
+
+
+@app.get("/api/validations/changes")
+def get_validation_changes(request: Request, since: Optional[str] = None):
+    """
+    Delta sync. Without `since`: every validation plus the current version token.
+    With `since`: only the inserts/deletes after that version, plus the new token.
+    Answers 410 (resync) when `since` is older than the change log retains.
+    """
+    load_database()  # picks up outside changes to the file
+    if since is None:
+        with _cache_lock:
+            data = load_database()
+            token = versions.token(change_log.version)
+        entry = response_cache.get_or_build(("changes", token), lambda: {
+            "version": token,
+            "full": True,
+            "validations": {video_id: to_dicts(records) for video_id, records in data.get("validations", {}).items()}
+        })
+        return body_response(request, entry)
+    
+    parsed = versions.parse_token(since)
+    result = change_log.since(parsed) if parsed is not None else None
+    if result is None:
+        return resync_response(versions.token(change_log.version))
+    version, changes = result
+    return json_response(request, {"version": versions.token(version), "full": False, "changes": changes})
 
 
 @app.get("/api/validations/{video_id}")
-def get_video_validations(video_id: str):
+def get_video_validations(video_id: str, request: Request, response: Response):
     """Get validation results for a specific video."""
+    load_database()
+    etag = versions.etag(video_id)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
     db = load_database()
     validations = db.get("validations", {})
     return {
         "video_id": video_id,
-        "validations": validations.get(video_id, [])
+        "validations": to_dicts(validations.get(video_id, []))
     }
 
 
 @app.post("/api/validations", response_model=ValidationResponse)
-def save_validation(request: ValidationRequest):
-    """Save a validation result for a video."""
-    db = load_database()
-    
-    if "validations" not in db:
-        db["validations"] = {}
-    
+def save_validation(request: ValidationRequest, response: Response,
+                    idempotency_header: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """
+    Save a validation result for a video. A retry with the same Idempotency-Key
+    (or the same video_id/timestamp/validator) gets the first save's response.
+    """
     video_id = request.video_id
     validation = request.validation.dict()
+    try:
+        key = idempotency_key(idempotency_header, video_id, validation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Add validation to the list for this video
-    if video_id not in db["validations"]:
-        db["validations"][video_id] = []
-    
-    db["validations"][video_id].append(validation)
-    
-    # Save to database
-    save_database(db)
+    # Append to this video's list (serialized through the writer thread)
+    try:
+        total, replayed = write_database({"op": "insert", "video_id": video_id,
+                                          "validation": validation, "key": key})
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    mark_replayed(response, replayed)
     
     return ValidationResponse(
         success=True,
         message="Validation saved successfully",
         video_id=video_id,
-        total_validations=len(db["validations"][video_id])
+        total_validations=total
     )
 
 
+@app.post("/api/validations/batch", response_model=BatchValidationResponse)
+def save_validations_batch(requests: List[ValidationRequest]):
+    """
+    Save many validations with one file write. Items already saved (same
+    video_id/timestamp/validator and body) are reported as replayed.
+    """
+    keys = batch_keys(requests)
+    outcomes = write_database_many([
+        {"op": "insert", "video_id": request.video_id,
+         "validation": request.validation.dict(), "key": key}
+        for request, key in zip(requests, keys)
+    ])
+    validations = load_database().get("validations", {})
+    totals = {request.video_id: len(validations.get(request.video_id, [])) for request in requests}
+    return batch_response(requests, outcomes, totals)
+
+
 @app.get("/api/status/{video_id}")
-def get_video_status(video_id: str):
+def get_video_status(video_id: str, request: Request, response: Response):
     """Get the latest validation status for a video."""
+    load_database()
+    etag = versions.etag(video_id)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
     db = load_database()
-    validations = db.get("validations", {}).get(video_id, [])
-    
-    if not validations:
+    return video_status(db.get("validations", {}), video_id)
+
+
+@app.get("/api/status")
+def get_video_statuses(request: Request, response: Response, ids: str = ""):
+    """Latest status of several videos (ids=a,b,c) from one load of the database."""
+    video_ids = status_ids(ids)
+    load_database()
+    etag = versions.etag()
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
+    validations = load_database().get("validations", {})
+    return {"statuses": {video_id: video_status(validations, video_id) for video_id in video_ids}}
+
+
+@app.post("/api/status")
+def post_video_statuses(request: StatusBatchRequest):
+    """GET /api/status with the ids in the body, for lists too long for a URL."""
+    video_ids = status_ids(request.ids)
+    validations = load_database().get("validations", {})
+    return {"statuses": {video_id: video_status(validations, video_id) for video_id in video_ids}}
+
+
+def video_status(validations: Dict, video_id: str) -> dict:
+    """Latest validation status of a video (newest parsed timestamp, the first saved on a tie)."""
+    records = validations.get(video_id, [])
+    if not records:
         return {
             "video_id": video_id,
             "status": "pending",
@@ -143,18 +479,24 @@ def get_video_status(video_id: str):
             "has_feedback": False
         }
     
-    latest = validations[-1]
+    latest = latest_record(records)
     return {
         "video_id": video_id,
-        "status": latest["status"],
-        "last_updated": latest["timestamp"],
-        "has_feedback": bool(latest.get("feedback", "").strip())
+        "status": latest.status,
+        "last_updated": latest.timestamp,
+        "has_feedback": bool(latest.feedback.strip())
     }
 
 
 @app.get("/api/stats")
-def get_validation_stats():
+def get_validation_stats(request: Request, response: Response):
     """Get overall validation statistics."""
+    load_database()
+    etag = versions.etag()
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    set_etag(response, etag)
     db = load_database()
     validations = db.get("validations", {})
     
@@ -168,8 +510,7 @@ def get_validation_stats():
         if not video_validations:
             pending += 1
         else:
-            latest = video_validations[-1]
-            status = latest["status"]
+            status = latest_record(video_validations).status
             if status == "correct":
                 completed += 1
             elif status == "incorrect":
@@ -188,14 +529,46 @@ def get_validation_stats():
     }
 
 
+def iter_export_rows(filters: ExportFilters):
+    """Rows for /api/export from the cached database."""
+    validations = load_database().get("validations", {})
+    video_ids = [filters.video_id] if filters.video_id is not None else sorted(validations)
+    for video_id in video_ids:
+        for record in validations.get(video_id, []):
+            if filters.matches(video_id, record):
+                yield export_row(video_id, record.to_dict())
+
+
+@app.get("/api/export")
+def export_validations(
+    format: str = "csv",
+    video_id: Optional[str] = None,
+    status: Optional[str] = None,
+    validator: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Export validations as csv, parquet or arrow, streamed one record batch at a
+    time. Filters (video_id, status, validator, since/until timestamps) are
+    applied by the storage query.
+    """
+    try:
+        filters = ExportFilters(video_id, status, validator, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return export_response(iter_export_rows(filters), format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
 @app.delete("/api/validations/{video_id}")
 def delete_video_validations(video_id: str):
     """Delete all validations for a video (admin function)."""
-    db = load_database()
-    
-    if video_id in db.get("validations", {}):
-        del db["validations"][video_id]
-        save_database(db)
+    if write_database({"op": "delete", "video_id": video_id}):
         return {"success": True, "message": f"Validations deleted for {video_id}"}
     else:
         raise HTTPException(status_code=404, detail="Video not found")
@@ -4,14 +4,22 @@ FastAPI backend for storing and retrieving sign segmentation validation results.
 Uses MongoDB (NoSQL database) for scalable, persistent storage.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import Dict, List, Optional
-from datetime import datetime
+from typing import List, Optional
+from itertools import groupby
 import os
 
+from validation_batch import BatchValidationResponse, StatusBatchRequest, batch_keys, batch_response, status_ids
+from validation_export import ExportFilters, export_response, export_row
+from validation_idempotency import IdempotencyConflict, IdempotencyInProgress, idempotency_key, mark_replayed
+from validation_index import ValidationQuery
+from validation_mongo import (COLLECTION_NAME, DB_NAME, VALIDATION_FIELDS, MongoStore, ValidationRequest,
+                              ValidationResponse, export_query, query_filter, run, video_status)
+from validation_paging import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, group_videos, ndjson_response, paginate, wants_ndjson
+from validation_versions import etag_variant, not_modified, set_etag
+
 # MongoDB imports
 try:
     from pymongo import MongoClient
@@ -32,33 +40,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB connection
+# MongoDB connection (collections: see validation_mongo.py)
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-DB_NAME = "sign_validation_db"
-COLLECTION_NAME = "validations"
 
 client = None
 db = None
-collection = None
+store = None
 
 
-def connect_mongodb():
-    """Connect to MongoDB and initialize database/collection."""
-    global client, db, collection
+def connect_mongodb(mongo_client=None):
+    """
+    Connect to MongoDB and initialize database/collections.
+    `mongo_client` replaces the MongoClient (e.g. mongomock in tests).
+    """
+    global client, db, store
     
     if not MONGODB_AVAILABLE:
         raise RuntimeError("MongoDB driver (pymongo) not installed. Install with: pip install pymongo")
     
     try:
-        client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+        client = mongo_client or MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
         # Test connection
         client.admin.command('ping')
         db = client[DB_NAME]
-        collection = db[COLLECTION_NAME]
-        
-        # Create indexes for better query performance
-        collection.create_index("video_id")
-        collection.create_index([("video_id", 1), ("timestamp", -1)])
+        store = MongoStore(db)
+        repaired = run(store.setup())
+        if repaired:
+            print(f"✓ Rebuilt validation counters for {repaired} videos")
         
         print(f"✓ Connected to MongoDB: {DB_NAME}.{COLLECTION_NAME}")
         return True
@@ -75,34 +83,23 @@ def connect_mongodb():
 # Try to connect on startup
 @app.on_event("startup")
 async def startup_event():
+    if store is not None:
+        return  # already connected (e.g. connect_mongodb() called with mongomock)
     if not connect_mongodb():
         print("\n⚠️  MongoDB not available. API will not work properly.")
         print("   Install MongoDB: https://www.mongodb.com/try/download/community")
         print("   Or use validation_api.py with JSON storage instead.\n")
 
 
-class ValidationEntry(BaseModel):
-    timestamp: str
-    status: str  # "correct", "incorrect", "needs_review"
-    feedback: str
-    validator: str = "community_member"
-
-
-class ValidationRequest(BaseModel):
-    video_id: str
-    validation: ValidationEntry
-
-
-class ValidationResponse(BaseModel):
-    success: bool
-    message: str
-    video_id: str
-    total_validations: int
+def require_connection() -> MongoStore:
+    if store is None:
+        raise HTTPException(status_code=503, detail="MongoDB not connected")
+    return store
 
 
 @app.get("/")
 def root():
-    mongodb_status = "connected" if (client and db) else "disconnected"
+    mongodb_status = "connected" if (client is not None and db is not None) else "disconnected"
     return {
         "message": "Sign Segmentation Validator API - MongoDB",
         "status": "running",
@@ -110,168 +107,251 @@ def root():
     }
 
 
+def iter_video_validations(cursor: Optional[str] = None):
+    """
+    Yield (video_id, validations) in video_id order, after `cursor`.
+    Streams from a server-side cursor over the (video_id, timestamp) index.
+    """
+    query = {"video_id": {"$gt": cursor}} if cursor is not None else {}
+    docs = store.validations.find(query, VALIDATION_FIELDS).sort([("video_id", 1), ("timestamp", 1)]).batch_size(1000)
+    for video_id, group in groupby(docs, key=lambda doc: doc["video_id"]):
+        yield video_id, [{k: v for k, v in doc.items() if k != "video_id"} for doc in group]
+
+
+def iter_matching_validations(query: ValidationQuery, cursor: Optional[str] = None):
+    """
+    Filtered (video_id, validations) groups, after `cursor`, using the
+    (validator, timestamp), (status, timestamp) and (timestamp) indexes. The
+    time range in the filter is a superset (see ValidationQuery.text_bounds).
+    Documents come from the server-side cursor ordered by video_id, so each
+    group is yielded as soon as the next video starts.
+    """
+    docs = store.validations.find(query_filter(query, cursor), VALIDATION_FIELDS).sort(
+        [("video_id", 1), ("timestamp", 1)]).batch_size(1000)
+    return group_videos((doc["video_id"], doc) for doc in docs if query.matches(doc))
+
+
 @app.get("/api/validations")
-def get_all_validations():
-    """Get all validation results grouped by video_id."""
-    if not collection:
-        raise HTTPException(status_code=503, detail="MongoDB not connected")
+def get_all_validations(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+    validator: Optional[str] = None,
+    status: Optional[str] = None,
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+):
+    """
+    Get all validation results grouped by video_id.
+    Pass limit/cursor to page through videos, or format=ndjson
+    (or Accept: application/x-ndjson) to stream one video per line.
+    validator/status/from/to (inclusive ISO timestamps) filter the validations.
+    """
+    try:
+        query = ValidationQuery(validator, status, from_, to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    mongo = require_connection()
     
     try:
-        # Group by video_id
-        pipeline = [
-            {"$group": {
-                "_id": "$video_id",
-                "validations": {"$push": "$$ROOT"}
-            }},
-            {"$project": {
-                "_id": 0,
-                "video_id": "$_id",
-                "validations": {
-                    "$map": {
-                        "input": "$validations",
-                        "as": "v",
-                        "in": {
-                            "timestamp": "$$v.timestamp",
-                            "status": "$$v.status",
-                            "feedback": "$$v.feedback",
-                            "validator": "$$v.validator"
-                        }
-                    }
-                }
-            }}
-        ]
-        
-        results = list(collection.aggregate(pipeline))
-        validations_dict = {item["video_id"]: item["validations"] for item in results}
-        
-        return {"validations": validations_dict}
+        ndjson = wants_ndjson(request, format)
+        etag = run(mongo.current_etag())
+        if ndjson:
+            etag = etag_variant(etag, "ndjson")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        if limit is None and cursor is None and not ndjson:
+            return run(mongo.listing_response(request, etag, query))
+        groups = iter_matching_validations(query, cursor) if query else iter_video_validations(cursor)
+        if ndjson:
+            return set_etag(ndjson_response(groups), etag)
+        set_etag(response, etag)
+        return paginate(groups, limit or DEFAULT_PAGE_SIZE)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/validations/changes")
+def get_validation_changes(request: Request, since: Optional[str] = None):
+    """
+    Delta sync. Without `since`: every validation plus the current version token.
+    With `since`: only the inserts/deletes after that version, plus the new token.
+    Answers 410 (resync) when `since` is older than the change log retains.
+    """
+    mongo = require_connection()
+    
+    try:
+        return run(mongo.changes_response(request, since))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
 @app.get("/api/validations/{video_id}")
-def get_video_validations(video_id: str):
+def get_video_validations(video_id: str, request: Request, response: Response):
     """Get validation results for a specific video."""
-    if not collection:
-        raise HTTPException(status_code=503, detail="MongoDB not connected")
+    mongo = require_connection()
     
     try:
-        # Find all validations for this video, sorted by timestamp
-        cursor = collection.find(
-            {"video_id": video_id},
-            {"_id": 0, "video_id": 0}  # Exclude MongoDB _id and video_id from results
-        ).sort("timestamp", 1)
-        
-        validations = list(cursor)
+        etag = run(mongo.current_etag(video_id))
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
         
         return {
             "video_id": video_id,
-            "validations": validations
+            "validations": run(mongo.video_validations(video_id))
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
 @app.post("/api/validations", response_model=ValidationResponse)
-def save_validation(request: ValidationRequest):
-    """Save a validation result for a video."""
-    if not collection:
-        raise HTTPException(status_code=503, detail="MongoDB not connected")
+def save_validation(request: ValidationRequest, response: Response,
+                    idempotency_header: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """
+    Save a validation result for a video. A retry with the same Idempotency-Key
+    (or the same video_id/timestamp/validator) gets the first save's response.
+    """
+    mongo = require_connection()
+    try:
+        key = idempotency_key(idempotency_header, request.video_id, request.validation.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        video_id = request.video_id
-        validation = request.validation.dict()
-        validation["video_id"] = video_id  # Store video_id in document
-        
-        # Insert validation document
-        result = collection.insert_one(validation)
-        
-        # Count total validations for this video
-        total = collection.count_documents({"video_id": video_id})
-        
+        total, replayed = run(mongo.save(key, request.video_id, request.validation.dict()))
+        mark_replayed(response, replayed)
         return ValidationResponse(
             success=True,
             message="Validation saved successfully",
-            video_id=video_id,
+            video_id=request.video_id,
             total_validations=total
         )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/validations/batch", response_model=BatchValidationResponse)
+def save_validations_batch(requests: List[ValidationRequest]):
+    """
+    Save many validations with one insert_many. Items already saved (same
+    video_id/timestamp/validator and body) are reported as replayed.
+    """
+    mongo = require_connection()
+    keys = batch_keys(requests)
+    
+    try:
+        outcomes, totals = run(mongo.save_batch(keys, [(request.video_id, request.validation.dict())
+                                                       for request in requests]))
+        return batch_response(requests, outcomes, totals)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
 @app.get("/api/status/{video_id}")
-def get_video_status(video_id: str):
+def get_video_status(video_id: str, request: Request, response: Response):
     """Get the latest validation status for a video."""
-    if not collection:
-        raise HTTPException(status_code=503, detail="MongoDB not connected")
+    mongo = require_connection()
     
     try:
-        # Find latest validation for this video
-        latest = collection.find_one(
-            {"video_id": video_id},
-            sort=[("timestamp", -1)],
-            projection={"_id": 0, "video_id": 0}
-        )
+        etag = run(mongo.current_etag(video_id))
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return video_status(video_id, run(mongo.latest_validation(video_id)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/status")
+def get_video_statuses(request: Request, response: Response, ids: str = ""):
+    """Latest status of several videos (ids=a,b,c) with one aggregation."""
+    mongo = require_connection()
+    video_ids = status_ids(ids)
         
-        if not latest:
-            return {
-                "video_id": video_id,
-                "status": "pending",
-                "last_updated": None,
-                "has_feedback": False
-            }
+    try:
+        etag = run(mongo.current_etag())
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return run(mongo.statuses(video_ids))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/status")
+def post_video_statuses(request: StatusBatchRequest):
+    """GET /api/status with the ids in the body, for lists too long for a URL."""
+    mongo = require_connection()
+    video_ids = status_ids(request.ids)
         
-        return {
-            "video_id": video_id,
-            "status": latest["status"],
-            "last_updated": latest["timestamp"],
-            "has_feedback": bool(latest.get("feedback", "").strip())
-        }
+    try:
+        return run(mongo.statuses(video_ids))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
 @app.get("/api/stats")
-def get_validation_stats():
-    """Get overall validation statistics."""
-    if not collection:
-        raise HTTPException(status_code=503, detail="MongoDB not connected")
+def get_validation_stats(request: Request, response: Response):
+    """Get overall validation statistics (one aggregation, see STATS_PIPELINE)."""
+    mongo = require_connection()
     
     try:
-        # Get distinct video IDs
-        video_ids = collection.distinct("video_id")
-        total_videos = len(video_ids)
-        
-        # Get latest status for each video
-        pipeline = [
-            {"$sort": {"video_id": 1, "timestamp": -1}},
-            {"$group": {
-                "_id": "$video_id",
-                "latest_status": {"$first": "$status"}
-            }}
-        ]
-        
-        status_counts = {"pending": 0, "correct": 0, "incorrect": 0, "needs_review": 0, "in_progress": 0}
-        
-        for item in collection.aggregate(pipeline):
-            status = item["latest_status"]
-            if status == "correct":
-                status_counts["correct"] += 1
-            elif status == "incorrect":
-                status_counts["incorrect"] += 1
-            elif status == "needs_review":
-                status_counts["needs_review"] += 1
-            else:
-                status_counts["pending"] += 1
-        
-        # Count videos with no validations
-        videos_with_validations = len(set(item["_id"] for item in collection.aggregate(pipeline)))
-        status_counts["pending"] = total_videos - videos_with_validations
-        
-        return {
-            "total_videos": total_videos,
-            **status_counts
-        }
+        etag = run(mongo.current_etag())
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return run(mongo.stats())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+def iter_export_rows(filters: ExportFilters):
+    """Rows for /api/export; the filters run as the MongoDB query (see export_query)."""
+    docs = store.validations.find(
+        export_query(filters),
+        {"_id": 0, "video_id": 1, "timestamp": 1, "status": 1, "validator": 1, "feedback": 1}
+    ).sort([("video_id", 1), ("timestamp", 1)]).batch_size(1000)
+    for doc in docs:
+        if filters.matches(doc["video_id"], doc):
+            yield export_row(doc["video_id"], doc)
+
+
+@app.get("/api/export")
+def export_validations(
+    format: str = "csv",
+    video_id: Optional[str] = None,
+    status: Optional[str] = None,
+    validator: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Export validations as csv, parquet or arrow, streamed one record batch at a
+    time. Filters (video_id, status, validator, since/until timestamps) are
+    applied by the storage query.
+    """
+    try:
+        filters = ExportFilters(video_id, status, validator, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    require_connection()
+    
+    try:
+        return export_response(iter_export_rows(filters), format)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -279,14 +359,13 @@ def get_validation_stats():
 @app.delete("/api/validations/{video_id}")
 def delete_video_validations(video_id: str):
     """Delete all validations for a video (admin function)."""
-    if not collection:
-        raise HTTPException(status_code=503, detail="MongoDB not connected")
+    mongo = require_connection()
     
     try:
-        result = collection.delete_many({"video_id": video_id})
+        deleted = run(mongo.delete_video(video_id))
         return {
             "success": True,
-            "message": f"Deleted {result.deleted_count} validations for {video_id}"
+            "message": f"Deleted {deleted} validations for {video_id}"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
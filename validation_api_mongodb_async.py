@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+FastAPI backend for storing and retrieving sign segmentation validation results.
+Async MongoDB variant: uses PyMongo's asyncio-native AsyncMongoClient so
+endpoints await the database instead of tying up a threadpool worker per call.
+Same API, collections and ETag/delta-sync behaviour as validation_api_mongodb.py.
+"""
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from typing import List, Optional
+import os
+
+from validation_batch import BatchValidationResponse, StatusBatchRequest, batch_keys, batch_response, status_ids
+from validation_export import ExportFilters, export_response, export_row
+from validation_idempotency import IdempotencyConflict, IdempotencyInProgress, idempotency_key, mark_replayed
+from validation_index import ValidationQuery
+from validation_mongo import (COLLECTION_NAME, DB_NAME, VALIDATION_FIELDS, MongoStore, ValidationRequest,
+                              ValidationResponse, export_query, query_filter, run_async, video_status)
+from validation_paging import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, group_videos_async, ndjson_response, paginate_async,
+                               wants_ndjson)
+from validation_versions import etag_variant, not_modified, set_etag
+
+# MongoDB imports (AsyncMongoClient needs pymongo>=4.9)
+try:
+    from pymongo import AsyncMongoClient
+    from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+    MONGODB_AVAILABLE = True
+except ImportError:
+    MONGODB_AVAILABLE = False
+    print("Warning: pymongo>=4.9 not installed. Install with: pip install 'pymongo>=4.9'")
+
+app = FastAPI(title="Sign Segmentation Validator API - MongoDB (async)")
+
+# Enable CORS for frontend
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # In production, specify your frontend URL
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# MongoDB connection (collections: see validation_mongo.py)
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+# Connection pool shared by all requests
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+
+client = None
+db = None
+store = None
+
+
+async def connect_mongodb(mongo_client=None):
+    """
+    Connect to MongoDB and initialize database/collections.
+    `mongo_client` replaces the AsyncMongoClient (e.g. an in-process stand-in for tests).
+    """
+    global client, db, store
+
+    if not MONGODB_AVAILABLE:
+        raise RuntimeError("MongoDB driver (pymongo>=4.9) not installed. Install with: pip install 'pymongo>=4.9'")
+
+    try:
+        client = mongo_client or AsyncMongoClient(
+            MONGODB_URI,
+            serverSelectionTimeoutMS=5000,
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE
+        )
+        # Test connection
+        await client.admin.command('ping')
+        db = client[DB_NAME]
+        store = MongoStore(db)
+        # Counters written by other tools (or lost) are rebuilt from the validations
+        repaired = await run_async(store.setup())
+        if repaired:
+            print(f"✓ Rebuilt validation counters for {repaired} videos")
+
+        print(f"✓ Connected to MongoDB: {DB_NAME}.{COLLECTION_NAME} (pool {MONGODB_MIN_POOL_SIZE}-{MONGODB_MAX_POOL_SIZE})")
+        return True
+    except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+        print(f"✗ MongoDB connection failed: {e}")
+        print(f"  Make sure MongoDB is running on {MONGODB_URI}")
+        print(f"  Or set MONGODB_URI environment variable")
+        return False
+    except Exception as e:
+        print(f"✗ MongoDB error: {e}")
+        return False
+
+
+@app.on_event("startup")
+async def startup_event():
+    if store is not None:
+        return  # already connected (e.g. connect_mongodb() called with a stand-in)
+    if not await connect_mongodb():
+        print("\n⚠️  MongoDB not available. API will not work properly.")
+        print("   Install MongoDB: https://www.mongodb.com/try/download/community")
+        print("   Or use validation_api.py with JSON storage instead.\n")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if client is not None:
+        await client.close()
+
+
+def require_connection() -> MongoStore:
+    if store is None:
+        raise HTTPException(status_code=503, detail="MongoDB not connected")
+    return store
+
+
+@app.get("/")
+async def root():
+    mongodb_status = "connected" if (client is not None and db is not None) else "disconnected"
+    return {
+        "message": "Sign Segmentation Validator API - MongoDB (async)",
+        "status": "running",
+        "mongodb": mongodb_status
+    }
+
+
+async def iter_video_validations(cursor: Optional[str] = None):
+    """
+    Yield (video_id, validations) in video_id order, after `cursor`.
+    Streams from a server-side cursor over the (video_id, timestamp) index.
+    """
+    query = {"video_id": {"$gt": cursor}} if cursor is not None else {}
+    docs = store.validations.find(query, VALIDATION_FIELDS).sort([("video_id", 1), ("timestamp", 1)]).batch_size(1000)
+    current_id, group = None, []
+    async for doc in docs:
+        video_id = doc.pop("video_id")
+        if video_id != current_id and group:
+            yield current_id, group
+            group = []
+        current_id = video_id
+        group.append(doc)
+    if group:
+        yield current_id, group
+
+
+async def iter_matching_validations(query: ValidationQuery, cursor: Optional[str] = None):
+    """
+    Filtered (video_id, validations) groups, after `cursor`, using the
+    (validator, timestamp), (status, timestamp) and (timestamp) indexes. The
+    time range in the filter is a superset (see ValidationQuery.text_bounds).
+    Documents come from the server-side cursor ordered by video_id, so each
+    group is yielded as soon as the next video starts.
+    """
+    docs = store.validations.find(query_filter(query, cursor), VALIDATION_FIELDS).sort(
+        [("video_id", 1), ("timestamp", 1)]).batch_size(1000)
+    rows = ((doc["video_id"], doc) async for doc in docs if query.matches(doc))
+    async for group in group_videos_async(rows):
+        yield group
+
+
+@app.get("/api/validations")
+async def get_all_validations(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+    validator: Optional[str] = None,
+    status: Optional[str] = None,
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+):
+    """
+    Get all validation results grouped by video_id.
+    Pass limit/cursor to page through videos, or format=ndjson
+    (or Accept: application/x-ndjson) to stream one video per line.
+    validator/status/from/to (inclusive ISO timestamps) filter the validations.
+    """
+    try:
+        query = ValidationQuery(validator, status, from_, to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    mongo = require_connection()
+
+    try:
+        ndjson = wants_ndjson(request, format)
+        etag = await run_async(mongo.current_etag())
+        if ndjson:
+            etag = etag_variant(etag, "ndjson")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        if limit is None and cursor is None and not ndjson:
+            return await run_async(mongo.listing_response(request, etag, query))
+        groups = iter_matching_validations(query, cursor) if query else iter_video_validations(cursor)
+        if ndjson:
+            return set_etag(ndjson_response(groups), etag)
+        set_etag(response, etag)
+        return await paginate_async(groups, limit or DEFAULT_PAGE_SIZE)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/validations/changes")
+async def get_validation_changes(request: Request, since: Optional[str] = None):
+    """
+    Delta sync. Without `since`: every validation plus the current version token.
+    With `since`: only the inserts/deletes after that version, plus the new token.
+    Answers 410 (resync) when `since` is older than the change log retains.
+    """
+    mongo = require_connection()
+
+    try:
+        return await run_async(mongo.changes_response(request, since))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/validations/{video_id}")
+async def get_video_validations(video_id: str, request: Request, response: Response):
+    """Get validation results for a specific video."""
+    mongo = require_connection()
+
+    try:
+        etag = await run_async(mongo.current_etag(video_id))
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+
+        return {
+            "video_id": video_id,
+            "validations": await run_async(mongo.video_validations(video_id))
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/validations", response_model=ValidationResponse)
+async def save_validation(request: ValidationRequest, response: Response,
+                          idempotency_header: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """
+    Save a validation result for a video. A retry with the same Idempotency-Key
+    (or the same video_id/timestamp/validator) gets the first save's response.
+    """
+    mongo = require_connection()
+    try:
+        key = idempotency_key(idempotency_header, request.video_id, request.validation.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        total, replayed = await run_async(mongo.save(key, request.video_id, request.validation.dict()))
+        mark_replayed(response, replayed)
+        return ValidationResponse(
+            success=True,
+            message="Validation saved successfully",
+            video_id=request.video_id,
+            total_validations=total
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/validations/batch", response_model=BatchValidationResponse)
+async def save_validations_batch(requests: List[ValidationRequest]):
+    """
+    Save many validations with one insert_many. Items already saved (same
+    video_id/timestamp/validator and body) are reported as replayed.
+    """
+    mongo = require_connection()
+    keys = batch_keys(requests)
+
+    try:
+        outcomes, totals = await run_async(mongo.save_batch(keys, [(request.video_id, request.validation.dict())
+                                                                   for request in requests]))
+        return batch_response(requests, outcomes, totals)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/status/{video_id}")
+async def get_video_status(video_id: str, request: Request, response: Response):
+    """Get the latest validation status for a video."""
+    mongo = require_connection()
+
+    try:
+        etag = await run_async(mongo.current_etag(video_id))
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return video_status(video_id, await run_async(mongo.latest_validation(video_id)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/status")
+async def get_video_statuses(request: Request, response: Response, ids: str = ""):
+    """Latest status of several videos (ids=a,b,c) with one aggregation."""
+    mongo = require_connection()
+    video_ids = status_ids(ids)
+
+    try:
+        etag = await run_async(mongo.current_etag())
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return await run_async(mongo.statuses(video_ids))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/status")
+async def post_video_statuses(request: StatusBatchRequest):
+    """GET /api/status with the ids in the body, for lists too long for a URL."""
+    mongo = require_connection()
+    video_ids = status_ids(request.ids)
+
+    try:
+        return await run_async(mongo.statuses(video_ids))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/stats")
+async def get_validation_stats(request: Request, response: Response):
+    """Get overall validation statistics (one aggregation, see STATS_PIPELINE)."""
+    mongo = require_connection()
+
+    try:
+        etag = await run_async(mongo.current_etag())
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return await run_async(mongo.stats())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+async def iter_export_rows(filters: ExportFilters):
+    """Rows for /api/export; the filters run as the MongoDB query (see export_query)."""
+    docs = store.validations.find(
+        export_query(filters),
+        {"_id": 0, "video_id": 1, "timestamp": 1, "status": 1, "validator": 1, "feedback": 1}
+    ).sort([("video_id", 1), ("timestamp", 1)]).batch_size(1000)
+    async for doc in docs:
+        if filters.matches(doc["video_id"], doc):
+            yield export_row(doc["video_id"], doc)
+
+
+@app.get("/api/export")
+async def export_validations(
+    format: str = "csv",
+    video_id: Optional[str] = None,
+    status: Optional[str] = None,
+    validator: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Export validations as csv, parquet or arrow, streamed one record batch at a
+    time from the async cursor. Filters (video_id, status, validator,
+    since/until timestamps) are applied by the storage query.
+    """
+    try:
+        filters = ExportFilters(video_id, status, validator, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    require_connection()
+
+    try:
+        return export_response(iter_export_rows(filters), format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.delete("/api/validations/{video_id}")
+async def delete_video_validations(video_id: str):
+    """Delete all validations for a video (admin function)."""
+    mongo = require_connection()
+
+    try:
+        deleted = await run_async(mongo.delete_video(video_id))
+        return {
+            "success": True,
+            "message": f"Deleted {deleted} validations for {video_id}"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+# Serve static files (HTML, etc.) - serve from current directory
+try:
+    app.mount("/", StaticFiles(directory=".", html=True), name="static")
+except:
+    pass  # If static files mounting fails, API still works
+
+
+if __name__ == "__main__":
+    import uvicorn
+    print("=" * 70)
+    print("Sign Segmentation Validator API Server - MongoDB (async)")
+    print("=" * 70)
+    print(f"MongoDB URI: {MONGODB_URI}")
+    print(f"Database: {DB_NAME}")
+    print(f"Collection: {COLLECTION_NAME}")
+    print(f"Connection pool: {MONGODB_MIN_POOL_SIZE}-{MONGODB_MAX_POOL_SIZE}")
+    print(f"API will be available at: http://localhost:8001")
+    print("=" * 70)
+    uvicorn.run(app, host="0.0.0.0", port=8001)
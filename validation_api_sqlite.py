@@ -0,0 +1,729 @@
+#!/usr/bin/env python3
+"""
+FastAPI backend for storing and retrieving sign segmentation validation results.
+Uses SQLite (stdlib sqlite3) in WAL mode - indexed queries without running a server.
+Readers never block behind the writer, and several uvicorn workers can share one file.
+"""
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
+from typing import Dict, Iterable, List, Optional
+from pathlib import Path
+from contextlib import contextmanager
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from validation_batch import (BatchValidationResponse, StatusBatchRequest, batch_keys, batch_response,
+                              status_ids)
+from validation_export import ExportFilters, export_response
+from validation_idempotency import (IDEMPOTENCY_TTL_SECONDS, WRITE, IdempotencyConflict, Repeat, Replay,
+                                    StoredResult, check_replay, drop_keys_without_video, idempotency_key,
+                                    mark_replayed, plan_batch)
+from validation_index import ValidationQuery
+from validation_paging import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, group_videos, ndjson_response, paginate, wants_ndjson
+from validation_responses import ResponseCache, body_response, json_response
+from validation_versions import (CHANGE_LOG_RETENTION, etag_variant, make_etag, not_modified,
+                                 resync_response, set_etag)
+
+app = FastAPI(title="Sign Segmentation Validator API - SQLite")
+
+# Enable CORS for frontend
+default_origins = [
+    "https://signsegmentationui-static.onrender.com",
+    "http://localhost:8000",
+    "http://localhost:8001"
+]
+CORS_ORIGINS = os.getenv("CORS_ORIGINS").split(",") if os.getenv("CORS_ORIGINS") else default_origins
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,  # Set CORS_ORIGINS env var in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# SQLite database file
+if os.getenv("RENDER") or os.getenv("RAILWAY_ENVIRONMENT") or os.getenv("DYNO") or os.getenv("PORT"):
+    # Running on cloud platform - use /tmp or persistent storage
+    SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "/tmp/validation_database.sqlite3")
+else:
+    # Local development
+    SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "data/validation_database.sqlite3")
+DB_FILE = Path(SQLITE_DB_PATH)
+DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+# How long a writer waits for another process's write lock before failing
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validations (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_id  TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    status    TEXT NOT NULL,
+    feedback  TEXT NOT NULL DEFAULT '',
+    validator TEXT NOT NULL DEFAULT 'community_member'
+);
+CREATE INDEX IF NOT EXISTS idx_validations_video_ts ON validations (video_id, timestamp);
+-- Secondary indexes for validator / status / time-range queries
+DROP INDEX IF EXISTS idx_validations_status;
+CREATE INDEX IF NOT EXISTS idx_validations_validator_ts ON validations (validator, timestamp);
+CREATE INDEX IF NOT EXISTS idx_validations_status_ts ON validations (status, timestamp);
+CREATE INDEX IF NOT EXISTS idx_validations_ts ON validations (timestamp);
+
+-- Write versions behind the ETags: key '*' is the global version,
+-- 'video:<id>' the global version of that video's last write.
+CREATE TABLE IF NOT EXISTS versions (
+    key     TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+-- One row per write, for delta sync (/api/validations/changes)
+CREATE TABLE IF NOT EXISTS changes (
+    version    INTEGER PRIMARY KEY,
+    op         TEXT NOT NULL,
+    video_id   TEXT NOT NULL,
+    validation TEXT
+);
+
+-- Idempotency keys of recent saves and their total_validations, until expires_at
+-- (or until the video is deleted)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key         TEXT PRIMARY KEY,
+    video_id    TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    result      INTEGER NOT NULL,
+    expires_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at);
+CREATE INDEX IF NOT EXISTS idx_idempotency_video ON idempotency_keys (video_id);
+"""
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# reuses the prepared statement on every call.
+SQL_INSERT = ("INSERT INTO validations (video_id, timestamp, status, feedback, validator) "
+              "VALUES (?, ?, ?, ?, ?)")
+SQL_COUNT_VIDEO = "SELECT COUNT(*) FROM validations WHERE video_id = ?"
+SQL_VIDEO_IDS_AFTER = ("SELECT DISTINCT video_id FROM validations WHERE video_id > ? "
+                       "ORDER BY video_id LIMIT ?")
+SQL_VIDEO_RANGE = ("SELECT video_id, timestamp, status, feedback, validator FROM validations "
+                   "WHERE video_id BETWEEN ? AND ? ORDER BY video_id, timestamp, id")
+SQL_VIDEO = ("SELECT timestamp, status, feedback, validator FROM validations "
+             "WHERE video_id = ? ORDER BY timestamp, id")
+SQL_LATEST = ("SELECT timestamp, status, feedback FROM validations "
+              "WHERE video_id = ? ORDER BY timestamp DESC, id ASC LIMIT 1")
+# SQL_LATEST for a JSON array of video ids, in one pass over the (video_id, timestamp) index
+SQL_LATEST_MANY = """
+SELECT video_id, timestamp, status, feedback FROM (
+    SELECT video_id, timestamp, status, feedback, ROW_NUMBER() OVER (
+        PARTITION BY video_id ORDER BY timestamp DESC, id ASC
+    ) AS rn
+    FROM validations
+    WHERE video_id IN (SELECT value FROM json_each(?))
+) WHERE rn = 1
+"""
+# Latest validation per video (earliest insert wins a timestamp tie, like the TinyDB API)
+SQL_LATEST_STATUS_COUNTS = """
+SELECT status, COUNT(*) FROM (
+    SELECT status, ROW_NUMBER() OVER (
+        PARTITION BY video_id ORDER BY timestamp DESC, id ASC
+    ) AS rn
+    FROM validations
+) WHERE rn = 1 GROUP BY status
+"""
+SQL_DELETE_VIDEO = "DELETE FROM validations WHERE video_id = ?"
+SQL_BUMP_VERSION = ("INSERT INTO versions (key, version) VALUES ('*', 1) "
+                    "ON CONFLICT (key) DO UPDATE SET version = version + 1 RETURNING version")
+SQL_SET_VIDEO_VERSION = ("INSERT INTO versions (key, version) VALUES (?, ?) "
+                         "ON CONFLICT (key) DO UPDATE SET version = excluded.version")
+SQL_GET_VERSION = "SELECT version FROM versions WHERE key = ?"
+SQL_INSERT_CHANGE = "INSERT INTO changes (version, op, video_id, validation) VALUES (?, ?, ?, ?)"
+SQL_PRUNE_CHANGES = "DELETE FROM changes WHERE version <= ?"
+SQL_CHANGES_SINCE = ("SELECT version, op, video_id, validation FROM changes "
+                     "WHERE version > ? AND version <= ? ORDER BY version")
+SQL_GET_IDEMPOTENCY = "SELECT fingerprint, result FROM idempotency_keys WHERE key = ? AND expires_at > ?"
+SQL_PUT_IDEMPOTENCY = ("INSERT OR REPLACE INTO idempotency_keys (key, video_id, fingerprint, result, expires_at) "
+                       "VALUES (?, ?, ?, ?, ?)")
+SQL_PURGE_IDEMPOTENCY = "DELETE FROM idempotency_keys WHERE expires_at <= ?"
+SQL_DELETE_VIDEO_IDEMPOTENCY = "DELETE FROM idempotency_keys WHERE video_id = ?"
+
+# One connection per thread (FastAPI runs sync endpoints on a threadpool)
+_local = threading.local()
+_schema_ready = False
+_schema_lock = threading.Lock()
+# Serialized (and compressed) bodies of the large reads, keyed on the write version
+response_cache = ResponseCache()
+
+
+def get_connection() -> sqlite3.Connection:
+    """Get this thread's connection, opening and configuring it on first use."""
+    global _schema_ready
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(
+            str(DB_FILE),
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,  # autocommit; transactions are explicit
+            cached_statements=256,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        with _schema_lock:
+            if not _schema_ready:
+                drop_keys_without_video(conn)
+                conn.executescript(SCHEMA)
+                _schema_ready = True
+        _local.conn = conn
+    return conn
+
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection):
+    """BEGIN IMMEDIATE ... COMMIT, rolling back on error."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def bump_versions(conn: sqlite3.Connection, video_ids: Iterable[str]) -> int:
+    """Bump the write version inside the caller's write transaction."""
+    version = conn.execute(SQL_BUMP_VERSION).fetchone()[0]
+    for video_id in set(video_ids):
+        conn.execute(SQL_SET_VIDEO_VERSION, (f"video:{video_id}", version))
+    return version
+
+
+def current_version(conn: sqlite3.Connection, video_id: Optional[str] = None) -> int:
+    """Committed write version (global, or for one video)."""
+    row = conn.execute(SQL_GET_VERSION, ("*" if video_id is None else f"video:{video_id}",)).fetchone()
+    return row[0] if row else 0
+
+
+def current_etag(conn: sqlite3.Connection, video_id: Optional[str] = None) -> str:
+    """ETag from the committed write version (global, or for one video)."""
+    return make_etag(f"s{current_version(conn, video_id)}")
+
+
+class TransactionKeys:
+    """idempotency_keys as a plan_batch() store, read inside the caller's transaction."""
+
+    def __init__(self, conn: sqlite3.Connection, now: float):
+        self.conn = conn
+        self.now = now
+
+    def get(self, key: str) -> Optional[StoredResult]:
+        stored = self.conn.execute(SQL_GET_IDEMPOTENCY, (key, self.now)).fetchone()
+        return StoredResult(*stored) if stored else None
+
+
+def record_change(conn: sqlite3.Connection, version: int, op: str, video_id: str,
+                  validation: Optional[dict] = None):
+    """Log a write (inside its transaction) and drop entries beyond the retention window."""
+    conn.execute(SQL_INSERT_CHANGE, (version, op, video_id,
+                                     json.dumps(validation) if validation is not None else None))
+    conn.execute(SQL_PRUNE_CHANGES, (version - CHANGE_LOG_RETENTION,))
+
+
+# Initialize on startup
+@app.on_event("startup")
+async def startup_event():
+    try:
+        conn = get_connection()
+        count = conn.execute("SELECT COUNT(*) FROM validations").fetchone()[0]
+        print(f"✓ SQLite initialized: {DB_FILE} ({count} existing records)")
+    except Exception as e:
+        print(f"\n✗ Failed to initialize SQLite: {e}\n")
+        print("   Make sure the data/ directory exists and is writable\n")
+
+
+class ValidationEntry(BaseModel):
+    timestamp: str
+    status: str  # "correct", "incorrect", "needs_review"
+    feedback: str
+    validator: str = "community_member"
+
+
+class ValidationRequest(BaseModel):
+    video_id: str
+    validation: ValidationEntry
+
+
+class ValidationResponse(BaseModel):
+    success: bool
+    message: str
+    video_id: str
+    total_validations: int
+
+
+@app.get("/")
+def root():
+    try:
+        get_connection().execute("SELECT 1")
+        sqlite_status = "connected"
+    except Exception as e:
+        sqlite_status = f"error: {str(e)}"
+    return {
+        "message": "Sign Segmentation Validator API - SQLite",
+        "status": "running",
+        "sqlite": sqlite_status
+    }
+
+
+# Videos fetched per query while iterating all validations
+SCAN_CHUNK_VIDEOS = 200
+
+
+def iter_video_validations(cursor: Optional[str] = None):
+    """
+    Yield (video_id, validations) in video_id order, after `cursor`.
+    Reads SCAN_CHUNK_VIDEOS videos per query (keyset pagination on the index),
+    fetching a connection per chunk since a streaming response may resume
+    the generator on a different thread.
+    """
+    after = cursor if cursor is not None else ""
+    while True:
+        conn = get_connection()
+        video_ids = [row[0] for row in conn.execute(SQL_VIDEO_IDS_AFTER, (after, SCAN_CHUNK_VIDEOS))]
+        if not video_ids:
+            return
+        groups: Dict[str, List[dict]] = {}
+        for video_id, timestamp, status, feedback, validator in conn.execute(
+                SQL_VIDEO_RANGE, (video_ids[0], video_ids[-1])):
+            groups.setdefault(video_id, []).append({
+                "timestamp": timestamp,
+                "status": status,
+                "feedback": feedback,
+                "validator": validator
+            })
+        yield from groups.items()
+        after = video_ids[-1]
+
+
+# Rows per query while streaming filtered results
+MATCH_CHUNK_ROWS = 5000
+
+
+def iter_matching_rows(query: ValidationQuery, cursor: Optional[str] = None):
+    """
+    (video_id, validation) rows matching `query`, after `cursor`, ordered by
+    video_id, then timestamp. The filters become the WHERE clause, served by
+    the (validator, timestamp), (status, timestamp) and (timestamp) indexes;
+    the time range in it is a superset (see ValidationQuery.text_bounds).
+    Rows are read MATCH_CHUNK_ROWS at a time by keyset on (video_id,
+    timestamp, id), with a connection per chunk (see iter_video_validations).
+    """
+    start, end = query.text_bounds()
+    clauses, params = [], []
+    for clause, value in (("validator = ?", query.validator), ("status = ?", query.status),
+                          ("timestamp >= ?", start), ("timestamp <= ?", end),
+                          ("video_id > ?", cursor)):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    after = None
+    while True:
+        keyset = [] if after is None else ["(video_id, timestamp, id) > (?, ?, ?)"]
+        sql = ("SELECT id, video_id, timestamp, status, feedback, validator FROM validations "
+               "WHERE " + " AND ".join(clauses + keyset) + " ORDER BY video_id, timestamp, id LIMIT ?")
+        rows = get_connection().execute(sql, (*params, *(after or ()), MATCH_CHUNK_ROWS)).fetchall()
+        for _, video_id, timestamp, status, feedback, validator in rows:
+            validation = {"timestamp": timestamp, "status": status, "feedback": feedback, "validator": validator}
+            if query.matches(validation):
+                yield video_id, validation
+        if len(rows) < MATCH_CHUNK_ROWS:
+            return
+        after = (rows[-1][1], rows[-1][2], rows[-1][0])
+
+
+def iter_matching_validations(query: ValidationQuery, cursor: Optional[str] = None):
+    """Filtered (video_id, validations) groups, after `cursor`, one video at a time."""
+    return group_videos(iter_matching_rows(query, cursor))
+
+
+@app.get("/api/validations")
+def get_all_validations(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+    validator: Optional[str] = None,
+    status: Optional[str] = None,
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+):
+    """
+    Get all validation results grouped by video_id.
+    Pass limit/cursor to page through videos, or format=ndjson
+    (or Accept: application/x-ndjson) to stream one video per line.
+    validator/status/from/to (inclusive ISO timestamps) filter the validations.
+    """
+    try:
+        query = ValidationQuery(validator, status, from_, to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        ndjson = wants_ndjson(request, format)
+        etag = current_etag(get_connection())
+        if ndjson:
+            etag = etag_variant(etag, "ndjson")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        groups = iter_matching_validations(query, cursor) if query else iter_video_validations(cursor)
+        if ndjson:
+            return set_etag(ndjson_response(groups), etag)
+        if limit is None and cursor is None:
+            if query:
+                return json_response(request, {"validations": dict(groups)}, etag)
+            # Unfiltered: the same bytes for every request until the next write
+            entry = response_cache.get_or_build(("validations", etag), lambda: {"validations": dict(groups)}, etag)
+            return body_response(request, entry)
+        set_etag(response, etag)
+        return paginate(groups, limit or DEFAULT_PAGE_SIZE)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/validations/changes")
+def get_validation_changes(request: Request, since: Optional[str] = None):
+    """
+    Delta sync. Without `since`: every validation plus the current version token.
+    With `since`: only the inserts/deletes after that version, plus the new token.
+    Answers 410 (resync) when `since` is older than the change log retains.
+    """
+    try:
+        conn = get_connection()
+        # One read transaction: WAL gives a consistent snapshot of data + version
+        conn.execute("BEGIN")
+        try:
+            current = current_version(conn)
+            if since is None:
+                entry = response_cache.get_or_build(("changes", current), lambda: {
+                    "version": str(current), "full": True, "validations": dict(iter_video_validations())
+                })
+                return body_response(request, entry)
+            
+            parsed = int(since) if since.isdigit() else None
+            if parsed is None or parsed > current:
+                return resync_response(str(current))
+            changes = []
+            expected = parsed + 1
+            for version, op, video_id, validation in conn.execute(SQL_CHANGES_SINCE, (parsed, current)):
+                if version != expected:
+                    break  # dropped by retention
+                change = {"op": op, "video_id": video_id}
+                if validation is not None:
+                    change["validation"] = json.loads(validation)
+                changes.append(change)
+                expected += 1
+            if len(changes) != current - parsed:
+                return resync_response(str(current))
+            return json_response(request, {"version": str(current), "full": False, "changes": changes})
+        finally:
+            conn.execute("COMMIT")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/validations/{video_id}")
+def get_video_validations(video_id: str, request: Request, response: Response):
+    """Get validation results for a specific video."""
+    try:
+        conn = get_connection()
+        etag = current_etag(conn, video_id)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        validations = [
+            {"timestamp": timestamp, "status": status, "feedback": feedback, "validator": validator}
+            for timestamp, status, feedback, validator in conn.execute(SQL_VIDEO, (video_id,))
+        ]
+        return {
+            "video_id": video_id,
+            "validations": validations
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/validations", response_model=ValidationResponse)
+def save_validation(request: ValidationRequest, response: Response,
+                    idempotency_header: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """
+    Save a validation result for a video. A retry with the same Idempotency-Key
+    (or the same video_id/timestamp/validator) gets the first save's response.
+    """
+    try:
+        key = idempotency_key(idempotency_header, request.video_id, request.validation.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        conn = get_connection()
+        video_id = request.video_id
+        v = request.validation
+
+        # Check the key, insert, count, bump the version and remember the key
+        # in one write transaction (a replay reports the current count)
+        with write_transaction(conn):
+            now = time.time()
+            conn.execute(SQL_PURGE_IDEMPOTENCY, (now,))
+            stored = conn.execute(SQL_GET_IDEMPOTENCY, (key.key, now)).fetchone()
+            replayed = check_replay(key, StoredResult(*stored) if stored else None) is not None
+            if not replayed:
+                conn.execute(SQL_INSERT, (video_id, v.timestamp, v.status, v.feedback, v.validator))
+            total = conn.execute(SQL_COUNT_VIDEO, (video_id,)).fetchone()[0]
+            if not replayed:
+                record_change(conn, bump_versions(conn, [video_id]), "insert", video_id, v.dict())
+                conn.execute(SQL_PUT_IDEMPOTENCY,
+                             (key.key, video_id, key.fingerprint, total, now + IDEMPOTENCY_TTL_SECONDS))
+        mark_replayed(response, replayed)
+
+        return ValidationResponse(
+            success=True,
+            message="Validation saved successfully",
+            video_id=video_id,
+            total_validations=total
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/validations/batch", response_model=BatchValidationResponse)
+def save_validations_batch(requests: List[ValidationRequest]):
+    """
+    Save many validations in one write transaction. Items already saved (same
+    video_id/timestamp/validator and body) are reported as replayed.
+    """
+    keys = batch_keys(requests)
+    try:
+        conn = get_connection()
+        with write_transaction(conn):
+            now = time.time()
+            conn.execute(SQL_PURGE_IDEMPOTENCY, (now,))
+            plan = plan_batch(TransactionKeys(conn, now), keys)
+            totals = {video_id: conn.execute(SQL_COUNT_VIDEO, (video_id,)).fetchone()[0]
+                      for video_id in dict.fromkeys(request.video_id for request in requests)}
+            outcomes = []
+            for request, key, step in zip(requests, keys, plan):
+                if isinstance(step, (Replay, Repeat)):
+                    # The video's count so far, like the saves around it
+                    outcomes.append((totals[request.video_id], True))
+                elif step is not WRITE:
+                    outcomes.append(step)  # IdempotencyConflict
+                else:
+                    video_id, v = request.video_id, request.validation
+                    conn.execute(SQL_INSERT, (video_id, v.timestamp, v.status, v.feedback, v.validator))
+                    totals[video_id] += 1
+                    record_change(conn, bump_versions(conn, [video_id]), "insert", video_id, v.dict())
+                    conn.execute(SQL_PUT_IDEMPOTENCY, (key.key, video_id, key.fingerprint, totals[video_id],
+                                                       now + IDEMPOTENCY_TTL_SECONDS))
+                    outcomes.append((totals[video_id], False))
+        return batch_response(requests, outcomes, totals)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/status/{video_id}")
+def get_video_status(video_id: str, request: Request, response: Response):
+    """Get the latest validation status for a video."""
+    try:
+        conn = get_connection()
+        etag = current_etag(conn, video_id)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        latest = conn.execute(SQL_LATEST, (video_id,)).fetchone()
+        return video_status(video_id, latest)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/status")
+def get_video_statuses(request: Request, response: Response, ids: str = ""):
+    """Latest status of several videos (ids=a,b,c) with one query."""
+    video_ids = status_ids(ids)
+    try:
+        conn = get_connection()
+        etag = current_etag(conn)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return video_statuses(conn, video_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/status")
+def post_video_statuses(request: StatusBatchRequest):
+    """GET /api/status with the ids in the body, for lists too long for a URL."""
+    video_ids = status_ids(request.ids)
+    try:
+        return video_statuses(get_connection(), video_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+def video_status(video_id: str, latest: Optional[tuple]) -> dict:
+    """Status object from a video's latest (timestamp, status, feedback) row, if any."""
+    if latest is None:
+        return {
+            "video_id": video_id,
+            "status": "pending",
+            "last_updated": None,
+            "has_feedback": False
+        }
+
+    timestamp, status, feedback = latest
+    return {
+        "video_id": video_id,
+        "status": status,
+        "last_updated": timestamp,
+        "has_feedback": bool((feedback or "").strip())
+    }
+
+
+def video_statuses(conn: sqlite3.Connection, video_ids: List[str]) -> dict:
+    """Latest status of each video, keyed by video_id."""
+    latest = {row[0]: row[1:] for row in conn.execute(SQL_LATEST_MANY, (json.dumps(video_ids),))}
+    return {"statuses": {video_id: video_status(video_id, latest.get(video_id)) for video_id in video_ids}}
+
+
+@app.get("/api/stats")
+def get_validation_stats(request: Request, response: Response):
+    """Get overall validation statistics."""
+    try:
+        conn = get_connection()
+        etag = current_etag(conn)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        counts = dict(conn.execute(SQL_LATEST_STATUS_COUNTS).fetchall())
+
+        return {
+            "total_videos": sum(counts.values()),
+            "pending": 0,
+            "correct": counts.get("correct", 0),
+            "incorrect": counts.get("incorrect", 0),
+            "needs_review": counts.get("needs_review", 0),
+            "in_progress": 0
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+# Rows per query while exporting
+EXPORT_CHUNK_ROWS = 5000
+
+
+def iter_export_rows(filters: ExportFilters):
+    """
+    Rows for /api/export in insert order. The filters become the WHERE clause;
+    rows are read EXPORT_CHUNK_ROWS at a time by keyset on id, with a
+    connection per chunk (see iter_video_validations). The time range in the
+    WHERE clause is a superset (see ValidationQuery.text_bounds).
+    """
+    since, until = filters.text_bounds()
+    clauses, params = [], []
+    for clause, value in (("video_id = ?", filters.video_id), ("status = ?", filters.status),
+                          ("validator = ?", filters.validator),
+                          ("timestamp >= ?", since), ("timestamp <= ?", until)):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    sql = ("SELECT id, video_id, timestamp, status, validator, feedback FROM validations "
+           "WHERE id > ?" + "".join(f" AND {clause}" for clause in clauses) + " ORDER BY id LIMIT ?")
+    after = 0
+    while True:
+        rows = get_connection().execute(sql, (after, *params, EXPORT_CHUNK_ROWS)).fetchall()
+        if not rows:
+            return
+        for _, video_id, timestamp, status, validator, feedback in rows:
+            if filters.matches(video_id, {"timestamp": timestamp, "status": status, "validator": validator}):
+                yield video_id, timestamp, status, validator, feedback
+        after = rows[-1][0]
+
+
+@app.get("/api/export")
+def export_validations(
+    format: str = "csv",
+    video_id: Optional[str] = None,
+    status: Optional[str] = None,
+    validator: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Export validations as csv, parquet or arrow, streamed one record batch at a
+    time. Filters (video_id, status, validator, since/until timestamps) are
+    applied by the storage query.
+    """
+    try:
+        filters = ExportFilters(video_id, status, validator, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return export_response(iter_export_rows(filters), format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.delete("/api/validations/{video_id}")
+def delete_video_validations(video_id: str):
+    """Delete all validations for a video (admin function)."""
+    try:
+        conn = get_connection()
+        with write_transaction(conn):
+            count = conn.execute(SQL_DELETE_VIDEO, (video_id,)).rowcount
+            # A deleted save must not be replayed: its keys go in the same transaction
+            conn.execute(SQL_DELETE_VIDEO_IDEMPOTENCY, (video_id,))
+            if count:
+                record_change(conn, bump_versions(conn, [video_id]), "delete", video_id)
+        if not count:
+            raise HTTPException(status_code=404, detail="Video not found")
+        return {
+            "success": True,
+            "message": f"Deleted validations for {video_id}",
+            "count": count
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+# Serve static files (HTML, etc.) - serve from current directory
+try:
+    app.mount("/", StaticFiles(directory=".", html=True), name="static")
+except:
+    pass  # If static files mounting fails, API still works
+
+
+if __name__ == "__main__":
+    import uvicorn
+    print("=" * 70)
+    print("Sign Segmentation Validator API Server - SQLite")
+    print("=" * 70)
+    print(f"Database: {DB_FILE}")
+    print(f"API will be available at: http://localhost:8001")
+    print("=" * 70)
+    uvicorn.run(app, host="0.0.0.0", port=8001)
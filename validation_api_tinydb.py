@@ -3,9 +3,13 @@
 FastAPI backend for storing and retrieving sign segmentation validation results.
 Uses TinyDB (lightweight NoSQL database) - simpler alternative to MongoDB.
 No server required, just a Python library.
+
+TinyDB is not thread-safe, so a single writer thread owns the database: every
+save/delete/rebuild is queued to it, and after each commit it publishes an
+immutable snapshot that the request threads read from without locks.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query as QueryParam, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse
@@ -13,16 +17,42 @@ from pydantic import BaseModel
 from typing import Dict, List, Optional
 from pathlib import Path
 from datetime import datetime
+from contextlib import nullcontext
+from itertools import groupby
+from operator import attrgetter
 import os
+import threading
+import time
 
 # TinyDB imports
 try:
     from tinydb import TinyDB, Query
+    from tinydb.middlewares import CachingMiddleware
+    from tinydb.storages import JSONStorage
     TINYDB_AVAILABLE = True
 except ImportError:
     TINYDB_AVAILABLE = False
     print("Warning: tinydb not installed. Install with: pip install tinydb")
 
+from validation_index import LatestStatusTable, ValidationQuery
+from validation_log_storage import LogStructuredDB, seed_once
+from validation_group_commit import GroupCommitter
+from validation_idempotency import (WRITE, IdempotencyConflict, IdempotencyStore, Repeat, Replay,
+                                    SQLiteIdempotencyStore, idempotency_key, mark_replayed, plan_batch)
+from validation_paging import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, ndjson_response, paginate, wants_ndjson
+from validation_batch import (BatchValidationResponse, StatusBatchRequest, batch_keys, batch_response,
+                              status_ids)
+from validation_bootstrap import AnnotationFile, VideoUrlResolver, annotation_paths, bootstrap_etag
+from validation_events import SSE_HEADERS, EventBroadcaster
+from validation_export import ExportFilters, export_response, export_row
+from validation_records import ValidationRecord
+from validation_responses import ResponseCache, body_response, json_response
+from validation_search import SearchIndex, load_or_build
+from validation_shards import ShardedTinyDB
+from validation_snapshot import EMPTY_SNAPSHOT, Snapshot, SnapshotBuilder, VideoRecords
+from validation_versions import ChangeLog, VersionTracker, etag_variant, not_modified, resync_response, set_etag
+from validation_workers import SharedVersion, WorkerCoordinator
+
 app = FastAPI(title="Sign Segmentation Validator API - TinyDB")
 
 # Enable CORS for frontend
@@ -56,27 +86,538 @@ else:
 DB_FILE = Path(DB_PATH)
 DB_FILE.parent.mkdir(parents=True, exist_ok=True)
 
+# Storage engine: "tinydb" (default, rewrites the JSON file on every write),
+# "log" (append-only JSONL log + snapshot, see validation_log_storage.py) or
+# "sharded" (SHARD_COUNT TinyDB files split by video_id, see validation_shards.py)
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "tinydb").lower()
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "8"))
+LOG_FSYNC = os.getenv("LOG_FSYNC", "always")  # always | interval | never
+LOG_FSYNC_INTERVAL = float(os.getenv("LOG_FSYNC_INTERVAL", "1.0"))
+LOG_COMPACT_BYTES = int(os.getenv("LOG_COMPACT_BYTES", str(16 * 1024 * 1024)))
+LOG_COMPACT_INTERVAL = float(os.getenv("LOG_COMPACT_INTERVAL", "60"))
+
+# Group commit: batch concurrent POSTs into one write (see validation_group_commit.py)
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", "5"))
+GROUP_COMMIT_MAX_QUEUE = int(os.getenv("GROUP_COMMIT_MAX_QUEUE", "10000"))
+
+# Full-text index over feedback, saved next to the database (see validation_search.py)
+SEARCH_INDEX_PATH = Path(os.getenv("SEARCH_INDEX_PATH", str(DB_FILE.with_suffix(".search.json"))))
+# How often a changed search index is saved (0 = only at shutdown), so a crash leaves a recent file
+SEARCH_INDEX_SAVE_SECONDS = float(os.getenv("SEARCH_INDEX_SAVE_SECONDS", "60"))
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 1000
+
+# Several worker processes on one data file (see validation_workers.py). On by
+# default when uvicorn is started with WEB_CONCURRENCY > 1.
+MULTI_WORKER = (os.getenv("MULTI_WORKER", "").lower() in ("1", "true", "yes")
+                or int(os.getenv("WEB_CONCURRENCY", "1")) > 1)
+# How often readers stat the data files for other workers' writes (0 = every request)
+WORKER_CHECK_INTERVAL_MS = float(os.getenv("WORKER_CHECK_INTERVAL_MS", "0"))
+# Idle workers also catch up in the background, so SSE clients see every write
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "1.0"))
+
 db = None
 Validation = Query()
 
+# Everything readers see: replaced (never mutated) by the writer after each
+# commit, so request threads read it without locks (see validation_snapshot.py)
+snapshot = EMPTY_SNAPSHOT
+# Writer-only working table behind snapshot.latest / snapshot.status_counts
+latest_table = LatestStatusTable()
+# Write versions behind the ETags on GET responses
+versions = VersionTracker()
+# Recent inserts/deletes for delta sync (/api/validations/changes)
+change_log = ChangeLog()
+# Server-Sent Events subscribers (/api/events)
+events = EventBroadcaster()
+# The single writer thread: owns `db` and applies every mutation in queue order
+writer = None
+_init_lock = threading.Lock()
+# Cross-process lock and change detection, only with several workers
+coordinator = (WorkerCoordinator(DB_FILE.with_suffix(".lock"), WORKER_CHECK_INTERVAL_MS / 1000)
+               if MULTI_WORKER else None)
+# The workers' common write version, so ETags and delta-sync tokens work on any worker
+shared_version = SharedVersion(DB_FILE.with_suffix(".version")) if coordinator is not None else None
+# This worker's use of `db` with several workers: the writer's batches and the
+# reloads request threads do when another worker wrote
+_storage_lock = threading.Lock()
+_stop_background = threading.Event()
+# The search index last saved to SEARCH_INDEX_PATH (published indexes never change)
+_saved_search = None
+_search_save_lock = threading.Lock()
+# Idempotency keys of recent saves; shared through a SQLite file between workers
+idempotency = (SQLiteIdempotencyStore(DB_FILE.with_suffix(".idempotency.sqlite3"))
+               if coordinator is not None else IdempotencyStore())
+# Serialized (and compressed) bodies of the large reads, keyed on the data version
+response_cache = ResponseCache()
+# /api/bootstrap's annotation file (the playback URL cache, video_urls, is
+# next to the /api/videos endpoints)
+annotation_file = AnnotationFile(annotation_paths())
+
+
+if TINYDB_AVAILABLE:
+    class WriteThroughCache(CachingMiddleware):
+        """Serve reads from memory but write every change straight to disk."""
+        WRITE_CACHE_SIZE = 1
+
 
 def get_database():
-    """Get or initialize the database."""
+    """
+    Get or initialize the database (and the first snapshot). With several
+    workers, first picks up whatever the other workers wrote since.
+    """
+    open_database()
+    if coordinator is not None and coordinator.stale():
+        catch_up()
+    return db
+
+
+def catch_up():
+    """
+    Fold the other workers' writes into the snapshot, on the calling thread.
+    A stale read waits at most for the batch this worker is writing, not for
+    the writes queued behind it, and concurrent stale reads reload once.
+    """
+    with _storage_lock:
+        # Reopening the log store may repair it, so only TinyDB reloads share the lock
+        with coordinator.locked(exclusive=STORAGE_ENGINE == "log"):
+            if coordinator.stale(force=True):
+                try:
+                    reload_database()
+                finally:
+                    coordinator.mark_current()
+
+
+def open_database():
+    """Open the storage and build the first snapshot, once."""
     global db
-    if db is None:
-        if not TINYDB_AVAILABLE:
-            raise RuntimeError("TinyDB not installed. Install with: pip install tinydb")
+    if db is not None:
+        return db
+    with _init_lock:
+        if db is not None:
+            return db
+        if coordinator is None:
+            db = load_database()
+        else:
+            # One worker at a time: seeding the log or saving the search index writes files
+            with coordinator.locked():
+                db = load_database()
+                coordinator.watch(storage_files(db))
+                coordinator.mark_current()
+    return db
+
+
+def load_database():
+    """Open the configured storage engine and rebuild the snapshot and indexes from it."""
+    if STORAGE_ENGINE == "log":
         try:
-            db = TinyDB(str(DB_FILE))
-            print(f"✓ TinyDB initialized: {DB_FILE}")
-            print(f"✓ Database file exists: {DB_FILE.exists()}")
-            # Test the database
-            test_count = len(db.all())
-            print(f"✓ Database test: {test_count} existing records")
+            log_db = open_log_database()
+            rebuild_indexes(log_db)
+            print(f"✓ Log storage initialized: {log_db.log_path} ({len(snapshot)} records)")
+            return log_db
         except Exception as e:
-            print(f"✗ Error initializing TinyDB: {e}")
+            print(f"✗ Error initializing log storage: {e}")
             raise
-    return db
+    if not TINYDB_AVAILABLE:
+        raise RuntimeError("TinyDB not installed. Install with: pip install tinydb")
+    if STORAGE_ENGINE == "sharded":
+        try:
+            sharded_db = open_sharded_database()
+            rebuild_indexes(sharded_db)
+            print(f"✓ Sharded TinyDB initialized: {sharded_db.count} shards ({len(snapshot)} records)")
+            return sharded_db
+        except Exception as e:
+            print(f"✗ Error initializing sharded TinyDB: {e}")
+            raise
+    try:
+        tiny_db = open_tinydb()
+        print(f"✓ TinyDB initialized: {DB_FILE}")
+        print(f"✓ Database file exists: {DB_FILE.exists()}")
+        # Build the snapshot and indexes (the only full scan we do)
+        rebuild_indexes(tiny_db)
+        print(f"✓ Database test: {len(snapshot)} existing records")
+        return tiny_db
+    except Exception as e:
+        print(f"✗ Error initializing TinyDB: {e}")
+        raise
+
+
+def open_tinydb(path=DB_FILE):
+    return TinyDB(str(path), storage=WriteThroughCache(JSONStorage))
+
+
+def open_sharded_database(seed: bool = True) -> ShardedTinyDB:
+    """
+    Open the shard files, seeding them from the single TinyDB file on first use
+    (recorded in <base>.shards.seeded). Raises ShardCountMismatch if the shard
+    files on disk were written with another SHARD_COUNT.
+    """
+    base = DB_FILE.with_suffix("")
+    sharded_db = ShardedTinyDB(base, SHARD_COUNT, open_tinydb)
+    if seed:
+        imported = seed_once(sharded_db, DB_FILE, Path(f"{base}.shards.seeded"))
+        if imported:
+            print(f"✓ Imported {imported} records from {DB_FILE} into {SHARD_COUNT} shards")
+    return sharded_db
+
+
+def reopen_database():
+    """A fresh handle on the configured storage (after another worker wrote to it)."""
+    if STORAGE_ENGINE == "log":
+        return open_log_database(seed=False)
+    if STORAGE_ENGINE == "sharded":
+        return open_sharded_database(seed=False)
+    return open_tinydb()
+
+
+def open_log_database(seed: bool = True) -> LogStructuredDB:
+    """
+    Open the append-only log store, seeding it from the TinyDB file on first
+    use (recorded in <base>.log.seeded).
+    """
+    base = DB_FILE.with_suffix("")
+    log_db = LogStructuredDB(
+        base,
+        fsync=LOG_FSYNC,
+        fsync_interval=LOG_FSYNC_INTERVAL,
+        compact_bytes=LOG_COMPACT_BYTES,
+        compact_interval=LOG_COMPACT_INTERVAL,
+        # With several workers the writer compacts, under the cross-process lock
+        auto_compact=coordinator is None,
+    )
+    if seed:
+        imported = seed_once(log_db, DB_FILE, Path(f"{base}.log.seeded"))
+        if imported:
+            log_db.compact()
+            print(f"✓ Imported {imported} records from {DB_FILE}")
+    log_db.start_background()
+    return log_db
+
+
+def storage_files(database) -> List[Path]:
+    """The files another worker's write changes (the shared version included)."""
+    if isinstance(database, LogStructuredDB):
+        files = [database.log_path, database.snapshot_path]
+    elif isinstance(database, ShardedTinyDB):
+        files = list(database.paths)
+    else:
+        files = [DB_FILE]
+    return files + ([shared_version.path] if shared_version is not None else [])
+
+
+def next_version() -> int:
+    """
+    Version of the next publish. With several workers it is claimed from the
+    shared counter (the caller holds the exclusive lock).
+    """
+    if shared_version is None:
+        return versions.version + 1
+    versions.epoch, version = shared_version.claim()
+    return version
+
+
+def rebuild_indexes(database, reuse_search_index: bool = True):
+    """
+    Rebuild the snapshot and every index from the database and publish it
+    (at startup, or on the writer thread). The search index is loaded from
+    disk when it still matches, unless reuse_search_index=False.
+    """
+    global snapshot, _saved_search
+    docs = [(doc.doc_id, doc) for doc in database.all()]
+    search = SearchIndex()
+    outcome = load_or_build(search, SEARCH_INDEX_PATH, docs, reuse=reuse_search_index)
+    _saved_search = search
+    print(f"✓ Search index {outcome}: {search.stats()['terms']} terms")
+    version = next_version()
+    snapshot = SnapshotBuilder.from_documents(docs, latest_table, search).build(version)
+    change_log.reset(versions.bump_all(version))
+
+
+def apply_writes(ops: List[dict]) -> list:
+    """
+    Writer-thread entry point. With several workers the batch runs under the
+    cross-process lock, after catching up with the other workers' writes.
+    """
+    if coordinator is None:
+        return commit_writes(ops)
+    with _storage_lock, coordinator.locked():
+        if coordinator.stale(force=True):
+            reload_database()
+        try:
+            results = commit_writes(ops)
+            if isinstance(db, LogStructuredDB) and db.log_size() >= LOG_COMPACT_BYTES:
+                db.compact()
+        finally:
+            coordinator.mark_current()
+    return results
+
+
+def commit_writes(ops: List[dict]) -> list:
+    """
+    Apply a batch of queued operations on the writer thread, the only code
+    that touches `db`. Consecutive inserts go to storage in one call. The new
+    snapshot is published once for the whole batch, so readers see all of it
+    or none of it. Returns one result per op.
+    """
+    builder = SnapshotBuilder(snapshot, latest_table)
+    touched: List[str] = []
+    changes: List[dict] = []
+    results = []
+    try:
+        for kind, run in groupby(ops, key=lambda op: op["op"]):
+            run = list(run)
+            if kind == "insert":
+                # Retried saves are answered from their idempotency key, not written again;
+                # a replay reports the video's current count
+                plan = plan_batch(idempotency, [op.get("key") for op in run])
+                docs = [op["doc"] for op, step in zip(run, plan) if step is WRITE]
+                written = iter(zip(db.insert_multiple(docs), docs))
+                run_results = []
+                for op, step in zip(run, plan):
+                    if step is WRITE:
+                        doc_id, doc = next(written)
+                        record = stage_insert(builder, doc_id, doc, touched, changes)
+                        run_results.append((len(builder.records(record.video_id)), False))
+                    elif isinstance(step, (Replay, Repeat)):
+                        run_results.append((len(builder.records(op["doc"]["video_id"])), True))
+                    else:
+                        run_results.append(step)  # IdempotencyConflict
+                idempotency.put_many(
+                    (op["key"].key, op["doc"]["video_id"], op["key"].fingerprint, result[0])
+                    for op, step, result in zip(run, plan, run_results)
+                    if step is WRITE and op.get("key") is not None
+                )
+                results.extend(run_results)
+            elif kind == "delete":
+                for op in run:
+                    video_id = op["video_id"]
+                    existing = builder.records(video_id)
+                    removed = db.remove(doc_ids=[doc_id for doc_id, _ in existing]) if existing else []
+                    stage_delete(builder, video_id, touched, changes)
+                    results.append(len(removed))
+                # A deleted save must not be replayed: its video's keys go with it
+                idempotency.discard_videos(op["video_id"] for op in run)
+            else:
+                # Whole-database operations see everything queued before them
+                publish(builder, touched, changes)
+                for op in run:
+                    results.append(apply_admin(op))
+                builder, touched, changes = SnapshotBuilder(snapshot, latest_table), [], []
+    finally:
+        publish(builder, touched, changes)
+    return results
+
+
+def stage_insert(builder: SnapshotBuilder, doc_id: int, doc: dict,
+                 touched: List[str], changes: List[dict]) -> ValidationRecord:
+    """Add a stored document to the next snapshot (and its indexes)."""
+    record = builder.insert(doc_id, doc)
+    touched.append(record.video_id)
+    changes.append({"op": "insert", "video_id": record.video_id, "validation": record.to_dict()})
+    return record
+
+
+def stage_delete(builder: SnapshotBuilder, video_id: str,
+                 touched: List[str], changes: List[dict]) -> VideoRecords:
+    """Drop a video from the next snapshot (and its indexes); returns its old records."""
+    existing = builder.delete(video_id)
+    touched.append(video_id)
+    if existing:
+        changes.append({"op": "delete", "video_id": video_id})
+    return existing
+
+
+def reload_database():
+    """
+    Reopen the storage after another worker wrote to it and fold the
+    difference into the snapshot and indexes (under _storage_lock and the
+    cross-process lock). Documents are never updated in place, so the
+    difference is the ids that appeared and the ids that disappeared. TinyDB
+    can hand out the id of a deleted newest document again, so a known id must
+    also still hold the same document.
+
+    The difference is published under the shared version the other workers
+    left, so this worker's tokens match theirs.
+    """
+    global db
+    started = time.monotonic()
+    versions.epoch, shared = shared_version.read()
+    stale_db = db
+    db = reopen_database()
+    stale_db.close()
+    coordinator.watch(storage_files(db))
+    docs = {doc.doc_id: doc for doc in db.all()}
+    builder = SnapshotBuilder(snapshot, latest_table)
+    touched: List[str] = []
+    changes: List[dict] = []
+    try:
+        kept = set()
+        for video_id, records in snapshot.videos.items():
+            current = [doc_id for doc_id, record in records if same_document(record, docs.get(doc_id))]
+            if len(current) < len(records):
+                stage_delete(builder, video_id, touched, changes)
+                for doc_id in current:  # part of the video survived
+                    stage_insert(builder, doc_id, docs[doc_id], touched, changes)
+            kept.update(current)
+        for doc_id in sorted(docs.keys() - kept):
+            stage_insert(builder, doc_id, docs[doc_id], touched, changes)
+    finally:
+        # A counter behind this worker was lost (or a writer died before advancing it): never reuse a version
+        publish(builder, touched, changes, shared if shared > versions.version else versions.version + 1)
+    if not touched and shared > versions.version:
+        # Writes that changed nothing here (e.g. another worker's startup): take the version only
+        change_log.record(shared, [])
+        versions.bump((), shared)
+    coordinator.record_reload((time.monotonic() - started) * 1000)
+
+
+def same_document(record: ValidationRecord, doc: Optional[dict]) -> bool:
+    """Cheap check that a stored document is still the one a record was made from."""
+    return (doc is not None and record.video_id == doc.get("video_id", "")
+            and record.status == doc.get("status", "") and record.feedback == (doc.get("feedback") or ""))
+
+
+def apply_admin(op: dict):
+    """Rebuild or consistency check, on the writer thread."""
+    if op["op"] == "rebuild":
+        rebuild_indexes(db, reuse_search_index=False)
+        return len(snapshot.latest)
+    if op["op"] == "check":
+        return latest_table.check(db.all())
+    raise ValueError(f"Unknown operation {op['op']!r}")
+
+
+def publish(builder: SnapshotBuilder, touched: List[str], changes: List[dict], version: Optional[int] = None):
+    """
+    Swap in the next snapshot, at `version` (default next_version()). The
+    change log is written first (delta-sync clients never read the snapshot)
+    and the version is bumped last, so an ETag is never newer than the data
+    it is sent with.
+    """
+    global snapshot
+    if not touched:
+        return
+    if version is None:
+        version = next_version()
+    change_log.record(version, changes)
+    snapshot = builder.build(version)
+    versions.bump(touched, version)
+    token = versions.token(version)
+    for video_id in touched:
+        events.publish("validation", video_event(snapshot, video_id), token)
+
+
+def submit_write(op: dict):
+    """Queue an operation for the writer thread and wait for its result."""
+    return get_writer().submit(op)
+
+
+def submit_writes(ops: List[dict]) -> list:
+    """Queue operations committed in one batch; returns their results (failures as exceptions)."""
+    return get_writer().submit_many(ops)
+
+
+def get_writer() -> GroupCommitter:
+    global writer
+    open_database()
+    if writer is None:
+        with _init_lock:
+            if writer is None:
+                committer = GroupCommitter(
+                    apply_writes,
+                    max_batch=GROUP_COMMIT_MAX_BATCH,
+                    # Without group commit, only writes already queued are batched
+                    max_delay=GROUP_COMMIT_MAX_DELAY_MS / 1000 if GROUP_COMMIT else 0,
+                    max_queue=GROUP_COMMIT_MAX_QUEUE,
+                )
+                committer.start()
+                writer = committer
+    return writer
+
+
+def current_snapshot() -> Snapshot:
+    """The latest published snapshot; read it once per request."""
+    get_database()
+    return snapshot
+
+
+def poll_other_workers():
+    """Background loop: catch up with other workers' writes while this one is idle."""
+    while not _stop_background.wait(WORKER_POLL_SECONDS):
+        try:
+            if coordinator.stale(force=True):
+                catch_up()
+        except Exception as e:
+            print(f"✗ Worker sync error: {e}")
+
+
+def save_search_index():
+    """Save the published search index, if it changed since the last save."""
+    global _saved_search
+    with _search_save_lock:
+        search = snapshot.search
+        if search is _saved_search:
+            return
+        # Other workers may be saving the same file
+        with coordinator.locked() if coordinator is not None else nullcontext():
+            search.save(SEARCH_INDEX_PATH)
+        _saved_search = search
+
+
+def save_search_index_periodically():
+    """Background loop: save the search index every SEARCH_INDEX_SAVE_SECONDS while it changes."""
+    while not _stop_background.wait(SEARCH_INDEX_SAVE_SECONDS):
+        try:
+            save_search_index()
+        except OSError as e:
+            print(f"⚠️  Could not save search index to {SEARCH_INDEX_PATH}: {e}")
+
+
+def video_status(snap: Snapshot, video_id: str) -> dict:
+    """Latest status of a video from the snapshot's latest-status map."""
+    latest = snap.latest.get(video_id)
+    if not latest:
+        return {
+            "video_id": video_id,
+            "status": "pending",
+            "last_updated": None,
+            "has_feedback": False
+        }
+    return {
+        "video_id": video_id,
+        "status": latest.status,
+        "last_updated": latest.timestamp,
+        "has_feedback": bool(latest.feedback.strip())
+    }
+
+
+def video_statuses(snap: Snapshot, video_ids: List[str]) -> dict:
+    """Latest status of each video, keyed by video_id."""
+    return {"statuses": {video_id: video_status(snap, video_id) for video_id in video_ids}}
+
+
+def compute_stats(snap: Snapshot) -> dict:
+    """Overall statistics from the latest-status counters (O(1))."""
+    counts = snap.status_counts
+    return {
+        "total_videos": len(snap.latest),
+        "pending": 0,
+        "correct": counts.get("correct", 0),
+        "incorrect": counts.get("incorrect", 0),
+        "needs_review": counts.get("needs_review", 0),
+        "in_progress": 0
+    }
+
+
+def video_event(snap: Snapshot, video_id: str) -> dict:
+    """SSE payload describing a video in a freshly published snapshot."""
+    return {
+        **video_status(snap, video_id),
+        "total_validations": snap.count(video_id),
+        "stats": compute_stats(snap)
+    }
 
 
 # Initialize on startup
@@ -88,11 +629,43 @@ async def startup_event():
         except Exception as e:
             print(f"\n✗ Failed to initialize TinyDB: {e}\n")
             print("   Make sure the outputs/ directory exists and is writable\n")
+        if GROUP_COMMIT:
+            print(f"✓ Group commit enabled (batch {GROUP_COMMIT_MAX_BATCH}, {GROUP_COMMIT_MAX_DELAY_MS} ms)")
+        # Start resolving playback URLs so the first /api/bootstrap already has them
+        try:
+            _, annotations = annotation_file.load()
+            if annotations is not None:
+                video_urls.urls(annotation_video_ids(annotations))
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not read annotations for /api/bootstrap: {e}")
+        if coordinator is not None:
+            threading.Thread(target=poll_other_workers, daemon=True).start()
+            print(f"✓ Multi-worker mode (pid {os.getpid()}, lock {coordinator.lock_path})")
+        if SEARCH_INDEX_SAVE_SECONDS > 0:
+            threading.Thread(target=save_search_index_periodically, daemon=True).start()
     else:
         print("\n⚠️  TinyDB not available. Install with: pip install tinydb\n")
         print("   API endpoints will return 503 Service Unavailable\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    global db, writer
+    _stop_background.set()
+    if writer is not None:
+        writer.stop()  # drains the queue
+        writer = None
+    if db is not None:
+        try:
+            save_search_index()
+        except OSError as e:
+            print(f"⚠️  Could not save search index to {SEARCH_INDEX_PATH}: {e}")
+    video_urls.close()
+    if isinstance(db, (LogStructuredDB, ShardedTinyDB)):
+        db.close()
+        db = None
+
+
 class ValidationEntry(BaseModel):
     timestamp: str
     status: str  # "correct", "incorrect", "needs_review"
@@ -126,44 +699,113 @@ def root():
     }
 
 
+def iter_video_validations(snap: Snapshot, cursor: Optional[str] = None):
+    """Yield (video_id, validations) in video_id order, after `cursor`, one video at a time."""
+    for video_id in snap.video_ids_after(cursor):
+        # to_dict() leaves out video_id (it's in the key)
+        yield video_id, [record.to_dict() for _, record in snap.records(video_id)]
+
+
+def iter_matching_validations(snap: Snapshot, query: ValidationQuery, cursor: Optional[str] = None):
+    """
+    Filtered (video_id, validations) groups, after `cursor`. Candidates come from
+    the narrowest range of the snapshot's own secondary index; the matching
+    records are ordered by video, so each group is converted only when it is
+    reached.
+    """
+    matching = sorted((record for record in snap.index.candidates(query)
+                       if (cursor is None or record.video_id > cursor) and query.matches(record)),
+                      key=lambda record: record.video_id)
+    return ((video_id, [record.to_dict() for record in group])
+            for video_id, group in groupby(matching, key=attrgetter("video_id")))
+
+
 @app.get("/api/validations")
-def get_all_validations():
-    """Get all validation results grouped by video_id."""
+def get_all_validations(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = QueryParam(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: Optional[str] = None,
+    validator: Optional[str] = None,
+    status: Optional[str] = None,
+    from_: Optional[str] = QueryParam(None, alias="from"),
+    to: Optional[str] = None,
+):
+    """
+    Get all validation results grouped by video_id.
+    Pass limit/cursor to page through videos, or format=ndjson
+    (or Accept: application/x-ndjson) to stream one video per line.
+    validator/status/from/to (inclusive ISO timestamps) filter the validations.
+    """
     try:
-        db = get_database()
-        all_docs = db.all()
-        
-        # Group by video_id
-        validations_dict = {}
-        for doc in all_docs:
-            video_id = doc.get("video_id")
-            if video_id not in validations_dict:
-                validations_dict[video_id] = []
-            
-            # Remove video_id from response (it's in the key)
-            validation = {k: v for k, v in doc.items() if k != "video_id"}
-            validations_dict[video_id].append(validation)
+        query = ValidationQuery(validator, status, from_, to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        get_database()
+        ndjson = wants_ndjson(request, format)
+        etag = etag_variant(versions.etag(), "ndjson") if ndjson else versions.etag()
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        snap = snapshot
+        groups = iter_matching_validations(snap, query, cursor) if query else iter_video_validations(snap, cursor)
+        if ndjson:
+            return set_etag(ndjson_response(groups), etag)
+        if limit is None and cursor is None:
+            if query:
+                return json_response(request, {"validations": dict(groups)}, etag)
+            # Unfiltered: the same bytes for every request until the next write
+            entry = response_cache.get_or_build(("validations", etag), lambda: {"validations": dict(groups)}, etag)
+            return body_response(request, entry)
+        set_etag(response, etag)
+        return paginate(groups, limit or DEFAULT_PAGE_SIZE)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/validations/changes")
+def get_validation_changes(request: Request, since: Optional[str] = None):
+    """
+    Delta sync. Without `since`: every validation plus the current version token.
+    With `since`: only the inserts/deletes after that version, plus the new token.
+    Answers 410 (resync) when `since` is older than the change log retains.
+    """
+    try:
+        get_database()
+        if since is None:
+            # The snapshot carries the version it was published at
+            snap = snapshot
+            token = versions.token(snap.version)
+            entry = response_cache.get_or_build(("changes", token), lambda: {
+                "version": token, "full": True, "validations": dict(iter_video_validations(snap))
+            })
+            return body_response(request, entry)
         
-        return {"validations": validations_dict}
+        parsed = versions.parse_token(since)
+        result = change_log.since(parsed) if parsed is not None else None
+        if result is None:
+            return resync_response(versions.token(change_log.version))
+        version, changes = result
+        return json_response(request, {"version": versions.token(version), "full": False, "changes": changes})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
 @app.get("/api/validations/{video_id}")
-def get_video_validations(video_id: str):
+def get_video_validations(video_id: str, request: Request, response: Response):
     """Get validation results for a specific video."""
     try:
-        db = get_database()
-        results = db.search(Validation.video_id == video_id)
-        validations = []
-        
-        for doc in results:
-            # Remove video_id from response
-            validation = {k: v for k, v in doc.items() if k != "video_id"}
-            validations.append(validation)
-        
-        # Sort by timestamp
-        validations.sort(key=lambda x: x.get("timestamp", ""))
+        get_database()
+        etag = versions.etag(video_id)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        # Sort by parsed timestamp (stable, so equal times stay in save order)
+        records = sorted((record for _, record in snapshot.records(video_id)), key=lambda record: record.ts)
+        validations = [record.to_dict() for record in records]
         
         return {
             "video_id": video_id,
@@ -174,19 +816,25 @@ def get_video_validations(video_id: str):
 
 
 @app.post("/api/validations", response_model=ValidationResponse)
-def save_validation(request: ValidationRequest):
-    """Save a validation result for a video."""
+def save_validation(request: ValidationRequest, response: Response,
+                    idempotency_header: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """
+    Save a validation result for a video. A retry with the same Idempotency-Key
+    (or the same video_id/timestamp/validator) gets the first save's response.
+    """
+    try:
+        key = idempotency_key(idempotency_header, request.video_id, request.validation.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        db = get_database()
         video_id = request.video_id
         validation = request.validation.dict()
         validation["video_id"] = video_id
         
-        # Insert validation
-        db.insert(validation)
-        
-        # Count total validations for this video
-        total = len(db.search(Validation.video_id == video_id))
+        # Insert through the writer (batched with concurrent requests);
+        # the result is the video's total validation count
+        total, replayed = submit_write({"op": "insert", "doc": validation, "key": key})
+        mark_replayed(response, replayed)
         
         return ValidationResponse(
             success=True,
@@ -194,85 +842,279 @@ def save_validation(request: ValidationRequest):
             video_id=video_id,
             total_validations=total
         )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@app.post("/api/validations/batch", response_model=BatchValidationResponse)
+def save_validations_batch(requests: List[ValidationRequest]):
+    """
+    Save many validations in one writer batch (one storage write). Items
+    already saved (same video_id/timestamp/validator and body) are reported
+    as replayed.
+    """
+    keys = batch_keys(requests)
+    try:
+        outcomes = submit_writes([
+            {"op": "insert", "doc": {**request.validation.dict(), "video_id": request.video_id}, "key": key}
+            for request, key in zip(requests, keys)
+        ])
+        snap = current_snapshot()
+        totals = {request.video_id: snap.count(request.video_id) for request in requests}
+        return batch_response(requests, outcomes, totals)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/status")
+def get_video_statuses(request: Request, response: Response, ids: str = ""):
+    """Latest status of several videos (ids=a,b,c), from one snapshot."""
+    video_ids = status_ids(ids)
+    try:
+        get_database()
+        etag = versions.etag()
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return video_statuses(snapshot, video_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.post("/api/status")
+def post_video_statuses(request: StatusBatchRequest):
+    """GET /api/status with the ids in the body, for lists too long for a URL."""
+    video_ids = status_ids(request.ids)
+    try:
+        return video_statuses(current_snapshot(), video_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/bootstrap")
+def get_bootstrap(request: Request):
+    """
+    Everything the validator page needs before first paint: the annotation
+    set, each video's latest status and its playback URLs. Served from a
+    cached, compressed body that the next request after a write rebuilds.
+    """
+    try:
+        snap = current_snapshot()
+        stamp, annotations = annotation_file.load()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if annotations is None:
+        raise HTTPException(status_code=404, detail="Annotations file not found")
+    
+    video_ids = annotation_video_ids(annotations)
+    # Read before urls(): a probe finishing in between only makes the body newer than its key
+    generation = video_urls.generation
+    urls = video_urls.urls(video_ids)
+    key = ("bootstrap", versions.token(snap.version), stamp, generation)
+    entry = response_cache.get_or_build(key, lambda: {
+        "version": versions.token(snap.version),
+        "annotations": annotations,
+        "statuses": video_statuses(snap, video_ids)["statuses"],
+        "videos": urls,
+        "stats": compute_stats(snap)
+    }, bootstrap_etag(key))
+    return body_response(request, entry)
+
+
+def annotation_video_ids(annotations: dict) -> List[str]:
+    return [annotation["video_id"] for annotation in annotations.get("annotations", [])
+            if annotation.get("video_id")]
+
+
 @app.get("/api/status/{video_id}")
-def get_video_status(video_id: str):
+def get_video_status(video_id: str, request: Request, response: Response):
     """Get the latest validation status for a video."""
     try:
-        db = get_database()
-        results = db.search(Validation.video_id == video_id)
-        
-        if not results:
-            return {
-                "video_id": video_id,
-                "status": "pending",
-                "last_updated": None,
-                "has_feedback": False
-            }
-        
-        # Get latest by timestamp
-        latest = max(results, key=lambda x: x.get("timestamp", ""))
-        
+        get_database()
+        etag = versions.etag(video_id)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return video_status(snapshot, video_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/stats")
+def get_validation_stats(request: Request, response: Response):
+    """Get overall validation statistics (served from the latest-status table)."""
+    try:
+        get_database()
+        etag = versions.etag()
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        set_etag(response, etag)
+        return compute_stats(snapshot)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/stats/check")
+def check_validation_stats():
+    """Compare the latest-status table against a full recompute (admin function)."""
+    try:
+        problems = submit_write({"op": "check"})
         return {
-            "video_id": video_id,
-            "status": latest["status"],
-            "last_updated": latest["timestamp"],
-            "has_feedback": bool(latest.get("feedback", "").strip())
+            "consistent": not problems,
+            "problems": problems
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@app.get("/api/stats")
-def get_validation_stats():
-    """Get overall validation statistics."""
+@app.post("/api/stats/rebuild")
+def rebuild_validation_stats():
+    """Rebuild the indexes and latest-status table from the database (admin function)."""
     try:
-        db = get_database()
-        all_docs = db.all()
-        video_ids = set(doc.get("video_id") for doc in all_docs if doc.get("video_id"))
-        total_videos = len(video_ids)
-        
-        # Get latest status for each video
-        status_counts = {"pending": 0, "correct": 0, "incorrect": 0, "needs_review": 0, "in_progress": 0}
-        videos_with_status = set()
-        
-        for video_id in video_ids:
-            results = db.search(Validation.video_id == video_id)
-            if results:
-                latest = max(results, key=lambda x: x.get("timestamp", ""))
-                status = latest.get("status", "pending")
-                videos_with_status.add(video_id)
-                
-                if status == "correct":
-                    status_counts["correct"] += 1
-                elif status == "incorrect":
-                    status_counts["incorrect"] += 1
-                elif status == "needs_review":
-                    status_counts["needs_review"] += 1
-        
-        status_counts["pending"] = total_videos - len(videos_with_status)
-        
+        total_videos = submit_write({"op": "rebuild"})
+        return {
+            "success": True,
+            "message": "Indexes rebuilt",
+            "total_videos": total_videos
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/metrics/group-commit")
+def get_group_commit_metrics():
+    """Batch size, flush interval and queue depth of the writer thread."""
+    if writer is None:
+        return {"enabled": GROUP_COMMIT}
+    return {"enabled": GROUP_COMMIT, **writer.metrics()}
+
+
+@app.get("/api/metrics/shards")
+def get_shard_metrics():
+    """Records and file size per shard (STORAGE_ENGINE=sharded)."""
+    if not isinstance(get_database(), ShardedTinyDB):
+        return {"enabled": False}
+    return {"enabled": True, "shards": db.shard_stats()}
+
+
+@app.get("/api/metrics/bootstrap")
+def get_bootstrap_metrics():
+    """Playback URL resolution for /api/bootstrap."""
+    return {"video_urls": video_urls.stats()}
+
+
+@app.get("/api/metrics/responses")
+def get_response_metrics():
+    """Cached response bodies: size, compressed sizes, hits and rebuilds."""
+    return response_cache.stats()
+
+
+@app.get("/api/metrics/workers")
+def get_worker_metrics():
+    """This worker's cross-process lock waits and reloads (multi-worker mode)."""
+    if coordinator is None:
+        return {"enabled": False}
+    return {"enabled": True, **coordinator.metrics()}
+
+
+def iter_export_rows(snap: Snapshot, filters: ExportFilters):
+    """Rows for /api/export from one snapshot; a video_id filter reads just that video."""
+    video_ids = [filters.video_id] if filters.video_id is not None else snap.video_ids_after()
+    for video_id in video_ids:
+        for _, record in snap.records(video_id):
+            if filters.matches(video_id, record):
+                yield export_row(video_id, record.to_dict())
+
+
+@app.get("/api/export")
+def export_validations(
+    format: str = "csv",
+    video_id: Optional[str] = None,
+    status: Optional[str] = None,
+    validator: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Export validations as csv, parquet or arrow, streamed one record batch at a
+    time. Filters (video_id, status, validator, since/until timestamps) are
+    applied by the storage query.
+    """
+    try:
+        filters = ExportFilters(video_id, status, validator, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        get_database()
+        return export_response(iter_export_rows(current_snapshot(), filters), format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/search")
+def search_validations(
+    q: str,
+    limit: int = QueryParam(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+):
+    """
+    Full-text search over feedback, ranked by BM25 (best first). `retract*`
+    matches any term starting with "retract". Answered from the snapshot's
+    inverted index; only the returned validations are looked up in its records.
+    """
+    try:
+        snap = current_snapshot()
+        hits, total = snap.search.search(q, limit)
+        results = []
+        for hit in hits:
+            record = snap.find(hit.video_id, hit.doc_id)
+            results.append({
+                "video_id": hit.video_id,
+                "score": round(hit.score, 4),
+                "validation": record.to_dict()
+            })
         return {
-            "total_videos": total_videos,
-            **status_counts
+            "query": q,
+            "total": total,
+            "video_ids": list(dict.fromkeys(result["video_id"] for result in results)),
+            "results": results
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+@app.get("/api/events")
+async def stream_events():
+    """
+    Server-Sent Events: one "validation" event per save/delete carrying the
+    video's latest status, total count and the updated stats. The event id is
+    the delta-sync version token (see /api/validations/changes).
+    """
+    subscriber = events.subscribe()
+    return StreamingResponse(events.stream(subscriber), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/api/metrics/events")
+def get_event_metrics():
+    """Connected SSE clients, events published and slow consumers dropped."""
+    return events.metrics()
+
+
 @app.delete("/api/validations/{video_id}")
 def delete_video_validations(video_id: str):
     """Delete all validations for a video (admin function)."""
     try:
-        db = get_database()
-        removed = db.remove(Validation.video_id == video_id)
+        removed = submit_write({"op": "delete", "video_id": video_id})
         return {
             "success": True,
             "message": f"Deleted validations for {video_id}",
-            "count": len(removed)
+            "count": removed
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -341,6 +1183,36 @@ def find_video_file(video_id: str, video_type: str = "regular") -> Optional[Path
     return None
 
 
+def release_urls(filename: str) -> List[str]:
+    """GitHub Releases, then cloud storage URL of a video file (what /api/videos redirects to)."""
+    github_release_tag = os.getenv("GITHUB_RELEASE_TAG", "v1.0")
+    github_repo = os.getenv("GITHUB_REPO", "Bhumika158/SignSegmentationUI")
+    urls = [f"https://github.com/{github_repo}/releases/download/{github_release_tag}/{filename}"]
+    cloud_storage_url = os.getenv("CLOUD_STORAGE_URL")
+    if cloud_storage_url:
+        urls.append(f"{cloud_storage_url}/videos/{filename}")
+    return urls
+
+
+def video_url_candidates(video_id: str, kind: str) -> List[str]:
+    """Remote URLs for a video in the order its /api/videos endpoint tries them."""
+    if kind == "annotation":
+        urls = release_urls(f"{video_id}_annotation_guide.mp4")
+        if find_video_file(video_id, "annotation"):
+            return urls  # served locally before falling back to the regular video
+        return urls + release_urls(f"{video_id}.mp4")[:1]
+    return release_urls(f"{video_id}.mp4")
+
+
+def video_api_path(video_id: str, kind: str) -> str:
+    """The /api/videos endpoint for a video (resolves on each request)."""
+    return f"/api/videos/{video_id}/annotation" if kind == "annotation" else f"/api/videos/{video_id}"
+
+
+# Resolved playback URL per video for /api/bootstrap
+video_urls = VideoUrlResolver(video_url_candidates, video_api_path)
+
+
 @app.get("/api/videos/{video_id}")
 def get_video(video_id: str):
     """
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Bulk endpoints: many saves (POST /api/validations/batch) and many statuses
+(GET /api/status?ids=a,b,c, or POST /api/status with {"ids": [...]}).
+
+Saves
+-----
+The body is a JSON list of the same objects POST /api/validations takes. Every
+item is validated before anything is written, then the backend commits them
+together: one writer batch for the JSON/TinyDB APIs, one transaction for
+SQLite, one insert_many for MongoDB.
+
+Each item gets its derived idempotency key (video_id, timestamp, validator;
+see validation_idempotency.py), so resubmitting a batch after a timeout, or an
+import containing saves that already reached the server, writes only the
+missing ones. The response has a result per item, in request order, and the
+total validation count of every video in the batch.
+
+Statuses
+--------
+Every backend answers from one lookup for all ids (the TinyDB/JSON in-memory
+maps, one SQLite query, one MongoDB aggregation); the response maps each
+requested video_id to the same object GET /api/status/{video_id} returns.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from validation_idempotency import IdempotencyKey, idempotency_key
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    video_id: str
+    success: bool
+    replayed: bool = False  # already saved earlier (or earlier in this batch)
+    total_validations: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchValidationResponse(BaseModel):
+    success: bool
+    message: str
+    saved: int
+    replayed: int
+    failed: int
+    results: List[BatchItemResult]
+    totals: Dict[str, int]  # video_id -> validations after the batch
+
+
+class StatusBatchRequest(BaseModel):
+    ids: List[str]
+
+
+def status_ids(ids) -> List[str]:
+    """
+    Requested video ids, from a comma-separated string or a list: blanks and
+    repeats dropped, order kept. Raises HTTPException(413) past BATCH_MAX_ITEMS.
+    """
+    if isinstance(ids, str):
+        ids = ids.split(",")
+    ids = list(dict.fromkeys(video_id.strip() for video_id in ids if video_id.strip()))
+    if len(ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BATCH_MAX_ITEMS} ids per request (got {len(ids)})"
+        )
+    return ids
+
+
+def batch_keys(items: list) -> List[IdempotencyKey]:
+    """Derived idempotency key of every item; raises HTTPException(413) for oversized batches."""
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BATCH_MAX_ITEMS} validations per batch (got {len(items)})"
+        )
+    return [idempotency_key(None, item.video_id, item.validation.dict()) for item in items]
+
+
+def batch_response(items: list, outcomes: list, totals: Dict[str, int]) -> BatchValidationResponse:
+    """
+    Build the response from one outcome per item: (total, replayed), or the
+    exception that failed that item.
+    """
+    results = []
+    for index, (item, outcome) in enumerate(zip(items, outcomes)):
+        if isinstance(outcome, BaseException):
+            results.append(BatchItemResult(index=index, video_id=item.video_id,
+                                           success=False, error=str(outcome)))
+        else:
+            total, replayed = outcome
+            results.append(BatchItemResult(index=index, video_id=item.video_id, success=True,
+                                           replayed=replayed, total_validations=total))
+    failed = sum(1 for result in results if not result.success)
+    replayed = sum(1 for result in results if result.replayed)
+    saved = len(results) - failed - replayed
+    return BatchValidationResponse(
+        success=not failed,
+        message=f"Saved {saved} validations ({replayed} already saved, {failed} failed)",
+        saved=saved,
+        replayed=replayed,
+        failed=failed,
+        results=results,
+        totals=totals
+    )
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+One-request page bootstrap (GET /api/bootstrap, TinyDB API).
+
+Before first paint segmentation_validator.html needs the annotation set, each
+video's latest status and where to play each video from. Fetched separately
+that is up to four probes for the annotation file, /api/validations, and a
+redirect per video (each a HEAD to GitHub Releases on the server).
+/api/bootstrap returns all of it in one response:
+
+- Annotations: read from ANNOTATIONS_PATH, or the first of the usual
+  locations, and re-read only when the file's (mtime, size) changes.
+- Video URLs: VideoUrlResolver probes each video's candidate URLs (the same
+  order the /api/videos endpoints redirect through) on a background pool and
+  remembers the answer for VIDEO_URL_TTL_SECONDS. Until a video is resolved its
+  URL is the /api/videos redirect endpoint, so the page works either way.
+- The body is built once per (data version, annotation file, resolved URLs)
+  and kept serialized in a ResponseCache (validation_responses.py), which
+  compresses it and sends it with an ETag. A write changes the data version,
+  so the next request rebuilds it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+from validation_versions import make_etag
+
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+ANNOTATIONS_FILENAME = "manual_annotations_hierarchical.json"
+VIDEO_URL_TTL_SECONDS = float(os.getenv("VIDEO_URL_TTL_SECONDS", "3600"))
+# VIDEO_URL_PROBE=0 skips the HEAD requests (offline / local development)
+VIDEO_URL_PROBE = os.getenv("VIDEO_URL_PROBE", "1").lower() not in ("0", "false", "no")
+VIDEO_URL_PROBE_TIMEOUT = 5
+VIDEO_KINDS = ("annotation", "regular")
+
+
+def annotation_paths() -> List[Path]:
+    """Where to look for the annotation file, in order."""
+    if os.getenv("ANNOTATIONS_PATH"):
+        return [Path(os.environ["ANNOTATIONS_PATH"])]
+    here = Path(__file__).parent
+    return [here / "data" / ANNOTATIONS_FILENAME,
+            here / "outputs" / ANNOTATIONS_FILENAME,
+            here.parent / "outputs" / ANNOTATIONS_FILENAME]
+
+
+class AnnotationFile:
+    """The annotation JSON, parsed once per version of the file. Treat as read-only."""
+
+    def __init__(self, paths: Iterable[Path]):
+        self.paths = list(paths)
+        self._stamp = None
+        self._data = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(stamp, data) of the first existing file, or (None, None)."""
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamp = (str(path), st.st_mtime_ns, st.st_size)
+            with self._lock:
+                if stamp != self._stamp:
+                    with open(path, "r") as f:
+                        self._data = json.load(f)
+                    self._stamp = stamp
+                return self._stamp, self._data
+        return None, None
+
+
+def probe_url(url: str) -> bool:
+    """True if a HEAD request for `url` (following redirects) answers 200."""
+    try:
+        response = requests.head(url, timeout=VIDEO_URL_PROBE_TIMEOUT, allow_redirects=True)
+        return response.status_code == 200
+    except Exception:
+        return False
+
+
+class VideoUrlResolver:
+    """
+    Playback URL per (video, kind), cached with a TTL.
+
+    `candidates(video_id, kind)` lists the remote URLs to try in order;
+    `fallback(video_id, kind)` is used when none answers (or until they have
+    been probed). `generation` changes whenever a resolved URL changes.
+    """
+
+    def __init__(self, candidates: Callable[[str, str], List[str]], fallback: Callable[[str, str], str],
+                 ttl: float = VIDEO_URL_TTL_SECONDS, probe: bool = VIDEO_URL_PROBE, workers: int = 8):
+        self.candidates = candidates
+        self.fallback = fallback
+        self.ttl = ttl
+        self.probe = probe and REQUESTS_AVAILABLE
+        self.generation = 0
+        self._resolved: Dict[tuple, tuple] = {}  # (video_id, kind) -> (url, expires_at)
+        self._pending = set()
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pool = None  # started on the first probe
+
+    def urls(self, video_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """{video_id: {kind: url}}; schedules probes for unresolved or expired entries."""
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for video_id in video_ids:
+                urls = {}
+                for kind in VIDEO_KINDS:
+                    entry = self._resolved.get((video_id, kind))
+                    if entry is None or entry[1] <= now:
+                        self._schedule(video_id, kind)
+                    urls[kind] = entry[0] if entry is not None else self.fallback(video_id, kind)
+                result[video_id] = urls
+        return result
+
+    def _schedule(self, video_id: str, kind: str):
+        key = (video_id, kind)
+        if not self.probe or key in self._pending:
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="video-url")
+        self._pending.add(key)
+        self._pool.submit(self._resolve, video_id, kind)
+
+    def _resolve(self, video_id: str, kind: str):
+        fallback = self.fallback(video_id, kind)
+        url = next((url for url in self.candidates(video_id, kind) if probe_url(url)), fallback)
+        with self._lock:
+            key = (video_id, kind)
+            self._pending.discard(key)
+            previous = self._resolved.get(key)
+            self._resolved[key] = (url, time.monotonic() + self.ttl)
+            # Unresolved entries were already served as the fallback
+            if url != (previous[0] if previous is not None else fallback):
+                self.generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "probe": self.probe,
+                "resolved": len(self._resolved),
+                "pending": len(self._pending),
+                "generation": self.generation,
+            }
+
+    def close(self):
+        """Stop probing (queued probes are dropped; a later urls() starts a new pool)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._pending.clear()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def bootstrap_etag(key) -> str:
+    """ETag of the body built for `key` (data version, annotation file stamp, URL generation)."""
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    return make_etag(f"b{digest}")
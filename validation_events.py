@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events broadcast of validation changes (GET /api/events).
+
+Writes happen on FastAPI's threadpool, so publish() is thread-safe: it hands
+each event to every subscriber's event loop. Each subscriber has a bounded
+queue; a client that falls behind by more than `queue_size` events is sent a
+final "dropped" event and disconnected rather than letting its backlog grow.
+It can reconnect and catch up through /api/validations/changes.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import AsyncIterator, Optional
+
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # don't let proxies buffer the stream
+}
+
+
+def format_sse(event: str, data: dict, event_id: Optional[str] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.loop = loop
+        self.queue_size = queue_size
+        # One slot more than queue_size, so the "dropped" event and the end marker always fit
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=queue_size + 1)
+        self.dropped = False
+
+    def offer(self, message: bytes):
+        """Enqueue on the subscriber's loop; drop the subscriber if it is full."""
+        if self.dropped:
+            return
+        if self.queue.qsize() < self.queue_size:
+            self.queue.put_nowait(message)
+            return
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(format_sse("dropped", {"reason": "slow consumer"}))
+        self.queue.put_nowait(None)
+
+
+class EventBroadcaster:
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE, keepalive: float = SSE_KEEPALIVE_SECONDS):
+        self.queue_size = max(1, queue_size)
+        self.keepalive = keepalive
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self) -> Subscriber:
+        """Register a client; must be called from the event loop that will stream to it."""
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if subscriber.dropped:
+                self.dropped_subscribers += 1
+
+    def publish(self, event: str, data: dict, event_id: Optional[str] = None):
+        """Send an event to every subscriber (safe to call from any thread)."""
+        message = format_sse(event, data, event_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, message)
+            except RuntimeError:
+                # Event loop already closed
+                self.unsubscribe(subscriber)
+
+    async def stream(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """Yield SSE messages for one client until it disconnects or is dropped."""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped_subscribers": self.dropped_subscribers,
+                "queue_size": self.queue_size,
+            }
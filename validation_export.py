@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Columnar bulk export of validations (GET /api/export, manage_validation_db.py export).
+
+Backends supply flat rows (video_id, timestamp, status, validator, feedback)
+with the ExportFilters already applied, as a plain or an async iterable; this
+module cuts them into record batches and encodes each batch as it arrives:
+
+    csv      text/csv, one header line
+    arrow    Arrow IPC stream, one record batch per EXPORT_BATCH_SIZE rows
+    parquet  Parquet file, one row group per EXPORT_BATCH_SIZE rows
+
+Arrow and Parquet columns are typed: timestamp is a UTC timestamp and status a
+dictionary-encoded string. Only one batch is held in memory at a time.
+"""
+
+import csv
+import io
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from validation_index import ValidationQuery
+from validation_records import ValidationRecord
+
+# Arrow / Parquet support (CSV works without it)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+EXPORT_COLUMNS = ("video_id", "timestamp", "status", "validator", "feedback")
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# (video_id, timestamp, status, validator, feedback)
+ExportRow = Tuple[str, str, str, str, str]
+
+
+@dataclass
+class ExportFilters:
+    """
+    Row filters for /api/export. `since`/`until` are inclusive ISO timestamps
+    compared as parsed instants, like from/to on /api/validations: backends
+    push text_bounds() (a superset) down to their storage query and check
+    each row with matches(). ValueError for an unparseable timestamp.
+    """
+    video_id: Optional[str] = None
+    status: Optional[str] = None
+    validator: Optional[str] = None
+    since: Optional[str] = None
+    until: Optional[str] = None
+
+    def __post_init__(self):
+        self.query = ValidationQuery(self.validator, self.status, self.since, self.until)
+
+    def text_bounds(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.query.text_bounds()
+
+    def matches(self, video_id: str, validation: Union[dict, ValidationRecord]) -> bool:
+        return ((self.video_id is None or video_id == self.video_id) and
+                (not self.query or self.query.matches(validation)))
+
+
+def export_row(video_id: str, validation: dict) -> ExportRow:
+    return (video_id, validation.get("timestamp", ""), validation.get("status", ""),
+            validation.get("validator", ""), validation.get("feedback", ""))
+
+
+def iter_batches(rows: Iterable[ExportRow], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[ExportRow]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Stored ISO timestamp as an aware UTC datetime (naive ones are taken as UTC)."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
+
+def arrow_schema():
+    return pa.schema([
+        ("video_id", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("status", pa.dictionary(pa.int32(), pa.string())),
+        ("validator", pa.string()),
+        ("feedback", pa.string()),
+    ])
+
+
+def to_record_batch(batch: List[ExportRow], schema) -> "pa.RecordBatch":
+    video_ids, timestamps, statuses, validators, feedbacks = zip(*batch)
+    return pa.record_batch([
+        pa.array(video_ids, pa.string()),
+        pa.array([parse_timestamp(ts) for ts in timestamps], schema.field("timestamp").type),
+        pa.array(statuses, pa.string()).dictionary_encode(),
+        pa.array(validators, pa.string()),
+        pa.array(feedbacks, pa.string()),
+    ], schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object collecting what the Arrow writers produce between batches."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _CsvEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def encode(self, batch: List[ExportRow]) -> bytes:
+        self._writer.writerows(batch)
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return self._drain()
+
+
+class _ArrowEncoder:
+    """Arrow IPC stream, or a Parquet file with one row group per batch."""
+
+    def __init__(self, parquet: bool):
+        self._schema = arrow_schema()
+        self._sink = _ChunkSink()
+        if parquet:
+            self._writer = pq.ParquetWriter(self._sink, self._schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_stream(self._sink, self._schema)
+
+    def encode(self, batch: List[ExportRow]) -> bytes:
+        self._writer.write_batch(to_record_batch(batch, self._schema))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+def _encoder(format: str):
+    if format == "csv":
+        return _CsvEncoder()
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow not installed. Install with: pip install pyarrow")
+    return _ArrowEncoder(parquet=format == "parquet")
+
+
+def export_chunks(rows: Iterable[ExportRow], format: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Encoded export in `format`, produced one record batch at a time."""
+    encoder = _encoder(format)
+    for batch in iter_batches(rows, batch_size):
+        yield encoder.encode(batch)
+    tail = encoder.finish()
+    if tail:
+        yield tail
+
+
+async def export_chunks_async(rows: AsyncIterable[ExportRow], format: str,
+                              batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """export_chunks() over rows from an async cursor."""
+    encoder = _encoder(format)
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield encoder.encode(batch)
+            batch = []
+    if batch:
+        yield encoder.encode(batch)
+    tail = encoder.finish()
+    if tail:
+        yield tail
+
+
+def export_response(rows: Union[Iterable[ExportRow], AsyncIterable[ExportRow]], format: str):
+    """StreamingResponse for /api/export; raises HTTPException for bad formats."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format '{format}' (use csv, parquet or arrow)")
+    if format != "csv" and not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="pyarrow not installed. Install with: pip install pyarrow")
+    media_type, extension = EXPORT_FORMATS[format]
+    chunks = export_chunks_async(rows, format) if hasattr(rows, "__aiter__") else export_chunks(rows, format)
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="validations.{extension}"'}
+    )
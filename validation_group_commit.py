@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Group commit for validation writes.
+
+Instead of every POST doing its own file write, callers hand their document to
+a GroupCommitter and block; a background thread drains the queue and writes
+everything that arrived within `max_delay` seconds (or `max_batch` records) in
+one storage call. Each caller returns only after the batch holding its record
+has been written. submit_many() queues several documents that always land in
+the same batch (one write for all of them).
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class _Pending:
+    __slots__ = ("docs", "done", "results", "error")
+
+    def __init__(self, docs: List[dict]):
+        self.docs = docs
+        self.done = threading.Event()
+        self.results: list = []
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitter:
+    """
+    Batches documents and writes them with `write_batch(docs) -> results`.
+
+    `write_batch` must write all docs in one durable operation and return one
+    result per doc (e.g. the new document ids), in order. An exception instance
+    as a doc's result fails only that caller's submit().
+    """
+
+    def __init__(self, write_batch: Callable[[List[dict]], list], max_batch: int = 64,
+                 max_delay: float = 0.005, max_queue: int = 10000):
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._records = 0
+        self._errors = 0
+        self._last_batch_size = 0
+        self._max_batch_size = 0
+        self._max_queue_depth = 0
+        self._last_write_ms = 0.0
+        self._total_write_ms = 0.0
+        self._last_flush_at = None
+        self._last_flush_gap_ms = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Flush whatever is queued and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, doc: dict, timeout: Optional[float] = 30.0):
+        """Queue a document and block until its batch is written; returns its result."""
+        result, = self._wait(_Pending([doc]), timeout)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def submit_many(self, docs: List[dict], timeout: Optional[float] = 30.0) -> list:
+        """
+        Queue documents to be written together, in one batch, and block until
+        it is written. Returns their results in order; an exception instance as
+        a result is returned, not raised, so the other documents still count.
+        """
+        if not docs:
+            return []
+        return self._wait(_Pending(list(docs)), timeout)
+
+    def _wait(self, pending: _Pending, timeout: Optional[float]) -> list:
+        self._queue.put(pending, timeout=timeout)
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        if not pending.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for group commit")
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            size = len(first.docs)
+            deadline = time.monotonic() + self.max_delay
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item.docs)
+            self._flush(batch)
+
+    def _flush(self, batch: List[_Pending]):
+        docs = [doc for p in batch for doc in p.docs]
+        started = time.monotonic()
+        try:
+            results = self.write_batch(docs)
+            error = None
+        except Exception as e:
+            results = [None] * len(docs)
+            error = e
+        finished = time.monotonic()
+
+        with self._metrics_lock:
+            self._batches += 1
+            self._records += len(docs)
+            self._errors += 1 if error else 0
+            self._last_batch_size = len(docs)
+            self._max_batch_size = max(self._max_batch_size, len(docs))
+            self._last_write_ms = (finished - started) * 1000
+            self._total_write_ms += self._last_write_ms
+            if self._last_flush_at is not None:
+                self._last_flush_gap_ms = (finished - self._last_flush_at) * 1000
+            self._last_flush_at = finished
+
+        position = 0
+        for pending in batch:
+            pending.results = results[position:position + len(pending.docs)]
+            pending.error = error
+            position += len(pending.docs)
+            pending.done.set()
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            batches = self._batches
+            return {
+                "max_batch": self.max_batch,
+                "max_delay_ms": self.max_delay * 1000,
+                "batches": batches,
+                "records": self._records,
+                "errors": self._errors,
+                "last_batch_size": self._last_batch_size,
+                "avg_batch_size": round(self._records / batches, 2) if batches else 0,
+                "max_batch_size": self._max_batch_size,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "last_write_ms": round(self._last_write_ms, 3),
+                "avg_write_ms": round(self._total_write_ms / batches, 3) if batches else 0,
+                "last_flush_interval_ms": round(self._last_flush_gap_ms, 3),
+            }
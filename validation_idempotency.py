@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Idempotent validation writes (POST /api/validations).
+
+A client may send an Idempotency-Key header; otherwise the key is derived from
+(video_id, timestamp, validator), which a retry of the same save repeats. The
+first request with a key is written and its result remembered for
+IDEMPOTENCY_TTL_SECONDS; a retry within that window gets the remembered result
+back (with an `Idempotent-Replayed: true` header) and nothing is written again.
+
+The request body is fingerprinted too: reusing an explicit key for a different
+body is an error (422), while a derived key whose body differs is simply a new
+validation.
+
+A replay reports the video's current total_validations, not the total stored
+with the key. Deleting a video drops its keys in the same write, so saving the
+same validation again after a delete writes it again.
+
+Backends keep the keys where their writes are atomic with them: the file-backed
+APIs check them on their writer thread (IdempotencyStore, or
+SQLiteIdempotencyStore when several workers share the files), SQLite in the
+same transaction as the insert, MongoDB in a TTL-indexed collection where a
+request claims its key before writing.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import Response
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# How long a claimed key may stay unfinished before another request may take it over
+IDEMPOTENCY_PENDING_SECONDS = float(os.getenv("IDEMPOTENCY_PENDING_SECONDS", "60"))
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+CONFLICT_MESSAGE = "Idempotency-Key was already used for a different request"
+
+
+class IdempotencyKey(NamedTuple):
+    key: str          # what the store is keyed by
+    fingerprint: str  # hash of the request body
+    explicit: bool    # sent as an Idempotency-Key header (vs derived)
+
+
+class StoredResult(NamedTuple):
+    fingerprint: str
+    result: Any
+
+
+class IdempotencyConflict(Exception):
+    """An explicit Idempotency-Key was reused with a different request body."""
+
+
+class IdempotencyInProgress(Exception):
+    """A save with this key is still being written (backends without a writer thread)."""
+
+
+def _digest(value) -> str:
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def idempotency_key(header: Optional[str], video_id: str, validation: dict) -> IdempotencyKey:
+    """Key for a save: the Idempotency-Key header if given, else derived from the body."""
+    fingerprint = _digest([video_id, validation])
+    if header is not None:
+        header = header.strip()
+        if not header or len(header) > MAX_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+        return IdempotencyKey(f"key:{header}", fingerprint, True)
+    derived = _digest([video_id, validation.get("timestamp"), validation.get("validator")])
+    return IdempotencyKey(f"derived:{derived}", fingerprint, False)
+
+
+def check_replay(key: IdempotencyKey, stored: Optional[StoredResult]):
+    """
+    The stored result if it answers this request, else None (write it).
+    Raises IdempotencyConflict for an explicit key stored with another body.
+    """
+    if stored is None:
+        return None
+    if stored.fingerprint == key.fingerprint:
+        return stored.result
+    if key.explicit:
+        raise IdempotencyConflict(CONFLICT_MESSAGE)
+    return None
+
+
+# plan_batch() steps
+WRITE = None
+
+
+class Replay(NamedTuple):
+    result: Any
+
+
+class Repeat(NamedTuple):
+    position: int  # the earlier save in the same batch this one repeats
+
+
+def plan_batch(store, keys: List[Optional[IdempotencyKey]]) -> list:
+    """
+    What a writer thread should do with each save of a batch (None = no key):
+    WRITE, Replay(stored result), Repeat(position of an earlier save in the
+    batch with the same key), or an IdempotencyConflict to fail that save with.
+    """
+    plan = []
+    first: Dict[str, int] = {}
+    for position, key in enumerate(keys):
+        if key is None:
+            plan.append(WRITE)
+            continue
+        try:
+            earlier = first.get(key.key)
+            if earlier is None:
+                result = check_replay(key, store.get(key.key))
+            elif keys[earlier].fingerprint == key.fingerprint:
+                plan.append(Repeat(earlier))
+                continue
+            elif key.explicit:
+                raise IdempotencyConflict(CONFLICT_MESSAGE)
+            else:
+                result = None
+        except IdempotencyConflict as e:
+            plan.append(e)
+            continue
+        if result is not None:
+            plan.append(Replay(result))
+        else:
+            first[key.key] = position
+            plan.append(WRITE)
+    return plan
+
+
+def mark_replayed(response: Response, replayed: bool) -> Response:
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+class IdempotencyStore:
+    """
+    In-memory key -> (fingerprint, result) map with TTL expiry. Every entry
+    lives for the same TTL, so insertion order is expiry order and expired
+    keys are dropped from the front of a queue. Thread-safe.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[str, tuple] = {}      # key -> (expires_at, video_id, StoredResult)
+        self._by_video: Dict[str, Set[str]] = {}  # video_id -> its keys
+        self._expiry = deque()                    # (expires_at, key), oldest first
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[StoredResult]:
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            entry = self._entries.get(key)
+            return entry[2] if entry is not None else None
+
+    def put(self, key: str, video_id: str, fingerprint: str, result):
+        self.put_many([(key, video_id, fingerprint, result)])
+
+    def put_many(self, entries: Iterable[Tuple[str, str, str, Any]]):
+        """Remember (key, video_id, fingerprint, result) entries."""
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._purge(now)
+            for key, video_id, fingerprint, result in entries:
+                self._drop(key)
+                self._entries[key] = (expires_at, video_id, StoredResult(fingerprint, result))
+                self._by_video.setdefault(video_id, set()).add(key)
+                self._expiry.append((expires_at, key))
+
+    def discard_videos(self, video_ids: Iterable[str]):
+        """Forget the keys of deleted videos' saves."""
+        with self._lock:
+            for video_id in video_ids:
+                for key in self._by_video.pop(video_id, ()):
+                    del self._entries[key]
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._by_video[entry[1]]
+            keys.discard(key)
+            if not keys:
+                del self._by_video[entry[1]]
+
+    def _purge(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = self._expiry.popleft()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                self._drop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteIdempotencyStore:
+    """
+    The same store in a SQLite file, for several processes sharing one data
+    file (callers serialize check-and-write with their own lock). Results are
+    stored as JSON.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key         TEXT PRIMARY KEY,
+        video_id    TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        result      TEXT NOT NULL,
+        expires_at  REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at);
+    CREATE INDEX IF NOT EXISTS idx_idempotency_video ON idempotency_keys (video_id);
+    """
+    # Expired rows are deleted every this many puts
+    PURGE_EVERY = 100
+
+    def __init__(self, path, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.ttl = ttl
+        self._conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        drop_keys_without_video(self._conn)
+        self._conn.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    def get(self, key: str) -> Optional[StoredResult]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, result FROM idempotency_keys WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return StoredResult(row[0], json.loads(row[1])) if row else None
+
+    def put(self, key: str, video_id: str, fingerprint: str, result):
+        self.put_many([(key, video_id, fingerprint, result)])
+
+    def put_many(self, entries: Iterable[Tuple[str, str, str, Any]]):
+        """Remember (key, video_id, fingerprint, result) entries in one transaction."""
+        now = time.time()
+        rows = [(key, video_id, fingerprint, json.dumps(result), now + self.ttl)
+                for key, video_id, fingerprint, result in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO idempotency_keys (key, video_id, fingerprint, result, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._puts += len(rows)
+                if self._puts >= self.PURGE_EVERY:
+                    self._puts = 0
+                    self._conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def discard_videos(self, video_ids: Iterable[str]):
+        """Forget the keys of deleted videos' saves."""
+        video_ids = list(video_ids)
+        if not video_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM idempotency_keys WHERE video_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(video_ids),)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def drop_keys_without_video(conn: sqlite3.Connection):
+    """
+    Drop an idempotency_keys table from before keys recorded their video
+    (run before creating the schema). Its keys could not be dropped with
+    their video, and they only guard retries, so they are not carried over.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(idempotency_keys)")}
+    if columns and "video_id" not in columns:
+        conn.execute("DROP TABLE idempotency_keys")
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+In-memory indexes over validation documents.
+Used by the file-backed APIs so status and filtered lookups don't have to scan every record.
+"""
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from validation_records import UNKNOWN_TIME, ValidationRecord, format_timestamp, parse_timestamp
+
+
+class LatestStatusTable:
+    """
+    Materialized "latest validation per video" plus running counts of those
+    latest statuses. Updated on every insert/delete so stats are O(1).
+    Entries are compact ValidationRecords, compared by parsed timestamp.
+    """
+
+    def __init__(self):
+        self._latest: Dict[str, ValidationRecord] = {}
+        self.status_counts: Dict[str, int] = {}
+
+    def rebuild(self, docs: Iterable[Union[dict, ValidationRecord]]):
+        """Recompute the table from scratch (documents in insertion order)."""
+        self._latest = {}
+        self.status_counts = {}
+        for doc in docs:
+            self.apply_insert(doc)
+
+    def apply_insert(self, doc: Union[dict, ValidationRecord]):
+        """Account for a new validation; it wins only if strictly newer."""
+        record = doc if isinstance(doc, ValidationRecord) else ValidationRecord.from_dict(doc)
+        if not record.video_id:
+            return
+        current = self._latest.get(record.video_id)
+        if current is not None:
+            if record.ts <= current.ts:
+                return
+            self._decrement(current.status)
+        self._latest[record.video_id] = record
+        status = record.status
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def apply_delete(self, video_id: str):
+        """Forget a video whose validations were all removed."""
+        current = self._latest.pop(video_id, None)
+        if current is not None:
+            self._decrement(current.status)
+
+    def _decrement(self, status: str):
+        remaining = self.status_counts.get(status, 0) - 1
+        if remaining > 0:
+            self.status_counts[status] = remaining
+        else:
+            self.status_counts.pop(status, None)
+
+    def get(self, video_id: str) -> Optional[ValidationRecord]:
+        """Latest validation record for a video, or None."""
+        return self._latest.get(video_id)
+
+    def check(self, docs: Iterable[Union[dict, ValidationRecord]]) -> List[str]:
+        """
+        Compare against a full recompute over `docs`.
+        Returns a list of human-readable mismatches (empty when consistent).
+        """
+        expected = LatestStatusTable()
+        expected.rebuild(docs)
+        problems = []
+        for video_id in sorted(set(expected._latest) | set(self._latest)):
+            want = expected._latest.get(video_id)
+            got = self._latest.get(video_id)
+            if want is None or got is None:
+                problems.append(f"{video_id}: expected {want and want.status}, "
+                                f"table has {got and got.status}")
+            elif (want.ts, want.status_id) != (got.ts, got.status_id):
+                problems.append(f"{video_id}: expected {want.status}@{want.timestamp}, "
+                                f"table has {got.status}@{got.timestamp}")
+        if expected.status_counts != self.status_counts:
+            problems.append(f"status counts: expected {expected.status_counts}, "
+                            f"table has {self.status_counts}")
+        return problems
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._latest
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+
+# One day in microseconds, more than any UTC offset
+_DAY = 24 * 3600 * 1000 * 1000
+
+
+@dataclass
+class ValidationQuery:
+    """
+    Filters for GET /api/validations?validator=&status=&from=&to=.
+    `start`/`end` are inclusive ISO timestamps, compared as parsed instants.
+    """
+    validator: Optional[str] = None
+    status: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+    def __post_init__(self):
+        """Parse start/end once; ValueError for an unparseable timestamp."""
+        self._bounds = tuple(self._parse(text) for text in (self.start, self.end))
+
+    @staticmethod
+    def _parse(text: Optional[str]) -> Optional[int]:
+        if text is None:
+            return None
+        ts = parse_timestamp(text)
+        if ts == UNKNOWN_TIME:
+            raise ValueError(f"Invalid timestamp '{text}' (use ISO 8601, e.g. 2024-01-15T10:30:00Z)")
+        return ts
+
+    def __bool__(self) -> bool:
+        return any(value is not None for value in (self.validator, self.status, self.start, self.end))
+
+    def bounds(self) -> Tuple[Optional[int], Optional[int]]:
+        """(start, end) as epoch microseconds."""
+        return self._bounds
+
+    def text_bounds(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        String bounds around (start, end), for databases that compare the
+        stored timestamp strings. Stored timestamps are not all in one spelling
+        (2024-01-15T10:30:00.000Z, 2024-01-15T10:30:00, +02:00 offsets), so the
+        bounds are the dates a day either side and callers must still check
+        each row with matches().
+        """
+        start, end = self._bounds
+        return (None if start is None else format_timestamp(start - _DAY)[:10],
+                None if end is None else format_timestamp(end + _DAY)[:10] + "\uffff")
+
+    def matches(self, doc: Union[dict, ValidationRecord]) -> bool:
+        record = doc if isinstance(doc, ValidationRecord) else ValidationRecord.from_dict(doc)
+        start, end = self._bounds
+        return ((self.validator is None or record.validator == self.validator) and
+                (self.status is None or record.status == self.status) and
+                (start is None or record.ts >= start) and
+                (end is None or record.ts <= end))
+
+
+# Entries per run of a TimeOrderedKeys; a run is split when it reaches twice this
+RUN_SIZE = 512
+
+
+class _Run:
+    """A slice of a TimeOrderedKeys: parallel timestamp/key lists, writable only by `owner`."""
+
+    __slots__ = ("times", "keys", "owner")
+
+    def __init__(self, times: List[int], keys: List[Any], owner: object):
+        self.times = times
+        self.keys = keys
+        self.owner = owner
+
+
+class TimeOrderedKeys:
+    """
+    Keys sorted by timestamp, as runs of two parallel lists so range lookups
+    are a bisection over plain ints. Keys with the same timestamp stay in
+    insertion order.
+
+    copy() is cheap: the copy shares every run, and whichever side changes a
+    run first copies just that run (at most 2 * RUN_SIZE entries). So a
+    published index can be copied, changed and republished by one writer
+    while readers keep using the old one.
+    """
+
+    def __init__(self):
+        self._runs: List[_Run] = []
+        self._last_times: List[int] = []  # last timestamp of each run, for bisection
+        self._len = 0
+        self._owner = object()
+
+    def build(self, entries: Iterable[Tuple[int, Any]]):
+        """Replace the contents with (timestamp, key) pairs (stable sort)."""
+        ordered = sorted(entries, key=lambda entry: entry[0])
+        self._owner = object()
+        self._runs = [_Run([ts for ts, _ in ordered[i:i + RUN_SIZE]], [key for _, key in ordered[i:i + RUN_SIZE]],
+                           self._owner)
+                      for i in range(0, len(ordered), RUN_SIZE)]
+        self._last_times = [run.times[-1] for run in self._runs]
+        self._len = len(ordered)
+
+    def copy(self) -> "TimeOrderedKeys":
+        """A copy sharing the runs; both sides copy a run before changing it."""
+        other = TimeOrderedKeys()
+        other._runs = list(self._runs)
+        other._last_times = list(self._last_times)
+        other._len = self._len
+        self._owner = object()
+        return other
+
+    def _writable(self, index: int) -> _Run:
+        run = self._runs[index]
+        if run.owner is not self._owner:
+            run = self._runs[index] = _Run(list(run.times), list(run.keys), self._owner)
+        return run
+
+    def add(self, ts: int, key: Any):
+        if not self._runs:
+            self._runs.append(_Run([ts], [key], self._owner))
+            self._last_times.append(ts)
+            self._len = 1
+            return
+        # The first run ending after ts, so equal timestamps stay in insertion order
+        index = min(bisect_right(self._last_times, ts), len(self._runs) - 1)
+        run = self._writable(index)
+        pos = bisect_right(run.times, ts)
+        run.times.insert(pos, ts)
+        run.keys.insert(pos, key)
+        self._last_times[index] = run.times[-1]
+        self._len += 1
+        if len(run.times) >= 2 * RUN_SIZE:
+            tail = _Run(run.times[RUN_SIZE:], run.keys[RUN_SIZE:], self._owner)
+            del run.times[RUN_SIZE:], run.keys[RUN_SIZE:]
+            self._runs.insert(index + 1, tail)
+            self._last_times[index] = run.times[-1]
+            self._last_times.insert(index + 1, tail.times[-1])
+
+    def remove(self, ts: int, key: Any) -> bool:
+        for index in range(bisect_left(self._last_times, ts), len(self._runs)):
+            run = self._runs[index]
+            if run.times[0] > ts:
+                break
+            for pos in range(bisect_left(run.times, ts), bisect_right(run.times, ts)):
+                if run.keys[pos] is key or run.keys[pos] == key:
+                    run = self._writable(index)
+                    del run.times[pos]
+                    del run.keys[pos]
+                    self._len -= 1
+                    if run.times:
+                        self._last_times[index] = run.times[-1]
+                    else:
+                        del self._runs[index]
+                        del self._last_times[index]
+                    return True
+        return False
+
+    def _overlapping(self, start: Optional[int], end: Optional[int]) -> Iterator[Tuple[_Run, int, int]]:
+        """(run, lo, hi) for each run with entries in start <= timestamp <= end."""
+        first = 0 if start is None else bisect_left(self._last_times, start)
+        for run in self._runs[first:]:
+            if end is not None and run.times[0] > end:
+                break
+            lo = 0 if start is None else bisect_left(run.times, start)
+            hi = len(run.times) if end is None else bisect_right(run.times, end)
+            yield run, lo, hi
+
+    def count(self, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """How many keys have start <= timestamp <= end."""
+        if start is None and end is None:
+            return self._len
+        return sum(hi - lo for _, lo, hi in self._overlapping(start, end))
+
+    def between(self, start: Optional[int] = None, end: Optional[int] = None) -> List[Any]:
+        """The keys with start <= timestamp <= end, in timestamp order."""
+        keys: List[Any] = []
+        for run, lo, hi in self._overlapping(start, end):
+            keys.extend(run.keys[lo:hi])
+        return keys
+
+    def __len__(self) -> int:
+        return self._len
+
+
+def _indexed_fields(doc: Union[dict, ValidationRecord]) -> Tuple[int, str, str]:
+    """(timestamp, validator, status) of a document, as ValidationRecord would read them."""
+    if isinstance(doc, ValidationRecord):
+        return doc.ts, doc.validator, doc.status
+    return (parse_timestamp(doc.get("timestamp", "")), doc.get("validator", "community_member"),
+            doc.get("status", ""))
+
+
+class SecondaryIndex:
+    """
+    Secondary indexes for validator / status / time-range queries: one
+    timestamp-ordered key list over everything, and one per validator and per
+    status (the in-memory equivalent of compound (validator, timestamp) and
+    (status, timestamp) indexes). A query bisects the narrowest matching list;
+    the caller checks the remaining filters on those candidates only.
+
+    Keys are whatever identifies a document in the backend (TinyDB doc_id,
+    or the ValidationRecord itself for the JSON backend).
+
+    copy() returns an index sharing the key lists (see TimeOrderedKeys), for
+    a writer that publishes a new index with each snapshot.
+    """
+
+    def __init__(self):
+        self._by_time = TimeOrderedKeys()
+        self._by_validator: Dict[str, TimeOrderedKeys] = {}
+        self._by_status: Dict[str, TimeOrderedKeys] = {}
+
+    def build(self, entries: Iterable[Tuple[Hashable, Union[dict, ValidationRecord]]]):
+        """Rebuild from (key, document) pairs."""
+        all_entries = []
+        by_validator: Dict[str, list] = {}
+        by_status: Dict[str, list] = {}
+        for key, doc in entries:
+            ts, validator, status = _indexed_fields(doc)
+            all_entries.append((ts, key))
+            by_validator.setdefault(validator, []).append((ts, key))
+            by_status.setdefault(status, []).append((ts, key))
+        self._by_time.build(all_entries)
+        self._by_validator = self._build_lists(by_validator)
+        self._by_status = self._build_lists(by_status)
+
+    def copy(self) -> "SecondaryIndex":
+        other = SecondaryIndex()
+        other._by_time = self._by_time.copy()
+        other._by_validator = {value: keys.copy() for value, keys in self._by_validator.items()}
+        other._by_status = {value: keys.copy() for value, keys in self._by_status.items()}
+        return other
+
+    @staticmethod
+    def _build_lists(grouped: Dict[str, list]) -> Dict[str, TimeOrderedKeys]:
+        lists = {}
+        for value, entries in grouped.items():
+            lists[value] = TimeOrderedKeys()
+            lists[value].build(entries)
+        return lists
+
+    def add(self, key: Hashable, doc: Union[dict, ValidationRecord]):
+        ts, validator, status = _indexed_fields(doc)
+        self._by_time.add(ts, key)
+        self._by_validator.setdefault(validator, TimeOrderedKeys()).add(ts, key)
+        self._by_status.setdefault(status, TimeOrderedKeys()).add(ts, key)
+
+    def remove(self, key: Hashable, doc: Union[dict, ValidationRecord]):
+        ts, validator, status = _indexed_fields(doc)
+        self._by_time.remove(ts, key)
+        for lists, value in ((self._by_validator, validator), (self._by_status, status)):
+            keys = lists.get(value)
+            if keys is not None and keys.remove(ts, key) and not keys:
+                del lists[value]
+
+    def candidates(self, query: ValidationQuery) -> List[Hashable]:
+        """
+        Keys of the narrowest index range covering `query`, in timestamp order.
+        A superset of the matches when more than one filter is set.
+        """
+        start, end = query.bounds()
+        choices = [self._by_time]
+        if query.validator is not None:
+            choices.append(self._by_validator.get(query.validator, TimeOrderedKeys()))
+        if query.status is not None:
+            choices.append(self._by_status.get(query.status, TimeOrderedKeys()))
+        best = min(choices, key=lambda keys: keys.count(start, end))
+        return best.between(start, end)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Incremental reader for the JSON validation database
+({"validations": {video_id: [validation, ...], ...}}).
+
+Reads the file in chunks and decodes one validation record at a time, so
+memory stays bounded by the chunk size and the largest single record, not
+the size of the file. Used by the migration and export tools; TinyDB files
+({"_default": {doc_id: document}}) can be streamed the same way.
+"""
+
+import json
+from typing import IO, Iterator, Tuple
+
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\r\n"
+# Characters that can continue a number ("1." is a valid 1 followed by garbage until "5" arrives)
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class _Reader:
+    def __init__(self, f: IO[str], chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > self.chunk_size:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if self.eof or (end < len(self.buf) and self.buf[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def _members(reader: _Reader) -> Iterator[str]:
+    """Yield each key of the object at the reader; the caller must consume its value."""
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.expect("}")
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        yield key
+        if reader.expect(",}") == "}":
+            return
+
+
+def _elements(reader: _Reader) -> Iterator[None]:
+    """Yield once per element of the array at the reader; the caller must consume it."""
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        yield None
+        if reader.expect(",]") == "]":
+            return
+
+
+def iter_validations(f: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, dict]]:
+    """Yield (video_id, validation) for every record, in file order."""
+    reader = _Reader(f, chunk_size)
+    for key in _members(reader):
+        if key == "validations":
+            for video_id in _members(reader):
+                for _ in _elements(reader):
+                    yield video_id, reader.value()
+        else:
+            reader.value()  # other top-level keys are skipped
+
+
+def iter_tinydb_documents(f: IO[str], table: str = "_default",
+                          chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, dict]]:
+    """Yield (doc_id, document) from one table of a TinyDB JSON file."""
+    reader = _Reader(f, chunk_size)
+    for key in _members(reader):
+        if key == table:
+            for doc_id in _members(reader):
+                yield int(doc_id), reader.value()
+        else:
+            reader.value()
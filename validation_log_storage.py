@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Append-only, log-structured storage for validation documents.
+
+Each write appends one JSON line to a log file instead of rewriting the whole
+database (which is what TinyDB's JSONStorage does on every insert). On startup
+the snapshot and log are replayed into memory; a background thread periodically
+compacts everything into a new snapshot plus a fresh, empty log.
+
+Exposes the small subset of the TinyDB table API that validation_api_tinydb.py
+uses (insert / get / remove / all), so it plugs into the same endpoints.
+Documents are held in memory as compact ValidationRecords and turned back
+into dicts when read.
+
+Files, for a base path like data/validation_database:
+    data/validation_database.log.jsonl       - current log
+    data/validation_database.log.jsonl.old   - log being compacted (transient)
+    data/validation_database.snapshot.json   - last compacted state
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from validation_records import ValidationRecord
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+class LogDocument(dict):
+    """A stored document plus its id (same shape as tinydb's Document)."""
+
+    def __init__(self, value: dict, doc_id: int):
+        super().__init__(value)
+        self.doc_id = doc_id
+
+
+class LogStructuredDB:
+    """
+    In-memory document table backed by an append-only JSONL log.
+
+    fsync policies:
+        always   - fsync after every append (durable when the call returns)
+        interval - fsync from the background thread every `fsync_interval` seconds
+        never    - leave flushing to the OS
+    """
+
+    def __init__(self, base_path, fsync: str = "always", fsync_interval: float = 1.0,
+                 compact_bytes: int = 16 * 1024 * 1024, compact_interval: float = 60.0,
+                 auto_compact: bool = True):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}; use one of {FSYNC_POLICIES}")
+        base = Path(base_path)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        self.log_path = Path(f"{base}.log.jsonl")
+        self.old_log_path = Path(f"{self.log_path}.old")
+        self.snapshot_path = Path(f"{base}.snapshot.json")
+
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self.compact_interval = compact_interval
+        # False when the owner compacts itself (e.g. under a cross-process lock)
+        self.auto_compact = auto_compact
+
+        self._docs: Dict[int, ValidationRecord] = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._replay()
+        if self.old_log_path.exists():
+            # A compaction was interrupted; finish it before the next rotation
+            # would overwrite the old log.
+            self._write_snapshot(self._docs, self._next_id)
+            self.old_log_path.unlink()
+        self._log = open(self.log_path, "a", encoding="utf-8")
+
+    # ------------------------------------------------------------------
+    # Startup / replay
+    # ------------------------------------------------------------------
+
+    def _replay(self):
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._docs = {int(k): ValidationRecord.from_dict(v) for k, v in snapshot.get("docs", {}).items()}
+            self._next_id = snapshot.get("next_id", 1)
+        # Replay is idempotent (insert = set by id, remove = pop), so a log that
+        # was already folded into the snapshot can safely be applied again.
+        for path in (self.old_log_path, self.log_path):
+            if path.exists():
+                self._replay_log(path)
+        if self._docs:
+            self._next_id = max(self._next_id, max(self._docs) + 1)
+
+    def _replay_log(self, path: Path):
+        good_bytes = 0
+        with open(path, "rb") as f:
+            for raw in f:
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    # Torn final write (crash mid-append): drop it and stop
+                    break
+                if not raw.endswith(b"\n"):
+                    break
+                self._apply(record)
+                good_bytes += len(raw)
+        if good_bytes != path.stat().st_size:
+            with open(path, "r+b") as f:
+                f.truncate(good_bytes)
+
+    def _apply(self, record: dict):
+        op = record.get("op")
+        if op == "insert":
+            doc_id = record["id"]
+            self._docs[doc_id] = ValidationRecord.from_dict(record["doc"])
+            self._next_id = max(self._next_id, doc_id + 1)
+        elif op == "remove":
+            for doc_id in record["ids"]:
+                self._docs.pop(doc_id, None)
+        elif op == "truncate":
+            self._docs = {}
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _append(self, records: Iterable[dict]):
+        """Append records to the log (caller holds the lock)."""
+        self._log.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+        self._log.flush()
+        if self.fsync == "always":
+            os.fsync(self._log.fileno())
+        else:
+            self._dirty = True
+
+    def insert(self, document: dict) -> int:
+        """Append one document and return its id."""
+        with self._lock:
+            doc_id = self._next_id
+            self._append([{"op": "insert", "id": doc_id, "doc": document}])
+            self._docs[doc_id] = ValidationRecord.from_dict(document)
+            self._next_id = doc_id + 1
+            return doc_id
+
+    def insert_multiple(self, documents: Iterable[dict]) -> List[int]:
+        """Append several documents with a single write; returns their ids."""
+        with self._lock:
+            records = []
+            for document in documents:
+                records.append({"op": "insert", "id": self._next_id + len(records), "doc": document})
+            if records:
+                self._append(records)
+            for record in records:
+                self._docs[record["id"]] = ValidationRecord.from_dict(record["doc"])
+            self._next_id += len(records)
+            return [record["id"] for record in records]
+
+    def remove(self, doc_ids: Iterable[int]) -> List[int]:
+        """Remove documents by id; returns the ids that existed."""
+        with self._lock:
+            removed = [doc_id for doc_id in doc_ids if doc_id in self._docs]
+            if removed:
+                self._append([{"op": "remove", "ids": removed}])
+                for doc_id in removed:
+                    del self._docs[doc_id]
+            return removed
+
+    def truncate(self):
+        """Remove every document."""
+        with self._lock:
+            self._append([{"op": "truncate"}])
+            self._docs = {}
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, doc_id: int) -> Optional[LogDocument]:
+        record = self._docs.get(doc_id)
+        return LogDocument(record.to_dict(with_video_id=True), doc_id) if record is not None else None
+
+    def all(self) -> List[LogDocument]:
+        with self._lock:
+            records = list(self._docs.items())
+        return [LogDocument(record.to_dict(with_video_id=True), doc_id) for doc_id, record in records]
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ------------------------------------------------------------------
+    # Compaction / background maintenance
+    # ------------------------------------------------------------------
+
+    def log_size(self) -> int:
+        try:
+            return self.log_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def compact(self):
+        """
+        Fold the log into a new snapshot and start a fresh log.
+        Writers are only blocked while the in-memory table is copied and the
+        log is rotated; the snapshot itself is written outside the lock.
+        """
+        with self._compact_lock:
+            with self._lock:
+                docs = dict(self._docs)
+                next_id = self._next_id
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log.close()
+                os.replace(self.log_path, self.old_log_path)
+                self._log = open(self.log_path, "a", encoding="utf-8")
+                self._dirty = False
+
+            self._write_snapshot(docs, next_id)
+            self.old_log_path.unlink()
+            print(f"✓ Compacted {len(docs)} records into {self.snapshot_path}")
+
+    def _write_snapshot(self, docs: Dict[int, ValidationRecord], next_id: int):
+        """Atomically replace the snapshot file (temp file + rename)."""
+        tmp_path = Path(f"{self.snapshot_path}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"next_id": next_id,
+                       "docs": {str(k): record.to_dict(with_video_id=True) for k, record in docs.items()}}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def sync(self):
+        """fsync the log if there are unsynced appends."""
+        with self._lock:
+            if self._dirty and not self._log.closed:
+                os.fsync(self._log.fileno())
+                self._dirty = False
+
+    def start_background(self):
+        """Start the fsync/compaction thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._maintenance_loop, daemon=True)
+            self._thread.start()
+
+    def _maintenance_loop(self):
+        tick = min(self.fsync_interval, self.compact_interval)
+        last_compact_check = time.monotonic()
+        while not self._stop.wait(tick):
+            try:
+                if self.fsync == "interval":
+                    self.sync()
+                if self.auto_compact and time.monotonic() - last_compact_check >= self.compact_interval:
+                    last_compact_check = time.monotonic()
+                    if self.log_size() >= self.compact_bytes:
+                        self.compact()
+            except Exception as e:
+                print(f"✗ Log storage maintenance error: {e}")
+
+    def close(self):
+        """Stop the background thread and flush the log."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if not self._log.closed:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log.close()
+
+
+def load_tinydb_documents(path) -> List[dict]:
+    """Read the default table of a TinyDB JSON file (used to seed a new log)."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+    table = data.get("_default", {})
+    return [table[k] for k in sorted(table, key=int)]
+
+
+def seed_once(database, source, marker) -> int:
+    """
+    Copy the TinyDB file `source` into a new, empty store, the first time only.
+
+    `marker` records that the seed happened (even when there was nothing to
+    import), so a store that later becomes empty because every video was
+    deleted is not filled again from the old file. Returns the records imported.
+    """
+    marker = Path(marker)
+    if marker.exists():
+        return 0
+    existing = load_tinydb_documents(source) if not len(database) else []
+    if existing:
+        database.insert_multiple(existing)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump({"source": str(source), "records": len(existing), "seeded_at": time.time()}, f)
+    return len(existing)
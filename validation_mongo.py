@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+"""
+MongoDB storage shared by validation_api_mongodb.py (pymongo),
+validation_api_mongodb_async.py (AsyncMongoClient) and the migration tools.
+
+Every operation is written once, as a generator that yields the database
+calls it makes: call() for a driver method, fetch() for a find() or
+aggregate() whose documents it needs, offload() for CPU-heavy work such as
+serializing a large body. run() performs the steps with blocking calls;
+run_async() awaits them and sends offloaded work to the threadpool. An error
+raised by a step is thrown back into the generator, so `except
+DuplicateKeyError` around a yield behaves as it would around the call.
+
+Collections (database sign_validation_db):
+- validations:                 one document per validation
+- validation_versions:         {_id: "*"} the global write version, {_id: "video:<id>"}
+                               the global version of that video's last write
+- validation_changes:          {_id: <version>, op, video_id[, validation]}, for delta sync
+- validation_counts:           {_id: <video_id>, count}, updated by every insert and delete
+- validation_idempotency_keys: {_id: key, video_id, fingerprint, result, expires_at};
+                               a TTL index deletes them once expires_at passes, and
+                               deleting a video deletes its keys
+"""
+
+import inspect
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Generator, List, NamedTuple, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from validation_export import ExportFilters
+from validation_idempotency import (CONFLICT_MESSAGE, IDEMPOTENCY_PENDING_SECONDS, IDEMPOTENCY_TTL_SECONDS,
+                                    IdempotencyConflict, IdempotencyInProgress, IdempotencyKey, Repeat,
+                                    StoredResult, check_replay)
+from validation_index import ValidationQuery
+from validation_paging import group_videos
+from validation_responses import ResponseCache, body_response, json_response
+from validation_versions import CHANGE_LOG_RETENTION, make_etag, resync_response
+
+try:
+    from pymongo import DeleteOne, ReturnDocument, UpdateOne
+    from pymongo.errors import BulkWriteError, DuplicateKeyError
+    MONGODB_AVAILABLE = True
+except ImportError:
+    MONGODB_AVAILABLE = False
+
+DB_NAME = "sign_validation_db"
+COLLECTION_NAME = "validations"
+VERSIONS_COLLECTION_NAME = "validation_versions"
+CHANGES_COLLECTION_NAME = "validation_changes"
+COUNTS_COLLECTION_NAME = "validation_counts"
+IDEMPOTENCY_COLLECTION_NAME = "validation_idempotency_keys"
+
+# The fields of a validation as the API returns them
+VALIDATION_FIELDS = {"_id": 0, "video_id": 1, "timestamp": 1, "status": 1, "feedback": 1, "validator": 1}
+
+COUNT_PIPELINE = [{"$group": {"_id": "$video_id", "count": {"$sum": 1}}}]
+
+# Latest status per video, then both stats counters in one pass
+STATS_PIPELINE = [
+    {"$sort": {"video_id": 1, "timestamp": -1}},
+    {"$group": {"_id": "$video_id", "latest_status": {"$first": "$status"}}},
+    {"$facet": {
+        "videos": [{"$count": "total"}],
+        "by_status": [{"$group": {"_id": "$latest_status", "count": {"$sum": 1}}}]
+    }}
+]
+
+
+class ValidationEntry(BaseModel):
+    timestamp: str
+    status: str  # "correct", "incorrect", "needs_review"
+    feedback: str
+    validator: str = "community_member"
+
+
+class ValidationRequest(BaseModel):
+    video_id: str
+    validation: ValidationEntry
+
+
+class ValidationResponse(BaseModel):
+    success: bool
+    message: str
+    video_id: str
+    total_validations: int
+
+
+# Steps yielded by MongoStore operations
+CALL, FETCH, OFFLOAD = "call", "fetch", "offload"
+
+
+class Step(NamedTuple):
+    kind: str
+    fn: Callable
+    args: tuple
+    kwargs: dict
+
+
+def call(fn: Callable, *args, **kwargs) -> Step:
+    """A driver call; the generator receives its return value."""
+    return Step(CALL, fn, args, kwargs)
+
+
+def fetch(fn: Callable, *args, **kwargs) -> Step:
+    """A find() or aggregate() call; the generator receives its documents as a list."""
+    return Step(FETCH, fn, args, kwargs)
+
+
+def offload(fn: Callable, *args, **kwargs) -> Step:
+    """CPU-bound work; run_async() runs it on the threadpool instead of the event loop."""
+    return Step(OFFLOAD, fn, args, kwargs)
+
+
+def run(steps: Generator):
+    """Perform a MongoStore operation with a blocking (pymongo) database; returns its result."""
+    value, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            value, error = step.fn(*step.args, **step.kwargs), None
+            if step.kind == FETCH:
+                value = list(value)
+        except Exception as e:
+            value, error = None, e
+
+
+async def run_async(steps: Generator):
+    """Perform a MongoStore operation with an AsyncMongoClient database; returns its result."""
+    value, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            if step.kind == OFFLOAD:
+                value = await run_in_threadpool(step.fn, *step.args, **step.kwargs)
+            else:
+                value = step.fn(*step.args, **step.kwargs)
+                if inspect.isawaitable(value):
+                    value = await value  # aggregate() is a coroutine, find() returns its cursor
+                if step.kind == FETCH:
+                    value = await value.to_list(None)
+            error = None
+        except Exception as e:
+            value, error = None, e
+
+
+def utc_now() -> datetime:
+    """Naive UTC now, the form pymongo returns dates in."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def query_filter(query: ValidationQuery, cursor: Optional[str] = None) -> dict:
+    """
+    MongoDB filter for GET /api/validations?validator=&status=&from=&to=. Its
+    time range is a superset (see ValidationQuery.text_bounds): check each
+    document with query.matches().
+    """
+    match = {}
+    if query.validator is not None:
+        match["validator"] = query.validator
+    if query.status is not None:
+        match["status"] = query.status
+    start, end = query.text_bounds()
+    if start is not None or end is not None:
+        match["timestamp"] = {}
+        if start is not None:
+            match["timestamp"]["$gte"] = start
+        if end is not None:
+            match["timestamp"]["$lte"] = end
+    if cursor is not None:
+        match["video_id"] = {"$gt": cursor}
+    return match
+
+
+def export_query(filters: ExportFilters) -> dict:
+    """
+    MongoDB filter for /api/export. Like query_filter() its time range is a
+    superset: check each document with filters.matches().
+    """
+    query = query_filter(filters.query)
+    if filters.video_id is not None:
+        query["video_id"] = filters.video_id
+    return query
+
+
+def video_status(video_id: str, latest: Optional[dict]) -> dict:
+    """Status object from a video's latest validation document, if any."""
+    if not latest:
+        return {
+            "video_id": video_id,
+            "status": "pending",
+            "last_updated": None,
+            "has_feedback": False
+        }
+
+    return {
+        "video_id": video_id,
+        "status": latest["status"],
+        "last_updated": latest["timestamp"],
+        "has_feedback": bool(latest.get("feedback", "").strip())
+    }
+
+
+class MongoStore:
+    """The API's collections in one database (either driver) and the operations on them."""
+
+    def __init__(self, db):
+        self.validations = db[COLLECTION_NAME]
+        self.versions = db[VERSIONS_COLLECTION_NAME]
+        self.changes = db[CHANGES_COLLECTION_NAME]
+        self.counts = db[COUNTS_COLLECTION_NAME]
+        self.keys = db[IDEMPOTENCY_COLLECTION_NAME]
+        # Serialized (and compressed) bodies of the large reads, keyed on the stored write version
+        self.responses = ResponseCache()
+
+    def setup(self):
+        """Create the indexes and check the counters; returns how many counters were rebuilt."""
+        yield call(self.validations.create_index, "video_id")
+        yield call(self.validations.create_index, [("video_id", 1), ("timestamp", -1)])
+        # Secondary indexes for validator / status / time-range queries
+        yield call(self.validations.create_index, [("validator", 1), ("timestamp", 1)])
+        yield call(self.validations.create_index, [("status", 1), ("timestamp", 1)])
+        yield call(self.validations.create_index, "timestamp")
+        yield call(self.keys.create_index, "expires_at", expireAfterSeconds=0)
+        yield call(self.keys.create_index, "video_id")
+        return (yield from self.reconcile_counts())
+
+    # Versions and the change log
+
+    def current_version(self, video_id: Optional[str] = None):
+        """Stored write version (global, or for one video)."""
+        doc = yield call(self.versions.find_one, {"_id": "*" if video_id is None else f"video:{video_id}"})
+        return doc["version"] if doc else 0
+
+    def current_etag(self, video_id: Optional[str] = None):
+        """ETag from the stored write version (global, or for one video)."""
+        version = yield from self.current_version(video_id)
+        return make_etag(f"m{version}")
+
+    def bump_versions(self, video_ids: List[str]):
+        """One new global version per write, in order, stamped on its video (call after the writes)."""
+        doc = yield call(self.versions.find_one_and_update,
+                         {"_id": "*"},
+                         {"$inc": {"version": len(video_ids)}},
+                         upsert=True,
+                         return_document=ReturnDocument.AFTER)
+        first = doc["version"] - len(video_ids) + 1
+        latest = {video_id: first + i for i, video_id in enumerate(video_ids)}
+        # $max keeps the per-video version monotonic if two writers race
+        yield call(self.versions.bulk_write, [
+            UpdateOne({"_id": f"video:{video_id}"}, {"$max": {"version": version}}, upsert=True)
+            for video_id, version in latest.items()
+        ])
+        return list(range(first, doc["version"] + 1))
+
+    def record_changes(self, versions: List[int], changes: List[dict]):
+        """Log several writes, each under its own version; prunes entries beyond the retention window."""
+        yield call(self.changes.insert_many,
+                   [{"_id": version, **change} for version, change in zip(versions, changes)])
+        if any(version % 100 == 0 for version in versions):
+            yield call(self.changes.delete_many, {"_id": {"$lte": versions[-1] - CHANGE_LOG_RETENTION}})
+
+    def log_writes(self, changes: List[dict]):
+        """bump_versions() and record_changes() for writes given as change-log entries."""
+        if not changes:
+            return []
+        versions = yield from self.bump_versions([change["video_id"] for change in changes])
+        yield from self.record_changes(versions, changes)
+        return versions
+
+    # Per-video counters
+
+    def add_counts(self, increments: Dict[str, int]):
+        """$inc each video's counter; returns the new counts."""
+        totals = {}
+        for video_id, increment in increments.items():
+            doc = yield call(self.counts.find_one_and_update,
+                             {"_id": video_id},
+                             {"$inc": {"count": increment}},
+                             upsert=True,
+                             return_document=ReturnDocument.AFTER)
+            totals[video_id] = doc["count"]
+        return totals
+
+    def counts_of(self, video_ids: List[str]):
+        """Stored counters of `video_ids` (0 for a video without validations)."""
+        docs = yield fetch(self.counts.find, {"_id": {"$in": list(video_ids)}})
+        found = {doc["_id"]: doc["count"] for doc in docs}
+        return {video_id: found.get(video_id, 0) for video_id in video_ids}
+
+    def reconcile_counts(self):
+        """
+        Rewrite the counters that disagree with the validations (first start,
+        or documents written by a tool that did not update them). Returns how
+        many were rewritten.
+        """
+        actual = {doc["_id"]: doc["count"] for doc in (yield fetch(self.validations.aggregate, COUNT_PIPELINE))}
+        stored = {doc["_id"]: doc["count"] for doc in (yield fetch(self.counts.find, {}))}
+        ops = [UpdateOne({"_id": video_id}, {"$set": {"count": count}}, upsert=True)
+               for video_id, count in actual.items() if stored.get(video_id) != count]
+        ops += [DeleteOne({"_id": video_id}) for video_id in stored if video_id not in actual]
+        if ops:
+            yield call(self.counts.bulk_write, ops, ordered=False)
+        return len(ops)
+
+    # Idempotency keys
+
+    def claim_key(self, key: IdempotencyKey, video_id: str):
+        """
+        Claim `key` before saving. Returns (stored result, claimed): a result to
+        replay, or claimed=True if this request must write and then finish or
+        release the key. Raises IdempotencyConflict / IdempotencyInProgress.
+        """
+        for _ in range(3):
+            now = utc_now()
+            try:
+                yield call(self.keys.insert_one, {
+                    "_id": key.key,
+                    "video_id": video_id,
+                    "fingerprint": key.fingerprint,
+                    "expires_at": now + timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS)
+                })
+                return None, True
+            except DuplicateKeyError:
+                stored = yield call(self.keys.find_one, {"_id": key.key})
+            if stored is None:
+                continue
+            if stored["expires_at"] <= now:
+                # Expired (the TTL monitor only runs once a minute) or abandoned mid-save
+                yield call(self.keys.delete_one, {"_id": key.key, "expires_at": stored["expires_at"]})
+                continue
+            if "result" not in stored and stored["fingerprint"] == key.fingerprint:
+                raise IdempotencyInProgress("A request with this idempotency key is still being saved")
+            result = check_replay(key, StoredResult(stored["fingerprint"], stored.get("result")))
+            # A derived key whose body differs is a new validation; the key stays with the first
+            return result, False
+        raise IdempotencyInProgress("Could not claim the idempotency key")
+
+    def claim_keys(self, keys: List[IdempotencyKey], video_ids: List[str]):
+        """
+        claim_key() for a batch, claiming every free key with one insert_many.
+        Returns per key (stored result, claimed), Repeat(position) for a key
+        already in the batch, or the exception that failed the claim.
+        """
+        claims: list = [None] * len(keys)
+        first: Dict[str, int] = {}
+        for position, key in enumerate(keys):
+            earlier = first.get(key.key)
+            if earlier is None:
+                first[key.key] = position
+            elif keys[earlier].fingerprint == key.fingerprint:
+                claims[position] = Repeat(earlier)
+            elif key.explicit:
+                claims[position] = IdempotencyConflict(CONFLICT_MESSAGE)
+            else:
+                claims[position] = (None, False)  # a new validation; the key stays with the first
+        positions = list(first.values())
+        if not positions:
+            return claims
+        expires_at = utc_now() + timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS)
+        try:
+            yield call(self.keys.insert_many, [
+                {"_id": keys[p].key, "video_id": video_ids[p], "fingerprint": keys[p].fingerprint,
+                 "expires_at": expires_at}
+                for p in positions
+            ], ordered=False)
+            taken = set()
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            taken = {positions[error["index"]] for error in errors}
+        for position in positions:
+            if position not in taken:
+                claims[position] = (None, True)
+                continue
+            # Held by an earlier save (or an expired claim): settle it one by one
+            try:
+                claims[position] = yield from self.claim_key(keys[position], video_ids[position])
+            except (IdempotencyConflict, IdempotencyInProgress) as e:
+                claims[position] = e
+        return claims
+
+    def finish_keys(self, keys: List[IdempotencyKey], results: List[int]):
+        """Store the result of each claimed key for replays."""
+        expires_at = utc_now() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+        yield call(self.keys.bulk_write, [
+            UpdateOne({"_id": key.key}, {"$set": {"result": result, "expires_at": expires_at}})
+            for key, result in zip(keys, results)
+        ])
+
+    def release_keys(self, keys: List[IdempotencyKey]):
+        """Give up claimed keys (the save failed) so a retry can write."""
+        yield call(self.keys.delete_many, {"_id": {"$in": [key.key for key in keys]}, "result": {"$exists": False}})
+
+    # Writes
+
+    def save(self, key: IdempotencyKey, video_id: str, validation: dict):
+        """
+        Insert one validation unless `key` replays an earlier save.
+        Returns (validations of the video, replayed); a replay reports the
+        current count, not the one stored with the key.
+        """
+        stored, claimed = yield from self.claim_key(key, video_id)
+        if stored is not None:
+            return (yield from self.counts_of([video_id]))[video_id], True
+        try:
+            yield call(self.validations.insert_one, {**validation, "video_id": video_id})
+            # The counter replaces a count_documents() scan of the video's validations
+            total = (yield from self.add_counts({video_id: 1}))[video_id]
+            yield from self.log_writes([{"op": "insert", "video_id": video_id, "validation": validation}])
+        except Exception:
+            if claimed:
+                yield from self.release_keys([key])
+            raise
+        if claimed:
+            yield from self.finish_keys([key], [total])
+        return total, False
+
+    def save_batch(self, keys: List[IdempotencyKey], items: List[Tuple[str, dict]]):
+        """
+        Insert the (video_id, validation) items with one insert_many, skipping
+        replays. Returns (outcome per item, as for batch_response(); totals per video).
+        """
+        video_ids = [video_id for video_id, _ in items]
+        claims = yield from self.claim_keys(keys, video_ids)
+        written = [position for position, claim in enumerate(claims)
+                   if isinstance(claim, tuple) and claim[0] is None]
+        claimed = [p for p in written if claims[p][1]]
+        totals: Dict[str, int] = {}
+        try:
+            if written:
+                yield call(self.validations.insert_many, [{**items[p][1], "video_id": items[p][0]} for p in written])
+                # One counter update per video
+                increments: Dict[str, int] = {}
+                for p in written:
+                    increments[video_ids[p]] = increments.get(video_ids[p], 0) + 1
+                totals = yield from self.add_counts(increments)
+                yield from self.log_writes([{"op": "insert", "video_id": items[p][0], "validation": items[p][1]}
+                                            for p in written])
+        except Exception:
+            if claimed:
+                yield from self.release_keys([keys[p] for p in claimed])
+            raise
+        missing = [video_id for video_id in dict.fromkeys(video_ids) if video_id not in totals]
+        if missing:
+            totals.update((yield from self.counts_of(missing)))
+
+        # Every item, replays included, reports its video's count after it:
+        # the new count minus the batch's later saves of that video
+        outcomes: list = [None] * len(items)
+        remaining = dict(totals)
+        saved = set(written)
+        for position in reversed(range(len(items))):
+            claim = claims[position]
+            if isinstance(claim, Repeat):
+                claim = claims[claim.position]
+            if isinstance(claim, BaseException):
+                outcomes[position] = claim
+            elif position in saved:
+                outcomes[position] = (remaining[video_ids[position]], False)
+                remaining[video_ids[position]] -= 1
+            else:
+                outcomes[position] = (remaining[video_ids[position]], True)
+        if claimed:
+            yield from self.finish_keys([keys[p] for p in claimed], [outcomes[p][0] for p in claimed])
+        return outcomes, {video_id: totals[video_id] for video_id in dict.fromkeys(video_ids)}
+
+    def delete_video(self, video_id: str):
+        """
+        Delete a video's validations, counter and idempotency keys (so saving one
+        again writes it); returns how many validations were deleted. Only a
+        delete that removed something is versioned and logged.
+        """
+        result = yield call(self.validations.delete_many, {"video_id": video_id})
+        yield call(self.keys.delete_many, {"video_id": video_id})
+        yield call(self.counts.delete_one, {"_id": video_id})
+        if result.deleted_count:
+            yield from self.log_writes([{"op": "delete", "video_id": video_id}])
+        return result.deleted_count
+
+    # Reads
+
+    def video_validations(self, video_id: str):
+        """A video's validations, oldest first."""
+        return (yield fetch(self.validations.find, {"video_id": video_id}, {"_id": 0, "video_id": 0},
+                            sort=[("timestamp", 1)]))
+
+    def latest_validation(self, video_id: str):
+        return (yield call(self.validations.find_one, {"video_id": video_id},
+                           sort=[("timestamp", -1)], projection={"_id": 0, "video_id": 0}))
+
+    def all_validations(self, query: Optional[ValidationQuery] = None):
+        """{video_id: validations} of every video, or of the validations matching `query`."""
+        if query:
+            docs = yield fetch(self.validations.find, query_filter(query), VALIDATION_FIELDS,
+                               sort=[("video_id", 1), ("timestamp", 1)])
+            return dict(group_videos((doc["video_id"], doc) for doc in docs if query.matches(doc)))
+        docs = yield fetch(self.validations.find, {}, VALIDATION_FIELDS,
+                           sort=[("video_id", 1), ("timestamp", 1)])
+        grouped: Dict[str, List[dict]] = {}
+        for doc in docs:
+            grouped.setdefault(doc.pop("video_id"), []).append(doc)
+        return grouped
+
+    def listing_response(self, request, etag: str, query: ValidationQuery):
+        """The unpaged GET /api/validations body; unfiltered ones are cached until the next write."""
+        entry = None if query else self.responses.get(("validations", etag))
+        if entry is None:
+            data = {"validations": (yield from self.all_validations(query))}
+            if query:
+                return (yield offload(json_response, request, data, etag))
+            entry = yield offload(self.responses.put, ("validations", etag), data, etag)
+        # Compressing megabytes would stall the async API's event loop
+        return (yield offload(body_response, request, entry))
+
+    def changes_response(self, request, since: Optional[str]):
+        """
+        GET /api/validations/changes: every validation without `since`, else
+        the logged writes after it (410 resync when they are no longer logged).
+        """
+        if since is None:
+            # No multi-document snapshot here: retry until no write landed during the read
+            for _ in range(5):
+                version = yield from self.current_version()
+                entry = self.responses.get(("changes", version))
+                if entry is None:
+                    validations = yield from self.all_validations()
+                    if (yield from self.current_version()) != version:
+                        continue
+                    entry = yield offload(self.responses.put, ("changes", version),
+                                          {"version": str(version), "full": True, "validations": validations})
+                return (yield offload(body_response, request, entry))
+            # Writes kept landing: send the last read (its version is no newer than its data), uncached
+            return (yield offload(json_response, request,
+                                  {"version": str(version), "full": True, "validations": validations}))
+
+        current = yield from self.current_version()
+        parsed = int(since) if since.isdigit() else None
+        if parsed is None or parsed > current:
+            return resync_response(str(current))
+        changes = []
+        expected = parsed + 1
+        for doc in (yield fetch(self.changes.find, {"_id": {"$gt": parsed, "$lte": current}}, sort=[("_id", 1)])):
+            if doc["_id"] != expected:
+                break  # gap: dropped by retention, or a write still being logged
+            changes.append({k: v for k, v in doc.items() if k != "_id"})
+            expected += 1
+        if parsed < current and not changes:
+            return resync_response(str(current))
+        return json_response(request, {"version": str(parsed + len(changes)), "full": False, "changes": changes})
+
+    def statuses(self, video_ids: List[str]):
+        """Latest status of each video, keyed by video_id (walks the (video_id, timestamp) index once)."""
+        docs = yield fetch(self.validations.aggregate, [
+            {"$match": {"video_id": {"$in": video_ids}}},
+            {"$sort": {"video_id": 1, "timestamp": -1}},
+            {"$group": {
+                "_id": "$video_id",
+                "status": {"$first": "$status"},
+                "timestamp": {"$first": "$timestamp"},
+                "feedback": {"$first": "$feedback"}
+            }}
+        ])
+        latest = {doc["_id"]: doc for doc in docs}
+        return {"statuses": {video_id: video_status(video_id, latest.get(video_id)) for video_id in video_ids}}
+
+    def stats(self):
+        """GET /api/stats from one aggregation (see STATS_PIPELINE)."""
+        facets = yield fetch(self.validations.aggregate, STATS_PIPELINE)
+        videos = facets[0]["videos"] if facets else []
+        by_status = {item["_id"]: item["count"] for item in (facets[0]["by_status"] if facets else [])}
+        # Every video in the collection has at least one validation, so none are pending
+        return {
+            "total_videos": videos[0]["total"] if videos else 0,
+            "pending": 0,
+            "correct": by_status.get("correct", 0),
+            "incorrect": by_status.get("incorrect", 0),
+            "needs_review": by_status.get("needs_review", 0),
+            "in_progress": 0
+        }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Pagination and NDJSON streaming for GET /api/validations.
+
+Each API module provides a generator of (video_id, validations) pairs in
+video_id order, starting after an optional cursor. The helpers here turn that
+into either one page ({"validations": {...}, "next_cursor": ...}) or an
+application/x-ndjson stream with one line per video, so the full result set is
+never materialized in memory. Async backends pass an async generator instead
+(see paginate_async).
+"""
+
+import json
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+VideoGroups = Iterable[Tuple[str, List[dict]]]
+AsyncVideoGroups = AsyncIterable[Tuple[str, List[dict]]]
+
+
+def wants_ndjson(request: Request, format: Optional[str] = None) -> bool:
+    """True for ?format=ndjson or an Accept header asking for NDJSON."""
+    if format:
+        return format.lower() == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_lines(groups: VideoGroups) -> Iterator[bytes]:
+    for video_id, validations in groups:
+        yield (json.dumps({"video_id": video_id, "validations": validations},
+                          separators=(",", ":")) + "\n").encode("utf-8")
+
+
+async def _ndjson_lines_async(groups: AsyncVideoGroups) -> AsyncIterator[bytes]:
+    async for video_id, validations in groups:
+        yield (json.dumps({"video_id": video_id, "validations": validations},
+                          separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def ndjson_response(groups: Union[VideoGroups, AsyncVideoGroups]) -> StreamingResponse:
+    """Stream one JSON line per video as the generator produces them."""
+    lines = _ndjson_lines_async(groups) if hasattr(groups, "__aiter__") else _ndjson_lines(groups)
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+
+def _without_video_id(validation: dict) -> dict:
+    return {k: v for k, v in validation.items() if k != "video_id"}
+
+
+def group_videos(rows: Iterable[Tuple[str, dict]], cursor: Optional[str] = None) -> Iterator[Tuple[str, List[dict]]]:
+    """
+    Group (video_id, validation) rows from a filtered query, ordered by
+    video_id, into (video_id, validations) pairs after `cursor`. Each group is
+    yielded as soon as the next video_id starts, so only one video is held at
+    a time. Rows keep their relative order within a video; video_id is
+    dropped from each validation.
+    """
+    for video_id, group in groupby(rows, key=itemgetter(0)):
+        if cursor is None or video_id > cursor:
+            yield video_id, [_without_video_id(validation) for _, validation in group]
+
+
+async def group_videos_async(rows: AsyncIterable[Tuple[str, dict]]) -> AsyncIterator[Tuple[str, List[dict]]]:
+    """group_videos() for rows from an async cursor."""
+    current_id, group = None, []
+    async for video_id, validation in rows:
+        if video_id != current_id and group:
+            yield current_id, group
+            group = []
+        current_id = video_id
+        group.append(_without_video_id(validation))
+    if group:
+        yield current_id, group
+
+
+def paginate(groups: VideoGroups, limit: int) -> dict:
+    """
+    Take one page of `limit` videos. `next_cursor` is the last video_id on the
+    page, or None when there is nothing after it.
+    """
+    page = list(islice(groups, limit + 1))
+    has_more = len(page) > limit
+    page = page[:limit]
+    return {
+        "validations": dict(page),
+        "next_cursor": page[-1][0] if has_more and page else None
+    }
+
+
+async def paginate_async(groups: AsyncVideoGroups, limit: int) -> dict:
+    """paginate() for an async generator of (video_id, validations)."""
+    page = []
+    async for group in groups:
+        page.append(group)
+        if len(page) > limit:
+            break
+    if hasattr(groups, "aclose"):
+        await groups.aclose()  # release the database cursor now
+    has_more = len(page) > limit
+    page = page[:limit]
+    return {
+        "validations": dict(page),
+        "next_cursor": page[-1][0] if has_more and page else None
+    }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory representation of validation records.
+
+A validation dict costs several hundred bytes (hash table plus a separate
+string object per field). ValidationRecord stores the same data in __slots__:
+status and validator are interned to small ints shared by every record, the
+video_id string is shared by all records of a video, and the timestamp is
+parsed once to epoch microseconds so "latest" and sorting compare ints, not
+ISO strings. Records convert back to the exact dict they came from with
+to_dict(); see benchmark_records.py for the numbers.
+"""
+
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+# Sorts before every parseable timestamp (empty or malformed timestamp text)
+UNKNOWN_TIME = -(1 << 62)
+
+_FIELDS = ("timestamp", "status", "feedback", "validator")
+
+
+class Interner:
+    """Bidirectional str <-> small int table; ids are never reused."""
+
+    def __init__(self, initial: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self._values: List[str] = []
+        self._lock = threading.Lock()
+        for value in initial:
+            self.id(value)
+
+    def id(self, value: str) -> int:
+        found = self._ids.get(value)
+        if found is not None:
+            return found
+        with self._lock:
+            found = self._ids.get(value)
+            if found is None:
+                found = len(self._values)
+                self._values.append(sys.intern(value))
+                self._ids[value] = found
+            return found
+
+    def value(self, id: int) -> str:
+        return self._values[id]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+STATUSES = Interner(["correct", "incorrect", "needs_review"])
+VALIDATORS = Interner(["community_member"])
+
+
+def parse_timestamp(text: str) -> int:
+    """ISO-8601 text as epoch microseconds (naive times are UTC)."""
+    try:
+        parsed = datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return UNKNOWN_TIME
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return (parsed - EPOCH) // _MICROSECOND
+
+
+def format_timestamp(micros: int) -> str:
+    """Epoch microseconds in the browser's toISOString() form (2024-01-15T10:30:00.000Z)."""
+    parsed = EPOCH + timedelta(microseconds=micros)
+    return parsed.strftime("%Y-%m-%dT%H:%M:%S.") + f"{parsed.microsecond // 1000:03d}Z"
+
+
+class ValidationRecord:
+    __slots__ = ("video_id", "ts", "status_id", "validator_id", "feedback", "ts_text", "extra")
+
+    def __init__(self, video_id: str, ts: int, status_id: int, validator_id: int, feedback: str,
+                 ts_text: Optional[str] = None, extra: Optional[dict] = None):
+        self.video_id = video_id
+        self.ts = ts
+        self.status_id = status_id
+        self.validator_id = validator_id
+        self.feedback = feedback
+        # Original timestamp text, kept only when format_timestamp(ts) doesn't reproduce it
+        self.ts_text = ts_text
+        # Fields other than the standard ones (rare), kept so to_dict() is lossless
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, doc: dict, video_id: Optional[str] = None) -> "ValidationRecord":
+        text = doc.get("timestamp", "")
+        ts = parse_timestamp(text)
+        extra = {k: v for k, v in doc.items() if k not in _FIELDS and k != "video_id"} or None
+        return cls(
+            sys.intern(video_id if video_id is not None else doc.get("video_id", "")),
+            ts,
+            STATUSES.id(doc.get("status", "")),
+            VALIDATORS.id(doc.get("validator", "community_member")),
+            doc.get("feedback", "") or "",
+            None if ts != UNKNOWN_TIME and format_timestamp(ts) == text else text,
+            extra,
+        )
+
+    @property
+    def timestamp(self) -> str:
+        return self.ts_text if self.ts_text is not None else format_timestamp(self.ts)
+
+    @property
+    def status(self) -> str:
+        return STATUSES.value(self.status_id)
+
+    @property
+    def validator(self) -> str:
+        return VALIDATORS.value(self.validator_id)
+
+    def to_dict(self, with_video_id: bool = False) -> dict:
+        doc = {
+            "timestamp": self.timestamp,
+            "status": self.status,
+            "feedback": self.feedback,
+            "validator": self.validator,
+        }
+        if self.extra:
+            doc.update(self.extra)
+        if with_video_id:
+            doc["video_id"] = self.video_id
+        return doc
+
+    def __repr__(self) -> str:
+        return f"ValidationRecord({self.to_dict(with_video_id=True)!r})"
+
+
+def to_dicts(records: Iterable[ValidationRecord]) -> List[dict]:
+    """API form of a video's records (without video_id)."""
+    return [record.to_dict() for record in records]
+
+
+def latest(records: Iterable[ValidationRecord]) -> Optional[ValidationRecord]:
+    """Newest record by parsed timestamp (the first one wins a tie)."""
+    best = None
+    for record in records:
+        if best is None or record.ts > best.ts:
+            best = record
+    return best
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Pre-serialized, compressed JSON responses for the large read endpoints.
+
+By default FastAPI copies a returned dict through jsonable_encoder, runs
+json.dumps over the copy, and sends the result uncompressed. The full
+/api/validations listing, the full /api/validations/changes resync and
+/api/bootstrap skip that path:
+
+- dumps() serializes straight to bytes. It uses orjson when it is installed
+  (pip install orjson) and json otherwise.
+- Compression is negotiated from Accept-Encoding for bodies of at least
+  COMPRESS_MIN_BYTES: brotli when the brotli package is installed and the
+  client accepts `br`, otherwise gzip. Smaller bodies are sent as they are.
+- ResponseCache keeps recent serialized bodies keyed on the data version.
+  Each compressed form is made the first time a client asks for it. Until the
+  next write, a read costs neither serialization nor compression.
+"""
+
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+from validation_versions import not_modified, set_etag
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# Serialized bytes each ResponseCache may hold. The newest entry is always kept.
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024)))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# In order of preference (when the client's q-values tie)
+ENCODINGS = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def dumps(data) -> bytes:
+    """Compact UTF-8 JSON; values JSON has no type for (e.g. datetime) become strings."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding!r}")
+
+
+def choose_encoding(request: Request, size: int) -> Optional[str]:
+    """The encoding to send a `size`-byte body with, or None for uncompressed."""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name.strip():
+            accepted[name.strip().lower()] = q
+    quality = {encoding: accepted.get(encoding, accepted.get("*", 0.0)) for encoding in ENCODINGS}
+    # Highest q-value wins; ties go to the first in ENCODINGS
+    best = max(ENCODINGS, key=quality.__getitem__)
+    return best if quality[best] > 0 else None
+
+
+class EncodedBody:
+    """A serialized JSON body, its ETag, and its compressed forms (each made on first use)."""
+
+    __slots__ = ("etag", "body", "_encoded")
+
+    def __init__(self, body: bytes, etag: Optional[str] = None):
+        self.etag = etag
+        self.body = body
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            # Two requests racing here both compress; either result is the same bytes
+            data = self._encoded[encoding] = compress(self.body, encoding)
+        return data
+
+    def sizes(self) -> Dict[str, int]:
+        return {"identity": len(self.body), **{name: len(data) for name, data in self._encoded.items()}}
+
+
+def body_response(request: Request, entry: EncodedBody) -> Response:
+    """304 if the client has this body, else the body in the best encoding the client accepts."""
+    headers = {"Vary": "Accept-Encoding"}
+    if entry.etag is not None:
+        cached = not_modified(request, entry.etag)
+        if cached:
+            cached.headers.update(headers)
+            return cached
+    content = entry.body
+    encoding = choose_encoding(request, len(content))
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        content = entry.encoded(encoding)
+    response = Response(content, media_type="application/json", headers=headers)
+    return set_etag(response, entry.etag) if entry.etag is not None else response
+
+
+def json_response(request: Request, data, etag: Optional[str] = None) -> Response:
+    """`data` serialized and compressed for this request only (nothing is cached)."""
+    return body_response(request, EncodedBody(dumps(data), etag))
+
+
+class ResponseCache:
+    """
+    Serialized bodies keyed on (endpoint, data version, ...), least recently
+    used dropped first once they hold more than max_bytes. The key must change
+    whenever the body would, e.g. by including the version an ETag is made from.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[object, EncodedBody]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, key) -> Optional[EncodedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+    def put(self, key, data, etag: Optional[str] = None) -> EncodedBody:
+        """Serialize `data` and keep it under `key`."""
+        entry = EncodedBody(dumps(data), etag)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            self.builds += 1
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= len(dropped.body)
+        return entry
+
+    def get_or_build(self, key, build: Callable[[], object], etag: Optional[str] = None) -> EncodedBody:
+        """The body for `key`, calling build() for its data on a miss (once, even under concurrent requests)."""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        with self._build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            return self.put(key, build(), etag)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.values())
+            stats = {"entries": len(entries), "bytes": self._bytes, "hits": self.hits, "builds": self.builds}
+        encoded: Dict[str, int] = {}
+        for entry in entries:
+            for name, size in entry.sizes().items():
+                if name != "identity":
+                    encoded[name] = encoded.get(name, 0) + size
+        return {**stats, "encoded_bytes": encoded, "encoder": "orjson" if ORJSON_AVAILABLE else "json",
+                "encodings": list(ENCODINGS)}
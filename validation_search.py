@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Full-text inverted index over validation feedback (GET /api/search).
+
+Feedback is lowercased and split into word tokens (letters, digits, underscore;
+common English stopwords dropped). Each term maps to the documents containing
+it and how often, so a query only touches the postings of its own terms.
+Results are ranked with BM25. A trailing `*` makes a term a prefix match
+(`retract*` finds "retraction" and "retracted").
+
+The index is kept in sync on insert/delete and saved to a JSON file together
+with a fingerprint of the content it covers (a hash of every document's id,
+video_id and feedback, kept up to date as documents come and go); on startup
+it is loaded only if the fingerprint still matches the database, otherwise
+rebuilt. So a file left behind by a crash, or a database restored or copied
+with the same ids but other feedback, is never served.
+
+An index is published with each read snapshot (validation_snapshot.py) and not
+changed afterwards: the writer changes a copy(), which shares everything the
+commit does not touch, and publishes that with the next snapshot.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple, Union
+
+INDEX_FORMAT = 2
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# A prefix term expands to at most this many index terms
+MAX_PREFIX_TERMS = 64
+# Document ids per chunk of a ChunkedMap (2 ** CHUNK_BITS), the unit copy() shares
+CHUNK_BITS = 10
+# Postings of more documents than this are ChunkedMaps, so a commit does not copy them whole
+SMALL_POSTINGS = 64
+
+_TOKEN = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or so that
+the this to was were will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Search terms of `text`, in order (repeats kept for term frequency)."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def parse_query(query: str) -> List[Tuple[str, bool]]:
+    """(term, is_prefix) pairs; a word ending in '*' is a prefix term."""
+    terms = []
+    for word in query.split():
+        tokens = tokenize(word)
+        if not tokens:
+            continue
+        terms.extend((token, False) for token in tokens[:-1])
+        terms.append((tokens[-1], word.endswith("*")))
+    return terms
+
+
+_DIGEST_MOD = 2 ** 64
+
+
+def document_hash(doc_id: int, doc: dict) -> int:
+    """64-bit hash of what the index keeps of a document."""
+    text = f"{doc_id}\0{doc.get('video_id', '')}\0{doc.get('feedback') or ''}"
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def fingerprint(docs: Iterable[Tuple[int, dict]]) -> List[int]:
+    """
+    Identity of a set of (doc_id, document) pairs: [count, sum of
+    document_hash() mod 2**64]. Order-independent, so an index can keep it up
+    to date as documents are added and removed.
+    """
+    count = digest = 0
+    for doc_id, doc in docs:
+        count += 1
+        digest = (digest + document_hash(doc_id, doc)) % _DIGEST_MOD
+    return [count, digest]
+
+
+class ChunkedMap:
+    """
+    int -> value, in chunks of consecutive keys. copy() shares the chunks;
+    whichever side changes a chunk first copies just that chunk, so changing
+    a copy costs O(chunks + the keys it touches), not O(keys). Holds the
+    large postings and the per-document table.
+    """
+
+    __slots__ = ("_chunks", "_owned", "_len")
+
+    def __init__(self, items: Iterable[Tuple[int, object]] = ()):
+        self._chunks: Dict[int, dict] = {}
+        self._owned: Set[int] = set()  # chunks only this map holds
+        self._len = 0
+        for key, value in items:
+            self[key] = value
+
+    def copy(self) -> "ChunkedMap":
+        other = ChunkedMap()
+        other._chunks = dict(self._chunks)
+        other._len = self._len
+        self._owned = set()
+        return other
+
+    def _writable(self, chunk_id: int) -> dict:
+        chunk = self._chunks.get(chunk_id)
+        if chunk is None:
+            chunk = self._chunks[chunk_id] = {}
+            self._owned.add(chunk_id)
+        elif chunk_id not in self._owned:
+            chunk = self._chunks[chunk_id] = dict(chunk)
+            self._owned.add(chunk_id)
+        return chunk
+
+    def get(self, key: int, default=None):
+        chunk = self._chunks.get(key >> CHUNK_BITS)
+        return chunk.get(key, default) if chunk is not None else default
+
+    def __setitem__(self, key: int, value):
+        chunk = self._writable(key >> CHUNK_BITS)
+        if key not in chunk:
+            self._len += 1
+        chunk[key] = value
+
+    def pop(self, key: int, default=None):
+        chunk_id = key >> CHUNK_BITS
+        if key not in self._chunks.get(chunk_id, ()):
+            return default
+        chunk = self._writable(chunk_id)
+        value = chunk.pop(key)
+        if not chunk:
+            del self._chunks[chunk_id]
+            self._owned.discard(chunk_id)
+        self._len -= 1
+        return value
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._chunks.get(key >> CHUNK_BITS, ())
+
+    def chunks(self) -> Iterator[Tuple[int, dict]]:
+        """(chunk id, {key: value}) pairs; two maps over the same keys share chunk ids."""
+        for chunk_id in sorted(self._chunks):
+            yield chunk_id, self._chunks[chunk_id]
+
+    def chunk(self, chunk_id: int) -> dict:
+        return self._chunks.get(chunk_id, {})
+
+    def items(self) -> Iterator[Tuple[int, object]]:
+        for _, chunk in self.chunks():
+            yield from chunk.items()
+
+    def values(self) -> Iterator[object]:
+        for _, value in self.items():
+            yield value
+
+    def __iter__(self) -> Iterator[int]:
+        for key, _ in self.items():
+            yield key
+
+    def __len__(self) -> int:
+        return self._len
+
+
+# doc_id -> term frequency, for one term
+Postings = Union[Dict[int, int], ChunkedMap]
+
+
+class SearchHit(NamedTuple):
+    doc_id: int
+    video_id: str
+    score: float
+
+
+class SearchIndex:
+    """
+    term -> {doc_id: term frequency}, plus each document's video_id and token
+    count. Searches may run on any thread; changes are made by one writer, on
+    an index no reader has yet (a new one, or a copy()).
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Postings] = {}
+        self._terms: List[str] = []  # sorted, for prefix queries
+        self._docs = ChunkedMap()  # doc_id -> (video_id, token count)
+        self._total_length = 0
+        self._digest = 0  # fingerprint() of the indexed documents, less the count
+        # What this index may change in place; the rest is shared with the index it was copied from
+        self._owned_postings: Set[str] = set()
+        self._owns_terms = True
+
+    def copy(self) -> "SearchIndex":
+        """An index to change and publish instead of this one, which must no longer change."""
+        other = SearchIndex()
+        other._postings = dict(self._postings)
+        other._terms = self._terms
+        other._docs = self._docs.copy()
+        other._total_length = self._total_length
+        other._digest = self._digest
+        other._owns_terms = False
+        self._owned_postings = set()
+        self._owns_terms = False
+        return other
+
+    def build(self, docs: Iterable[Tuple[int, dict]]):
+        """Rebuild the index from (doc_id, document) pairs."""
+        self._clear()
+        for doc_id, doc in docs:
+            self._add(doc_id, doc)
+        self._terms = sorted(self._postings)
+
+    def add(self, doc_id: int, doc: dict):
+        """Index a newly inserted document."""
+        new_terms = self._add(doc_id, doc)
+        if new_terms:
+            terms = self._writable_terms()
+            for term in new_terms:
+                insort(terms, term)
+
+    def remove(self, docs: Iterable[Tuple[int, dict]]):
+        """Drop deleted (doc_id, document) pairs; only their own terms' postings are touched."""
+        for doc_id, doc in docs:
+            entry = self._docs.pop(doc_id)
+            if entry is None:
+                continue
+            self._total_length -= entry[1]
+            self._digest = (self._digest - document_hash(doc_id, doc)) % _DIGEST_MOD
+            for term in set(tokenize(doc.get("feedback") or "")):
+                if doc_id not in self._postings.get(term, ()):
+                    continue
+                postings = self._writable_postings(term)
+                postings.pop(doc_id)
+                if not postings:
+                    del self._postings[term]
+                    self._owned_postings.discard(term)
+                    terms = self._writable_terms()
+                    del terms[bisect_left(terms, term)]
+
+    def search(self, query: str, limit: int = 50) -> Tuple[List[SearchHit], int]:
+        """Top `limit` documents by BM25 score, and how many documents matched."""
+        scores: Dict[int, float] = {}
+        count = len(self._docs)
+        average = self._total_length / count if count else 0.0
+        document = self._docs.get
+        get = scores.get
+        # BM25 length normalization K1 * (1 - B + B * length / average), split up
+        base = K1 * (1 - B)
+        scale = K1 * B / average if average else 0.0
+        for term, prefix in parse_query(query):
+            for expanded in (self._expand(term) if prefix else (term,)):
+                postings = self._postings.get(expanded)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                weight = idf * (K1 + 1)
+                if isinstance(postings, ChunkedMap):
+                    # The documents of a postings chunk are in the same chunk of the document table
+                    for chunk_id, chunk in postings.chunks():
+                        documents = self._docs.chunk(chunk_id)
+                        for doc_id, frequency in chunk.items():
+                            norm = base + scale * documents[doc_id][1]
+                            scores[doc_id] = get(doc_id, 0.0) + weight * frequency / (frequency + norm)
+                else:
+                    for doc_id, frequency in postings.items():
+                        norm = base + scale * document(doc_id)[1]
+                        scores[doc_id] = get(doc_id, 0.0) + weight * frequency / (frequency + norm)
+        # Ties go to the newer document
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return [SearchHit(doc_id, document(doc_id)[0], score) for doc_id, score in top], len(scores)
+
+    def save(self, path):
+        """Atomically write the index (temp file + rename)."""
+        path = Path(path)
+        docs = list(self._docs.items())
+        # Columnar lists so loading is mostly dict(zip(...))
+        data = {
+            "format": INDEX_FORMAT,
+            "fingerprint": self.fingerprint(),
+            "docs": [[doc_id for doc_id, _ in docs], [video_id for _, (video_id, _) in docs],
+                     [length for _, (_, length) in docs]],
+            "postings": {term: [list(postings), list(postings.values())]
+                         for term, postings in self._postings.items()},
+        }
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def load(self, path, expected_fingerprint: List[int]) -> bool:
+        """Load a saved index if it covers exactly the expected documents (see fingerprint())."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("format") != INDEX_FORMAT or data.get("fingerprint") != list(expected_fingerprint):
+            return False
+        doc_ids, video_ids, lengths = data["docs"]
+        self._clear()
+        self._postings = {term: (dict if len(ids) <= SMALL_POSTINGS else ChunkedMap)(zip(ids, frequencies))
+                          for term, (ids, frequencies) in data["postings"].items()}
+        self._owned_postings = set(self._postings)
+        self._terms = sorted(self._postings)
+        self._docs = ChunkedMap((doc_id, (video_id, length))
+                                for doc_id, video_id, length in zip(doc_ids, video_ids, lengths))
+        self._total_length = sum(lengths)
+        self._digest = data["fingerprint"][1]
+        return True
+
+    def fingerprint(self) -> List[int]:
+        """fingerprint() of the documents in the index."""
+        return [len(self._docs), self._digest]
+
+    def stats(self) -> dict:
+        return {"documents": len(self._docs), "terms": len(self._postings)}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _clear(self):
+        self._postings = {}
+        self._terms = []
+        self._docs = ChunkedMap()
+        self._total_length = 0
+        self._digest = 0
+        self._owned_postings = set()
+        self._owns_terms = True
+
+    def _writable_postings(self, term: str) -> Postings:
+        if term not in self._owned_postings:
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = {}
+            elif isinstance(postings, ChunkedMap):
+                postings = postings.copy()
+            else:
+                postings = dict(postings)
+            self._postings[term] = postings
+            self._owned_postings.add(term)
+        return self._postings[term]
+
+    def _writable_terms(self) -> List[str]:
+        if not self._owns_terms:
+            self._terms = list(self._terms)
+            self._owns_terms = True
+        return self._terms
+
+    def _add(self, doc_id: int, doc: dict) -> List[str]:
+        """Add one document; returns terms new to the index."""
+        tokens = tokenize(doc.get("feedback") or "")
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        new_terms = []
+        for term, frequency in frequencies.items():
+            if term not in self._postings:
+                new_terms.append(term)
+            postings = self._writable_postings(term)
+            postings[doc_id] = frequency
+            if len(postings) > SMALL_POSTINGS and not isinstance(postings, ChunkedMap):
+                self._postings[term] = ChunkedMap(postings.items())
+        self._docs[doc_id] = (doc.get("video_id", ""), len(tokens))
+        self._total_length += len(tokens)
+        self._digest = (self._digest + document_hash(doc_id, doc)) % _DIGEST_MOD
+        return new_terms
+
+    def _expand(self, prefix: str) -> List[str]:
+        terms = self._terms
+        start = bisect_left(terms, prefix)
+        matches = []
+        for term in terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+
+def load_or_build(index: SearchIndex, path, docs: List[Tuple[int, dict]], reuse: bool = True) -> str:
+    """Load the saved index for `docs` (if `reuse`), else rebuild and save it. Returns "loaded" or "built"."""
+    if reuse and index.load(path, fingerprint(docs)):
+        return "loaded"
+    index.build(docs)
+    try:
+        index.save(path)
+    except OSError as e:
+        print(f"⚠️  Could not save search index to {path}: {e}")
+    return "built"
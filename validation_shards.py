@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Hash-sharded TinyDB storage for validation documents.
+
+Documents are split across K TinyDB files by a stable hash (CRC-32) of their
+video_id, so all validations of a video live in one shard and a write only
+rewrites a file about 1/K the size of the whole database. Each shard has its
+own lock; a batch that touches several shards writes them in parallel, and
+full scans read every shard in parallel and merge the results.
+
+The parallelism is within one call only. validation_api_tinydb.py still
+commits through its single writer thread, so two requests never write
+different shards at the same time unless group commit puts them in the same
+batch (GROUP_COMMIT=1). What sharding buys there is the smaller file
+rewritten per write.
+
+Document ids are global: local id * K + shard index, so they stay unique
+across shards and the shard of an id is `doc_id % K`.
+
+Exposes the small subset of the TinyDB table API that validation_api_tinydb.py
+uses (insert_multiple / remove / all), like validation_log_storage.py.
+
+Files, for a base path like data/validation_database_tinydb and K = 8:
+    data/validation_database_tinydb.shard00-of-08.json
+    ...
+    data/validation_database_tinydb.shard07-of-08.json
+
+The shard of a video depends on K, so opening files written with another K
+is refused (ShardCountMismatch) rather than starting an empty set beside them.
+"""
+
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from validation_log_storage import LogDocument
+
+
+def shard_of(video_id: str, count: int) -> int:
+    """Shard index of a video (stable across processes and restarts)."""
+    return zlib.crc32(video_id.encode("utf-8")) % count
+
+
+def shard_paths(base_path, count: int) -> List[Path]:
+    base = Path(base_path)
+    return [Path(f"{base}.shard{index:02d}-of-{count:02d}.json") for index in range(count)]
+
+
+def existing_shard_counts(base_path) -> Set[int]:
+    """The shard counts K of the shard files already next to `base_path`."""
+    base = Path(base_path)
+    pattern = re.compile(re.escape(base.name) + r"\.shard\d+-of-(\d+)\.json")
+    if not base.parent.is_dir():
+        return set()
+    return {int(match.group(1)) for path in base.parent.iterdir()
+            if (match := pattern.fullmatch(path.name))}
+
+
+class ShardCountMismatch(ValueError):
+    """Shard files exist for a different shard count."""
+
+
+class ShardedTinyDB:
+    """
+    K TinyDB tables behind one document-table interface.
+
+    `open_shard(path)` opens one shard file and returns its TinyDB (so the
+    caller picks the storage/middleware).
+    """
+
+    def __init__(self, base_path, count: int, open_shard: Callable):
+        if count < 1:
+            raise ValueError("Shard count must be at least 1")
+        other_counts = existing_shard_counts(base_path) - {count}
+        if other_counts:
+            found = ", ".join(str(n) for n in sorted(other_counts))
+            raise ShardCountMismatch(
+                f"{base_path} has shard files for {found} shards, not {count}; "
+                f"set the shard count back or move those files away"
+            )
+        self.count = count
+        self.paths = shard_paths(base_path, count)
+        self.paths[0].parent.mkdir(parents=True, exist_ok=True)
+        self._shards = [open_shard(str(path)) for path in self.paths]
+        self._locks = [threading.Lock() for _ in range(count)]
+        self._pool = ThreadPoolExecutor(max_workers=count, thread_name_prefix="shard")
+
+    def shard_of(self, video_id: str) -> int:
+        return shard_of(video_id, self.count)
+
+    def _run(self, work: Dict[int, Callable[[], object]]) -> Dict[int, object]:
+        """Run one callable per shard (in parallel when there are several)."""
+        if len(work) == 1:
+            (index, fn), = work.items()
+            return {index: fn()}
+        futures = {index: self._pool.submit(fn) for index, fn in work.items()}
+        return {index: future.result() for index, future in futures.items()}
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def insert_multiple(self, documents: Iterable[dict]) -> List[int]:
+        """Insert documents (one write per touched shard); returns their global ids in order."""
+        documents = list(documents)
+        by_shard: Dict[int, List[int]] = {}
+        for position, document in enumerate(documents):
+            by_shard.setdefault(self.shard_of(document.get("video_id", "")), []).append(position)
+
+        def insert(index: int, positions: List[int]) -> Callable[[], List[int]]:
+            def run():
+                with self._locks[index]:
+                    return self._shards[index].insert_multiple(documents[p] for p in positions)
+            return run
+
+        local_ids = self._run({index: insert(index, positions) for index, positions in by_shard.items()})
+        doc_ids = [0] * len(documents)
+        for index, positions in by_shard.items():
+            for position, local_id in zip(positions, local_ids[index]):
+                doc_ids[position] = local_id * self.count + index
+        return doc_ids
+
+    def remove(self, doc_ids: Iterable[int]) -> List[int]:
+        """Remove documents by global id; returns the ids that existed."""
+        by_shard: Dict[int, List[int]] = {}
+        for doc_id in doc_ids:
+            by_shard.setdefault(doc_id % self.count, []).append(doc_id // self.count)
+
+        def remove(index: int, local_ids: List[int]) -> Callable[[], List[int]]:
+            def run():
+                with self._locks[index]:
+                    shard = self._shards[index]
+                    existing = [local_id for local_id in local_ids if shard.contains(doc_id=local_id)]
+                    return shard.remove(doc_ids=existing) if existing else []
+            return run
+
+        removed = self._run({index: remove(index, ids) for index, ids in by_shard.items()}) if by_shard else {}
+        return [local_id * self.count + index for index, local_ids in removed.items() for local_id in local_ids]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def all(self) -> List[LogDocument]:
+        """Every document, shard by shard (read in parallel); insertion order within a video."""
+        def read(index: int) -> Callable[[], List[Tuple[int, dict]]]:
+            def run():
+                with self._locks[index]:
+                    return [(doc.doc_id, dict(doc)) for doc in self._shards[index].all()]
+            return run
+
+        shards = self._run({index: read(index) for index in range(self.count)})
+        return [LogDocument(doc, local_id * self.count + index)
+                for index in range(self.count) for local_id, doc in shards[index]]
+
+    def shard_stats(self) -> List[dict]:
+        """Records and file size per shard."""
+        stats = []
+        for index, path in enumerate(self.paths):
+            with self._locks[index]:
+                records = len(self._shards[index])
+            stats.append({
+                "shard": index,
+                "file": str(path),
+                "records": records,
+                "bytes": path.stat().st_size if path.exists() else 0,
+            })
+        return stats
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                shard.close()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Copy-on-write read snapshots for the TinyDB API.
+
+One writer thread owns the database and every mutation. After each commit it
+publishes a new Snapshot by swapping a single module-level reference; request
+threads grab the current reference and read from it without locks. A snapshot
+is never modified once published, so a reader sees either all of a commit or
+none of it.
+
+Publishing copies only the top-level maps (video_id -> records, latest per
+video) and reuses every untouched per-video tuple, so a commit costs
+O(videos) pointer copies, not O(records).
+
+The secondary index (validator/status/time filters) and the feedback search
+index are part of the snapshot too, so a filtered read or a search sees the
+same commit as the records it returns. The builder changes copies of them,
+which share everything the commit leaves alone (SecondaryIndex.copy(),
+SearchIndex.copy()).
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from validation_index import LatestStatusTable, SecondaryIndex
+from validation_records import ValidationRecord
+from validation_search import SearchIndex
+
+# (doc_id, record) pairs of one video, in insertion order
+VideoRecords = Tuple[Tuple[int, ValidationRecord], ...]
+
+
+class Snapshot:
+    """Immutable view of the validations at one write version. Treat as read-only."""
+
+    __slots__ = ("videos", "video_ids", "latest", "status_counts", "version", "index", "search")
+
+    def __init__(self, videos: Dict[str, VideoRecords], video_ids: List[str],
+                 latest: Dict[str, ValidationRecord], status_counts: Dict[str, int], version: int,
+                 index: SecondaryIndex, search: SearchIndex):
+        self.videos = videos
+        self.video_ids = video_ids  # sorted, for cursor pagination
+        self.latest = latest
+        self.status_counts = status_counts
+        self.version = version
+        self.index = index  # keyed on the ValidationRecords in `videos`
+        self.search = search  # keyed on doc_id
+
+    def records(self, video_id: str) -> VideoRecords:
+        return self.videos.get(video_id, ())
+
+    def count(self, video_id: str) -> int:
+        return len(self.videos.get(video_id, ()))
+
+    def video_ids_after(self, cursor: Optional[str] = None) -> List[str]:
+        """Video ids in sorted order, strictly after `cursor` (all when None)."""
+        if cursor is None:
+            return self.video_ids
+        return self.video_ids[bisect_right(self.video_ids, cursor):]
+
+    def find(self, video_id: str, doc_id: int) -> Optional[ValidationRecord]:
+        """A video's record by document id (O(k) in the video's records)."""
+        for record_id, record in self.videos.get(video_id, ()):
+            if record_id == doc_id:
+                return record
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self.videos.values())
+
+
+EMPTY_SNAPSHOT = Snapshot({}, [], {}, {}, 0, SecondaryIndex(), SearchIndex())
+
+
+class SnapshotBuilder:
+    """
+    Writer-side working state for one commit: applies inserts/deletes on top
+    of the previous snapshot and its indexes and produces the next one. Keeps
+    the mutable LatestStatusTable that backs the published `latest` map and counts.
+    """
+
+    def __init__(self, base: Snapshot, latest_table: LatestStatusTable):
+        self.base = base
+        self.latest_table = latest_table
+        self._videos: Dict[str, VideoRecords] = {}  # touched videos only; () = deleted
+        self._video_ids: Optional[List[str]] = None
+        # Copies of the base's indexes, made on the first change
+        self._index: Optional[SecondaryIndex] = None
+        self._search: Optional[SearchIndex] = None
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[Tuple[int, dict]], latest_table: LatestStatusTable,
+                       search: Optional[SearchIndex] = None) -> "SnapshotBuilder":
+        """
+        Builder holding every document (a full rebuild). `search` is a search
+        index already built for `docs` (e.g. loaded from disk); built here if None.
+        """
+        docs = list(docs)
+        grouped: Dict[str, List[Tuple[int, ValidationRecord]]] = {}
+        for doc_id, doc in docs:
+            record = ValidationRecord.from_dict(doc)
+            if record.video_id:
+                grouped.setdefault(record.video_id, []).append((doc_id, record))
+        latest_table.rebuild(record for records in grouped.values() for _, record in records)
+        builder = cls(EMPTY_SNAPSHOT, latest_table)
+        builder._videos = {video_id: tuple(records) for video_id, records in grouped.items()}
+        builder._video_ids = sorted(grouped)
+        builder._index = SecondaryIndex()
+        builder._index.build((record, record) for records in grouped.values() for _, record in records)
+        if search is None:
+            search = SearchIndex()
+            search.build(docs)
+        builder._search = search
+        return builder
+
+    def records(self, video_id: str) -> VideoRecords:
+        if video_id in self._videos:
+            return self._videos[video_id]
+        return self.base.records(video_id)
+
+    def insert(self, doc_id: int, doc: dict) -> ValidationRecord:
+        """Add one stored document; returns its record."""
+        record = ValidationRecord.from_dict(doc)
+        existing = self.records(record.video_id)
+        if not existing:
+            insort(self._sorted_ids(), record.video_id)
+        self._videos[record.video_id] = existing + ((doc_id, record),)
+        self.latest_table.apply_insert(record)
+        self._writable_index().add(record, record)
+        self._writable_search().add(doc_id, doc)
+        return record
+
+    def delete(self, video_id: str) -> VideoRecords:
+        """Drop a video; returns the (doc_id, record) pairs it had."""
+        existing = self.records(video_id)
+        if existing:
+            ids = self._sorted_ids()
+            del ids[bisect_left(ids, video_id)]
+            self._videos[video_id] = ()
+            self.latest_table.apply_delete(video_id)
+            index = self._writable_index()
+            for _, record in existing:
+                index.remove(record, record)
+            self._writable_search().remove((doc_id, record.to_dict(with_video_id=True))
+                                           for doc_id, record in existing)
+        return existing
+
+    def _writable_index(self) -> SecondaryIndex:
+        if self._index is None:
+            self._index = self.base.index.copy()
+        return self._index
+
+    def _writable_search(self) -> SearchIndex:
+        if self._search is None:
+            self._search = self.base.search.copy()
+        return self._search
+
+    def _sorted_ids(self) -> List[str]:
+        if self._video_ids is None:
+            self._video_ids = list(self.base.video_ids)
+        return self._video_ids
+
+    def build(self, version: int) -> Snapshot:
+        """The next snapshot: the base with this commit's videos swapped in."""
+        videos = dict(self.base.videos)
+        latest = dict(self.base.latest)
+        for video_id, records in self._videos.items():
+            if records:
+                videos[video_id] = records
+                latest[video_id] = self.latest_table.get(video_id)
+            else:
+                videos.pop(video_id, None)
+                latest.pop(video_id, None)
+        video_ids = self._video_ids if self._video_ids is not None else self.base.video_ids
+        return Snapshot(videos, video_ids, latest, dict(self.latest_table.status_counts), version,
+                        self._index if self._index is not None else self.base.index,
+                        self._search if self._search is not None else self.base.search)
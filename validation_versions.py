@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Write versions and ETag handling for the validation APIs.
+
+Every write bumps a monotonically increasing version (globally and for the
+video it touched). GET endpoints turn the version into an ETag *before*
+reading any data, so the tag can only ever be older than the body it is sent
+with; a request whose If-None-Match matches gets a 304 without the storage
+being read at all.
+
+The same versions drive delta sync (GET /api/validations/changes): backends
+record each write in a bounded change log, and clients ask for the changes
+after the version token they last saw.
+"""
+
+import os
+import threading
+import uuid
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+# Tell browsers to revalidate every time (they then send If-None-Match)
+CACHE_CONTROL = "no-cache"
+
+# How many changes the delta-sync log keeps before older ones are dropped
+CHANGE_LOG_RETENTION = int(os.getenv("CHANGE_LOG_RETENTION", "10000"))
+
+
+class VersionTracker:
+    """
+    In-process write versions. The epoch (random per process start) goes into
+    every ETag so tags issued before a restart can never match again. Workers
+    sharing a data file use the epoch and versions of a shared counter instead
+    (validation_workers.SharedVersion): bump() then takes the version to use.
+    """
+
+    def __init__(self, epoch: Optional[str] = None):
+        self.epoch = epoch or uuid.uuid4().hex[:8]
+        self.version = 0
+        self._base = 0
+        self._video_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, video_ids: Iterable[str] = (), version: Optional[int] = None) -> int:
+        """Record a write touching `video_ids` (at `version`, default the next one); returns the new global version."""
+        with self._lock:
+            self.version = self.version + 1 if version is None else version
+            for video_id in video_ids:
+                self._video_versions[video_id] = self.version
+            return self.version
+
+    def bump_all(self, version: Optional[int] = None) -> int:
+        """Invalidate every video (e.g. the data was reloaded from scratch)."""
+        with self._lock:
+            self.version = self.version + 1 if version is None else version
+            self._base = self.version
+            self._video_versions.clear()
+            return self.version
+
+    def video_version(self, video_id: str) -> int:
+        return self._video_versions.get(video_id, self._base)
+
+    def etag(self, video_id: Optional[str] = None) -> str:
+        version = self.version if video_id is None else self.video_version(video_id)
+        return make_etag(self.token(version))
+
+    def token(self, version: int) -> str:
+        """Version token handed to clients for delta sync."""
+        return f"{self.epoch}.{version}"
+
+    def parse_token(self, token: str) -> Optional[int]:
+        """Version from a token, or None if it is malformed or from another process."""
+        epoch, _, version = token.partition(".")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+
+class ChangeLog:
+    """
+    Bounded in-memory log of writes for delta sync. Entries are
+    (version, change) with versions non-decreasing; several changes may share
+    a version when they were written in one batch.
+
+    Versions need not be consecutive: a worker that folds in several of
+    another worker's writes at once records them under the last one's version.
+    Only versions recorded here are valid `since` values, since this log
+    cannot split such a batch.
+    """
+
+    def __init__(self, retention: int = CHANGE_LOG_RETENTION):
+        self.retention = retention
+        self.version = 0  # last recorded version
+        self.floor = 0    # changes at or below this version may have been dropped
+        self._entries = deque()
+        self._recorded = deque()  # versions recorded above the floor, in order
+        self._recorded_set = set()
+        self._lock = threading.Lock()
+
+    def record(self, version: int, changes: Iterable[dict]):
+        with self._lock:
+            for change in changes:
+                self._entries.append((version, change))
+            while len(self._entries) > self.retention:
+                dropped_version, _ = self._entries.popleft()
+                self.floor = max(self.floor, dropped_version)
+            self.version = version
+            self._recorded.append(version)
+            self._recorded_set.add(version)
+            while self._recorded and self._recorded[0] <= self.floor:
+                self._recorded_set.discard(self._recorded.popleft())
+
+    def reset(self, version: int):
+        """Forget everything up to `version` (the data was reloaded from scratch)."""
+        with self._lock:
+            self._entries.clear()
+            self._recorded.clear()
+            self._recorded_set.clear()
+            self.floor = version
+            self.version = version
+
+    def since(self, version: int) -> Optional[Tuple[int, List[dict]]]:
+        """
+        (latest version, changes after `version`) or None when `version` is
+        too old (or unknown) and the client must resync.
+        """
+        with self._lock:
+            if version < self.floor or version > self.version:
+                return None
+            if version != self.floor and version not in self._recorded_set:
+                return None
+            changes = []
+            for entry_version, change in reversed(self._entries):
+                if entry_version <= version:
+                    break
+                changes.append(change)
+            changes.reverse()
+            return self.version, changes
+
+
+def make_etag(token) -> str:
+    return f'"{token}"'
+
+
+def etag_variant(etag: str, variant: str) -> str:
+    """Distinct tag for another representation of the same data (e.g. NDJSON)."""
+    return f'{etag[:-1]}-{variant}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of `etag` against the request's If-None-Match header."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == wanted:
+            return True
+    return False
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already has `etag`, else None."""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def resync_response(version_token: str) -> JSONResponse:
+    """410 telling a delta-sync client its version is gone and it must resync."""
+    return JSONResponse(status_code=410, content={
+        "detail": "Version too old or unknown; fetch /api/validations/changes "
+                  "without 'since' for a full resync",
+        "resync": True,
+        "version": version_token
+    })
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Cross-process coordination for running the TinyDB API with several workers
+(uvicorn --workers N / WEB_CONCURRENCY=N) against one data file.
+
+Each worker keeps its own in-memory snapshot and serves reads from it. Workers
+coordinate through the files only:
+
+- Every write batch runs under an exclusive advisory lock (flock on a sidecar
+  .lock file), so two processes never rewrite the data file at once and a
+  reader never loads a half-written one (reloads take the lock shared).
+- After each batch the writer records the data files' (mtime, size, inode).
+  Any other state means another worker wrote since: the worker reloads the
+  files and folds the difference into its snapshot before it next reads or
+  writes.
+- The write version behind ETags and delta-sync tokens is a counter file
+  (SharedVersion) that each write batch advances under the exclusive lock, so
+  every worker hands out the same tokens for the same data.
+
+Advisory locks need fcntl, so this is POSIX-only; a single worker needs none
+of it.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+FileStamp = Optional[Tuple[int, int, int]]
+
+
+def file_stamp(path) -> FileStamp:
+    """(mtime_ns, size, inode) of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class SharedVersion:
+    """
+    The workers' common write version: {"epoch": ..., "version": N} in a small
+    file. A writer claims the next version under the exclusive lock; a worker
+    that reloads another's writes takes the version it finds. A new file gets a
+    new random epoch, so tokens from before it was (re)created never match.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def read(self) -> Tuple[str, int]:
+        """(epoch, version); creates the file on first use (call under the exclusive lock)."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return str(data["epoch"]), int(data["version"])
+        except (OSError, ValueError, KeyError, TypeError):
+            epoch = uuid.uuid4().hex[:8]
+            self.write(epoch, 0)
+            return epoch, 0
+
+    def claim(self) -> Tuple[str, int]:
+        """(epoch, next version), recorded for the other workers (call under the exclusive lock)."""
+        epoch, version = self.read()
+        self.write(epoch, version + 1)
+        return epoch, version + 1
+
+    def write(self, epoch: str, version: int):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"epoch": epoch, "version": version}, f)
+        os.replace(tmp_path, self.path)
+
+
+class WorkerCoordinator:
+    """
+    Advisory file lock plus change detection on the data files for one worker.
+
+    `stale()` is cheap (one stat per watched file) and is called on every read;
+    `check_interval` (seconds) can throttle it further.
+    """
+
+    def __init__(self, lock_path, check_interval: float = 0.0):
+        if not FCNTL_AVAILABLE:
+            raise RuntimeError("Multi-worker mode needs fcntl advisory locks (POSIX only)")
+        self.lock_path = Path(lock_path)
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        self.check_interval = check_interval
+        self.watched: List[Path] = []
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        # flock belongs to the open file, not the thread: serialize our own threads
+        self._thread_lock = threading.Lock()
+        self._stamp: Tuple[FileStamp, ...] = ()
+        self._checked_at = 0.0
+        self._metrics_lock = threading.Lock()
+        self._locks = 0
+        self._lock_wait_ms = 0.0
+        self._max_lock_wait_ms = 0.0
+        self._reloads = 0
+        self._last_reload_ms = 0.0
+
+    def watch(self, paths: Iterable):
+        """Set the data files whose changes mean another worker wrote."""
+        self.watched = [Path(p) for p in paths]
+
+    @contextmanager
+    def locked(self, exclusive: bool = True):
+        """Hold the cross-process lock (exclusive for writes, shared for reloads)."""
+        started = time.monotonic()
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            waited = (time.monotonic() - started) * 1000
+            with self._metrics_lock:
+                self._locks += 1
+                self._lock_wait_ms += waited
+                self._max_lock_wait_ms = max(self._max_lock_wait_ms, waited)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def current_stamp(self) -> Tuple[FileStamp, ...]:
+        return tuple(file_stamp(path) for path in self.watched)
+
+    def stale(self, force: bool = False) -> bool:
+        """True if the data files changed since mark_current() (another worker wrote)."""
+        if self.check_interval and not force:
+            now = time.monotonic()
+            if now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+        return self.current_stamp() != self._stamp
+
+    def mark_current(self):
+        """Record the files' state as what this worker holds (call under the lock)."""
+        self._stamp = self.current_stamp()
+
+    def record_reload(self, elapsed_ms: float):
+        with self._metrics_lock:
+            self._reloads += 1
+            self._last_reload_ms = elapsed_ms
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            return {
+                "pid": os.getpid(),
+                "lock_file": str(self.lock_path),
+                "locks": self._locks,
+                "avg_lock_wait_ms": round(self._lock_wait_ms / self._locks, 3) if self._locks else 0,
+                "max_lock_wait_ms": round(self._max_lock_wait_ms, 3),
+                "reloads": self._reloads,
+                "last_reload_ms": round(self._last_reload_ms, 3),
+            }
+
+    def close(self):
+        os.close(self._fd)